@@ -0,0 +1,138 @@
+"""Memory held by ``build_all_cards`` per card: plain vs. slotted dataclasses.
+
+Builds a synthetic vocab with ENTRIES entries spread over kana, kanji, keigo
+and phrase sections, then measures with tracemalloc the bytes retained by the
+card list. "before" swaps in ``__dict__``-backed copies of the entry and
+``CardSpec`` classes (the previous definitions); "after" uses the shipped ones.
+
+Run from the repository root; after ``pip install -e .`` the ``PYTHONPATH``
+prefix can be dropped.
+
+    PYTHONPATH=. python benchmarks/bench_card_memory.py [ENTRIES]
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from jp_agent import cards
+from jp_agent.models import CardSpec
+from jp_agent.vocab import KanaEntry, KanjiEntry, KeigoEntry, PhraseEntry, VocabStore
+
+DEFAULT_ENTRIES = 500_000
+SECTIONS = 5
+
+
+@dataclass(frozen=True)
+class LegacyKanaEntry:
+    kana: str
+    romaji: str
+
+
+@dataclass(frozen=True)
+class LegacyKanjiEntry:
+    kanji: str
+    meaning: list[str]
+
+
+@dataclass(frozen=True)
+class LegacyKeigoEntry:
+    base: str
+    keigo: str
+    type: str
+    meaning: str
+    usage: str
+    example_contexts: list[str]
+
+
+@dataclass(frozen=True)
+class LegacyPhraseEntry:
+    english: str
+    japanese: str
+    kana: str
+    romaji: str
+    category: str | None = None
+    note: str | None = None
+
+
+@dataclass(frozen=True)
+class LegacyCardSpec:
+    card_id: str
+    mode: str
+    level: str | None
+    variant: str
+    vocab_key: str
+
+
+def build_vocab(size: int, kana_type, kanji_type, keigo_type, phrase_type, intern) -> VocabStore:
+    per_section = size // SECTIONS
+    # json.loads hands back a fresh string per value; ``intern`` mimics the loaders.
+    fresh = lambda value: intern("".join(value))  # noqa: E731
+    return VocabStore(
+        hiragana=[kana_type(kana=f"k{idx}", romaji=f"r{idx}") for idx in range(per_section)],
+        katakana=[],
+        kanji={"N5": [kanji_type(kanji=f"漢{idx}", meaning=[f"m{idx}"]) for idx in range(per_section)]},
+        keigo=[
+            keigo_type(
+                base=f"b{idx}",
+                keigo=f"k{idx}",
+                type=fresh("kenjogo"),
+                meaning=f"meaning {idx}",
+                usage=fresh("business"),
+                example_contexts=[fresh("email"), fresh("meeting")],
+            )
+            for idx in range(per_section)
+        ],
+        core_vocab=[
+            phrase_type(english=f"e{idx}", japanese=f"j{idx}", kana=f"k{idx}", romaji=f"r{idx}", category=fresh("core"))
+            for idx in range(per_section)
+        ],
+        survival_phrases=[
+            phrase_type(english=f"e{idx}", japanese=f"j{idx}", kana=f"k{idx}", romaji=f"r{idx}", category=fresh("travel"))
+            for idx in range(per_section)
+        ],
+    )
+
+
+def measure(size: int, legacy: bool) -> tuple[int, int, int, int]:
+    """Return (entries, entry bytes, cards, card bytes) retained after the build."""
+    types = (
+        (LegacyKanaEntry, LegacyKanjiEntry, LegacyKeigoEntry, LegacyPhraseEntry)
+        if legacy
+        else (KanaEntry, KanjiEntry, KeigoEntry, PhraseEntry)
+    )
+    intern = (lambda value: value) if legacy else sys.intern
+    original = cards.CardSpec
+    cards.CardSpec = LegacyCardSpec if legacy else CardSpec
+    try:
+        gc.collect()
+        tracemalloc.start()
+        vocab = build_vocab(size, *types, intern=intern)
+        entry_bytes = tracemalloc.get_traced_memory()[0]
+        built = cards.build_all_cards(vocab)
+        total = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        cards.CardSpec = original
+    entries = (size // SECTIONS) * SECTIONS
+    return entries, entry_bytes, len(built), total - entry_bytes
+
+
+def main(argv: list[str]) -> None:
+    size = int(argv[0]) if argv else DEFAULT_ENTRIES
+    results = {label: measure(size, legacy) for label, legacy in (("before", True), ("after", False))}
+    for label, (entries, entry_bytes, card_count, card_bytes) in results.items():
+        print(
+            f"{label:<7} entries: {entries} ({entry_bytes / entries:6.1f} B/entry)  "
+            f"cards: {card_count} ({card_bytes / card_count:6.1f} B/card)"
+        )
+    before, after = results["before"], results["after"]
+    print(f"card memory saved:  {1 - after[3] / before[3]:6.1%}")
+    print(f"entry memory saved: {1 - after[1] / before[1]:6.1%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
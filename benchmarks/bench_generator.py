@@ -0,0 +1,91 @@
+"""Question generation throughput against vocab size.
+
+Builds a synthetic core-vocab section of each size, then times
+``ContentGeneratorAgent.generate`` over random cards. "per-question pools"
+re-creates the previous behaviour (rebuild and deduplicate the answer pool for
+every question) for comparison; it is skipped above ``LEGACY_MAX_ENTRIES``.
+
+Run from the repository root; after ``pip install -e .`` the ``PYTHONPATH``
+prefix can be dropped.
+
+    PYTHONPATH=. python benchmarks/bench_generator.py [SIZE ...]
+"""
+
+from __future__ import annotations
+
+import gc
+import random
+import sys
+import time
+
+from jp_agent.agents import generator as generator_module
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.cards import build_all_cards
+from jp_agent.models import StudyRequest
+from jp_agent.vocab import PhraseEntry, VocabStore
+
+DEFAULT_SIZES = (100, 10_000, 500_000)
+QUESTIONS = 2_000
+LEGACY_MAX_ENTRIES = 10_000
+REQUEST = StudyRequest(mode="vocab", level=None, context=None, count=1, seed=0)
+
+
+def build_vocab(size: int) -> VocabStore:
+    entries = [
+        PhraseEntry(english=f"phrase {idx}", japanese=f"フレーズ{idx}", kana=f"ふれーず{idx}", romaji=f"fureezu {idx}")
+        for idx in range(size)
+    ]
+    return VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[], core_vocab=entries, survival_phrases=[])
+
+
+class PerQuestionPools(ContentGeneratorAgent):
+    """The previous generator: a fresh pool list for every question."""
+
+    def _pool(self, card, entries, field):
+        return [getattr(entry, field) for entry in entries]
+
+
+def legacy_build_choices(rng, pool, correct, excluded=()):
+    unique_pool = list(dict.fromkeys(pool))
+    distractors = [item for item in unique_pool if item != correct]
+    choices = rng.sample(distractors, 2) + [correct]
+    rng.shuffle(choices)
+    return choices, choices.index(correct)
+
+
+def questions_per_second(agent: ContentGeneratorAgent, cards: list, questions: int) -> float:
+    rng = random.Random(1)
+    picks = [rng.choice(cards) for _ in range(questions)]
+    # Build every (mode, level, variant) pool up front; that cost is paid once per session.
+    for card in {card.variant: card for card in cards}.values():
+        agent.generate(card, REQUEST, rng)
+    # Keep the collector from rescanning the vocab, cards and pools mid-run.
+    gc.collect()
+    gc.freeze()
+    start = time.perf_counter()
+    for card in picks:
+        agent.generate(card, REQUEST, rng)
+    return questions / (time.perf_counter() - start)
+
+
+def main(argv: list[str]) -> None:
+    sizes = [int(arg) for arg in argv] or list(DEFAULT_SIZES)
+    print(f"{'entries':>9}  {'pooled q/s':>12}  {'per-question q/s':>17}")
+    for size in sizes:
+        vocab = build_vocab(size)
+        cards = build_all_cards(vocab)
+        pooled = questions_per_second(ContentGeneratorAgent(vocab), cards, QUESTIONS)
+        legacy = "skipped"
+        if size <= LEGACY_MAX_ENTRIES:
+            original = generator_module._build_choices
+            generator_module._build_choices = legacy_build_choices
+            try:
+                rate = questions_per_second(PerQuestionPools(vocab), cards, max(10, QUESTIONS * 100 // size))
+            finally:
+                generator_module._build_choices = original
+            legacy = f"{rate:,.0f}"
+        print(f"{size:>9,}  {pooled:>12,.0f}  {legacy:>17}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,86 @@
+"""Planning latency against deck size.
+
+Builds synthetic kanji decks of increasing size, then times ``PlannerAgent.plan``
+next to the previous ``ORDER BY RANDOM()`` query it replaced.
+
+Run from the repository root; after ``pip install -e .`` the ``PYTHONPATH``
+prefix can be dropped.
+
+    PYTHONPATH=. python benchmarks/bench_planner.py [SIZE ...]
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from jp_agent import db
+from jp_agent.agents.planner import PlannerAgent
+from jp_agent.models import StudyRequest
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 300_000]
+LEVELS = ["N5", "N4", "N3", "N2"]
+COUNT = 30
+REPEATS = 20
+
+
+def build_deck(conn, size: int) -> None:
+    rng = random.Random(size)
+    today = date.today()
+    rows = []
+    for idx in range(size):
+        # Roughly a fifth of the deck is due, the rest is spread over 60 days.
+        offset = rng.randint(-5, 0) if rng.random() < 0.2 else rng.randint(1, 60)
+        due = (today + timedelta(days=offset)).isoformat()
+        level = LEVELS[idx % len(LEVELS)]
+        rows.append((f"kanji:{level}:{idx}:kanji_to_meaning", "kanji", level, "kanji_to_meaning", 2.0, 1, due))
+    conn.executemany(
+        """
+        INSERT INTO cards (card_id, mode, level, variant, ease, interval, due_date, last_result, last_reviewed_at, rand_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, RANDOM())
+        """,
+        rows,
+    )
+    conn.commit()
+
+
+def legacy_plan(conn, request: StudyRequest) -> list:
+    # Pin the single-column index the old schema had, so the new composite
+    # indexes do not flatter the old query.
+    today_iso = date.today().isoformat()
+    rows = conn.execute(
+        "SELECT * FROM cards INDEXED BY idx_cards_due_date WHERE mode = ? AND level = ? AND due_date <= ? ORDER BY RANDOM() LIMIT ?",
+        (request.mode, request.level, today_iso, request.count),
+    ).fetchall()
+    return list(rows)
+
+
+def time_ms(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn()
+    return (time.perf_counter() - start) * 1000 / REPEATS
+
+
+def main(argv: list[str]) -> None:
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    request = StudyRequest(mode="kanji", level="N5", context=None, count=COUNT, seed=1)
+    planner = PlannerAgent()
+    print(f"{'cards':>10} {'ORDER BY RANDOM() ms':>22} {'plan() ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            conn = db.connect(Path(tmp) / f"deck-{size}.db")
+            db.ensure_schema(conn)
+            build_deck(conn, size)
+            legacy = time_ms(lambda: legacy_plan(conn, request))
+            current = time_ms(lambda: planner.plan(conn, request))
+            print(f"{size:>10} {legacy:>22.2f} {current:>12.2f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
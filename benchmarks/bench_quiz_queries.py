@@ -0,0 +1,102 @@
+"""Card-state reads per study session.
+
+Builds a synthetic kanji deck, plans sessions of increasing size and counts
+the SQL statements spent reading card state: the per-card ``fetch_card``
+lookups ``run_quiz`` used to make, one batched ``refresh_plan`` re-read, and
+the plan-carried state it uses now. A full ``run_quiz`` session is then
+traced to count its SELECTs end to end; the old session made the same ones
+plus one ``fetch_card`` per planned card.
+
+Run from the repository root; after ``pip install -e .`` the ``PYTHONPATH``
+prefix can be dropped.
+
+    PYTHONPATH=. python benchmarks/bench_quiz_queries.py [COUNT ...]
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_planner import build_deck
+from jp_agent import db, quiz
+from jp_agent.agents.planner import PlannerAgent, refresh_plan
+from jp_agent.models import Plan, StudyRequest
+from jp_agent.vocab import KanjiEntry, VocabStore
+
+DECK_SIZE = 20_000
+DEFAULT_COUNTS = [30, 100, 300]
+
+
+class StatementCounter:
+    def __init__(self, conn) -> None:
+        self.conn = conn
+        self.statements: list[str] = []
+
+    def __enter__(self) -> StatementCounter:
+        self.conn.set_trace_callback(self.statements.append)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.conn.set_trace_callback(None)
+
+    @property
+    def selects(self) -> int:
+        return sum(statement.lstrip().upper().startswith("SELECT") for statement in self.statements)
+
+
+def measure(conn, fn) -> tuple[int, float]:
+    with StatementCounter(conn) as counter:
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+    return len(counter.statements), elapsed
+
+
+def session_selects(conn, vocab: VocabStore, count: int) -> int:
+    request = StudyRequest(mode="kanji", level="N5", context=None, count=count, seed=1)
+    original = quiz._prompt_for_answer
+    quiz._prompt_for_answer = lambda choice_count: 0
+    try:
+        with StatementCounter(conn) as counter, contextlib.redirect_stdout(io.StringIO()):
+            quiz.run_quiz(conn, request, vocab, None)
+    finally:
+        quiz._prompt_for_answer = original
+    return counter.selects
+
+
+def main(argv: list[str]) -> None:
+    counts = [int(arg) for arg in argv] or DEFAULT_COUNTS
+    # build_deck ids are ``kanji:N5:<idx>:...``, so every index is a kanji for the generator.
+    vocab = VocabStore(
+        hiragana=[],
+        katakana=[],
+        kanji={"N5": [KanjiEntry(str(idx), [f"meaning {idx}"]) for idx in range(DECK_SIZE)]},
+        keigo=[],
+        core_vocab=[],
+        survival_phrases=[],
+    )
+    planner = PlannerAgent()
+    print(f"{'cards':>6} {'per-card reads':>18} {'batched re-read':>18} {'plan-carried':>13} {'session SELECTs before -> now':>31}")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.connect(Path(tmp) / "deck.db")
+        db.ensure_schema(conn)
+        build_deck(conn, DECK_SIZE)
+        for count in counts:
+            plan = planner.plan(conn, StudyRequest(mode="kanji", level="N5", context=None, count=count, seed=1))
+            legacy = measure(conn, lambda: [db.fetch_card(conn, card.card_id) for card in plan.card_specs])
+            batched = measure(conn, lambda: refresh_plan(conn, Plan(card_specs=plan.card_specs)))
+            selects = session_selects(conn, vocab, count)
+            print(
+                f"{count:>6} {legacy[0]:>6} q {legacy[1]:>7.2f} ms {batched[0]:>6} q {batched[1]:>7.2f} ms "
+                f"{0:>11} q {selects + legacy[0]:>22} -> {selects}"
+            )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,70 @@
+"""Startup cost of loading vocab: JSON parse + validation vs. the compiled cache.
+
+Writes a synthetic survival phrase pack, then times the cold path (JSON) and
+the warm path (``VocabCache`` hit) for the same section.
+
+Run from the repository root; after ``pip install -e .`` the ``PYTHONPATH``
+prefix can be dropped.
+
+    PYTHONPATH=. python benchmarks/bench_vocab_cache.py [ENTRIES]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from jp_agent.vocab import EXPECTED_FILES, compute_sha256, load_section
+from jp_agent.vocab_cache import VocabCache
+
+DEFAULT_ENTRIES = 200_000
+REPEATS = 5
+
+
+def write_pack(data_dir: Path, size: int) -> Path:
+    entries = [
+        {
+            "english": f"phrase {idx}",
+            "japanese": f"フレーズ{idx}",
+            "kana": f"ふれーず{idx}",
+            "romaji": f"fureezu {idx}",
+            "category": "synthetic",
+        }
+        for idx in range(size)
+    ]
+    path = data_dir / EXPECTED_FILES["survival"]
+    path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def best_ms(fn) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main(argv: list[str]) -> None:
+    size = int(argv[0]) if argv else DEFAULT_ENTRIES
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        data_dir.mkdir()
+        path = write_pack(data_dir, size)
+        cache = VocabCache(Path(tmp) / "cache", {path.name: compute_sha256(path)})
+        cache.load(data_dir, "survival")
+
+        cold = best_ms(lambda: load_section(data_dir, "survival"))
+        warm = best_ms(lambda: cache.load(data_dir, "survival"))
+        print(f"entries: {size}")
+        print(f"cold (JSON + validation): {cold:9.1f} ms")
+        print(f"warm (compiled cache):    {warm:9.1f} ms")
+        print(f"speedup:                  {cold / warm:9.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,14 +1,31 @@
 from __future__ import annotations
 
 import random
+import threading
 import time
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Collection, Iterator, Mapping, Sequence
 
+from jp_agent.confusables import ConfusableIndex
+from jp_agent.explanations import CachedExplanation, ExplanationCache, explanation_key
 from jp_agent.llm import LlmConfig
-from jp_agent.models import CardSpec, GeneratedQuestion, StudyRequest
+from jp_agent.llm_client import DEFAULT_CALL_TIMEOUT, CompletionClient, LlmUnavailable
+from jp_agent.mapped_vocab import MappedSection, section_key_map, section_pool
+from jp_agent.models import BatchQuestion, CardSpec, GeneratedQuestion, Plan, StudyRequest
 from jp_agent.vocab import KanaEntry, KanjiEntry, KeigoEntry, PhraseEntry, VocabStore
 
+# Distractors are drawn by random index and rejected if excluded or already
+# picked; after this many misses the pool is filtered exhaustively instead.
+MAX_SAMPLE_ATTEMPTS = 32
+# Context used in the explanation prompt when the request has none.
+DEFAULT_EXPLANATION_CONTEXT = "general business"
+# Minimum seconds between the starts of two LLM calls from one generator
+# whose LLM config has no shared rate limiter.
+DEFAULT_LLM_INTERVAL = 1.0
+EXPLANATION_MAX_TOKENS = 120
+# Rough English prompt size per token, used to charge the token budget before a call.
+CHARS_PER_TOKEN = 4
+
 
 @dataclass
 class _KeigoPrompt:
@@ -18,18 +35,37 @@ class _KeigoPrompt:
 
 
 class ContentGeneratorAgent:
-    def __init__(self, vocab: VocabStore, llm: LlmConfig | None = None) -> None:
+    def __init__(
+        self,
+        vocab: VocabStore,
+        llm: LlmConfig | None = None,
+        confusables: ConfusableIndex | None = None,
+        explanations: ExplanationCache | None = None,
+        llm_interval: float = DEFAULT_LLM_INTERVAL,
+        llm_timeout: float = DEFAULT_CALL_TIMEOUT,
+        wait_for_budget: bool = False,
+    ) -> None:
         self.vocab = vocab
         self.llm = llm
+        self.explanations = explanations
+        self.llm_interval = llm_interval
+        self._rate_lock = threading.Lock()
+        # Coalesces identical prompts, bounds each call (and, unless ``wait_for_budget``,
+        # its rate-limit wait) by ``llm_timeout`` and stops calling a failing API;
+        # its counters and histogram are for monitoring.
+        self.llm_client = (
+            CompletionClient(llm, timeout=llm_timeout, rate_limit=self._rate_limit, wait_for_budget=wait_for_budget)
+            if llm
+            else None
+        )
+        # When set, kana and kanji distractors come from the card's most
+        # confusable neighbours first, falling back to the uniform pool.
+        self.confusables = confusables
         self._last_llm_call = 0.0
-        self._kana_maps = {
-            "hiragana": {entry.kana: entry for entry in vocab.hiragana},
-            "katakana": {entry.kana: entry for entry in vocab.katakana},
-        }
-        self._kanji_maps = {level: {entry.kanji: entry for entry in entries} for level, entries in vocab.kanji.items()}
-        self._keigo_map = {entry.base: entry for entry in vocab.keigo}
-        self._vocab_map = {entry.english: entry for entry in vocab.core_vocab}
-        self._survival_map = {entry.english: entry for entry in vocab.survival_phrases}
+        # Lookup maps and distractor pools are built per section on first use,
+        # so a lazy store only loads the sections this session's cards come from.
+        self._key_maps: dict[str, Mapping] = {}
+        self._pools: dict[tuple[str, str | None, str], Sequence[str]] = {}
 
     def generate(
         self,
@@ -45,28 +81,81 @@ class ContentGeneratorAgent:
         if card.mode == "keigo":
             return self._generate_keigo(card, request, rng, use_llm=use_llm)
         if card.mode == "vocab":
-            return self._generate_phrase(card, rng, self.vocab.core_vocab, self._vocab_map)
+            entries = self.vocab.core_vocab
+            return self._generate_phrase(card, rng, entries, self._key_map("core_vocab", entries, "english"))
         if card.mode == "survival":
-            return self._generate_phrase(card, rng, self.vocab.survival_phrases, self._survival_map)
+            entries = self.vocab.survival_phrases
+            return self._generate_phrase(card, rng, entries, self._key_map("survival", entries, "english"))
         raise ValueError(f"Unsupported mode: {card.mode}")
 
+    def generate_batch(
+        self,
+        plan: Plan,
+        request: StudyRequest,
+        rng: random.Random,
+        use_llm: bool = True,
+    ) -> list[BatchQuestion]:
+        """Call ``generate`` for every card in ``plan``, in plan order.
+
+        A convenience loop, not a bulk draw: each card samples its distractors
+        from the shared per-section pools exactly as ``generate`` does, and
+        ``rng`` is consumed in plan order, so a seed always yields the same
+        batch. A card that cannot be generated gets the error as its issue
+        instead of stopping the batch.
+        """
+        batch: list[BatchQuestion] = []
+        for card in plan.card_specs:
+            try:
+                question = self.generate(card, request, rng, use_llm=use_llm)
+            except Exception as exc:
+                batch.append(BatchQuestion(card=card, question=None, issues=[str(exc)]))
+            else:
+                batch.append(BatchQuestion(card=card, question=question, issues=[]))
+        return batch
+
+    def _key_map(self, section: str, entries: Sequence, field: str) -> Mapping:
+        key_map = self._key_maps.get(section)
+        if key_map is None:
+            key_map = self._key_maps[section] = section_key_map(entries, field)
+        return key_map
+
+    def _pool(self, card: CardSpec, entries: Sequence, field: str) -> Sequence[str]:
+        """Deduplicated values of ``field`` across ``entries``, shared by every card of this mode and level."""
+        key = (card.mode, card.level, field)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = section_pool(entries, field)
+        return pool
+
+    def _confusable_values(self, card: CardSpec, entry_map: Mapping, field: str) -> list[str]:
+        """``field`` values of the entries most easily mistaken for this card's, closest first."""
+        if self.confusables is None:
+            return []
+        values: list[str] = []
+        for key in self.confusables.neighbours(card.mode, card.level, card.vocab_key):
+            value = getattr(entry_map[key], field)
+            values.extend(value if isinstance(value, list) else (value,))
+        return values
+
     def _generate_kana(self, card: CardSpec, rng: random.Random) -> GeneratedQuestion:
         entries = self.vocab.kana_by_mode(card.mode)
         if len(entries) < 3:
             raise ValueError(f"Not enough {card.mode} entries for MCQ (need 3)")
-        entry_map = self._kana_maps[card.mode]
+        entry_map = self._key_map(card.mode, entries, "kana")
         entry = entry_map[card.vocab_key]
         if card.variant == "kana_to_romaji":
             prompt = f"{entry.kana} -> ?"
-            pool = [item.romaji for item in entries]
+            field = "romaji"
             correct = entry.romaji
         elif card.variant == "romaji_to_kana":
             prompt = f"{entry.romaji} -> ?"
-            pool = [item.kana for item in entries]
+            field = "kana"
             correct = entry.kana
         else:
             raise ValueError(f"Unsupported kana variant: {card.variant}")
-        choices, correct_index = _build_choices(rng, pool, correct)
+        pool = self._pool(card, entries, field)
+        preferred = self._confusable_values(card, entry_map, field)
+        choices, correct_index = _build_choices(rng, pool, correct, preferred=preferred)
         return GeneratedQuestion(
             prompt=prompt,
             choices=choices,
@@ -81,21 +170,29 @@ class ContentGeneratorAgent:
         entries = self.vocab.kanji_by_level(card.level)
         if len(entries) < 3:
             raise ValueError(f"Not enough kanji entries for MCQ (need 3) in {card.level}")
-        entry_map = self._kanji_maps[card.level]
+        entry_map = self._key_map(f"kanji_{card.level}", entries, "kanji")
         entry = entry_map[card.vocab_key]
         if card.variant == "kanji_to_meaning":
             meaning = rng.choice(entry.meaning)
             prompt = f"{entry.kanji} -> ?"
-            pool = [_random_meaning(rng, item) for item in entries]
+            if isinstance(entries, MappedSection):
+                pool = _MeaningPool(rng, entries)
+            else:
+                pool = self._pool(card, entries, "meaning")
             correct = meaning
+            # Other meanings of the same kanji would also be right answers.
+            excluded = entry.meaning
+            preferred = self._confusable_values(card, entry_map, "meaning")
         elif card.variant == "meaning_to_kanji":
             meaning = rng.choice(entry.meaning)
             prompt = f"{meaning} -> ?"
-            pool = [item.kanji for item in entries]
+            pool = self._pool(card, entries, "kanji")
             correct = entry.kanji
+            excluded = ()
+            preferred = self._confusable_values(card, entry_map, "kanji")
         else:
             raise ValueError(f"Unsupported kanji variant: {card.variant}")
-        choices, correct_index = _build_choices(rng, pool, correct)
+        choices, correct_index = _build_choices(rng, pool, correct, excluded, preferred)
         return GeneratedQuestion(
             prompt=prompt,
             choices=choices,
@@ -117,11 +214,11 @@ class ContentGeneratorAgent:
 
         if card.variant == "english_to_japanese":
             prompt = f"{entry.english} -> ?"
-            pool = [item.japanese for item in entries]
+            pool = self._pool(card, entries, "japanese")
             correct = entry.japanese
         elif card.variant == "japanese_to_english":
             prompt = f"{entry.japanese} -> ?"
-            pool = [item.english for item in entries]
+            pool = self._pool(card, entries, "english")
             correct = entry.english
         else:
             raise ValueError(f"Unsupported {card.mode} variant: {card.variant}")
@@ -150,24 +247,33 @@ class ContentGeneratorAgent:
     ) -> GeneratedQuestion:
         if len(self.vocab.keigo) < 3 and card.variant != "politeness_classification":
             raise ValueError("Not enough keigo entries for MCQ (need 3)")
-        entry = self._keigo_map[card.vocab_key]
+        entry = self.keigo_entry(card.vocab_key)
         prompt_data = self._keigo_prompt(card, entry, request, rng)
         explanation = self._keigo_explanation(entry, request.context, use_llm=use_llm)
+        meta = {
+            "mode": card.mode,
+            "variant": card.variant,
+            "type": entry.type,
+            "usage": entry.usage,
+            "base": entry.base,
+            "keigo": entry.keigo,
+        }
+        if self.explanations is not None and explanation != _keigo_template(entry):
+            # Lets the caller record the verifier's verdict on the cached text.
+            meta["explanation_key"] = self._explanation_key(entry, request.context)
         return GeneratedQuestion(
             prompt=prompt_data.prompt,
             choices=prompt_data.choices,
             correct_index=prompt_data.correct_index,
             explanation=explanation,
-            meta={
-                "mode": card.mode,
-                "variant": card.variant,
-                "type": entry.type,
-                "usage": entry.usage,
-                "base": entry.base,
-                "keigo": entry.keigo,
-            },
+            meta=meta,
         )
 
+    def record_explanation_verdict(self, key: str, accepted: bool) -> None:
+        """Store whether the verifier accepted the cached explanation under ``key``."""
+        if self.explanations is not None:
+            self.explanations.record_verdict(key, accepted)
+
     def _keigo_prompt(
         self,
         card: CardSpec,
@@ -177,7 +283,7 @@ class ContentGeneratorAgent:
     ) -> _KeigoPrompt:
         if card.variant == "plain_to_keigo":
             prompt = f"{entry.base} -> ?"
-            pool = [item.keigo for item in self.vocab.keigo]
+            pool = self._pool(card, self.vocab.keigo, "keigo")
             choices, correct_index = _build_choices(rng, pool, entry.keigo)
             return _KeigoPrompt(prompt=prompt, choices=choices, correct_index=correct_index)
 
@@ -204,14 +310,77 @@ class ContentGeneratorAgent:
         raise ValueError(f"Unsupported keigo variant: {card.variant}")
 
     def _keigo_explanation(self, entry: KeigoEntry, context: str | None, use_llm: bool) -> str:
-        template = (
-            f"{entry.keigo} is the {entry.type} form of {entry.base}. "
-            f"Meaning: {entry.meaning}. Usage: {entry.usage}."
-        )
+        template = _keigo_template(entry)
         if not use_llm or not self.llm:
             return template
+        try:
+            return self._llm_explanation(entry, context) or template
+        except LlmUnavailable:
+            # A failed, stalled or short-circuited call costs the learner the nuance, not the question.
+            return template
+
+    def _llm_explanation(self, entry: KeigoEntry, context: str | None) -> str:
+        """Cached or fresh LLM explanation; empty if there is none worth serving."""
+        key = None
+        if self.explanations is not None:
+            key = self._explanation_key(entry, context)
+            cached = self.explanations.get(key)
+            if cached is not None:
+                # A hit costs no network round trip and no rate-limit sleep. Text
+                # the verifier already rejected would only be rejected again.
+                return "" if cached.accepted is False else cached.text
+
+        messages, tokens = self._explanation_messages(entry, context)
+        content = self.llm_client.complete(messages, max_tokens=EXPLANATION_MAX_TOKENS, temperature=0.2, tokens=tokens)
+        if content and key is not None:
+            self.explanations.put(key, self.llm.model, content)
+        return content
+
+    def stream_explanation(self, entry: KeigoEntry, context: str | None) -> Iterator[str]:
+        """Yield the LLM explanation in pieces as it streams; a cached text comes as one piece.
+
+        Yields nothing when the cache holds text the verifier rejected. Nothing
+        is cached here: the caller vets the pieces and hands the assembled text
+        to ``remember_explanation`` with its verdict.
+        """
+        if self.explanations is not None:
+            cached = self.explanations.get(self._explanation_key(entry, context))
+            if cached is not None:
+                if cached.accepted is not False:
+                    yield cached.text
+                return
+        messages, tokens = self._explanation_messages(entry, context)
+        yield from self.llm_client.stream(messages, max_tokens=EXPLANATION_MAX_TOKENS, temperature=0.2, tokens=tokens)
 
-        prompt_context = context or "general business"
+    def fetch_explanation(self, entry: KeigoEntry, context: str | None) -> CachedExplanation:
+        """``entry``'s cached explanation if it has a verdict, otherwise fetch (or reuse) and cache the text.
+
+        Text that still needs a verdict comes back with ``accepted=None``; pass
+        it to ``remember_explanation`` once it has been checked.
+        """
+        if self.explanations is not None:
+            cached = self.explanations.get(self._explanation_key(entry, context))
+            if cached is not None and cached.accepted is not None:
+                return cached
+        return CachedExplanation(text=self._llm_explanation(entry, context), accepted=None)
+
+    def remember_explanation(self, entry: KeigoEntry, context: str | None, text: str, accepted: bool) -> None:
+        """Cache a streamed explanation with the verifier's verdict, or update the verdict of a cached one."""
+        if self.explanations is None or not text:
+            return
+        key = self._explanation_key(entry, context)
+        cached = self.explanations.get(key)
+        if cached is not None and cached.text == text:
+            self.explanations.record_verdict(key, accepted)
+        else:
+            self.explanations.put(key, self.llm.model, text, accepted)
+
+    def keigo_entry(self, base: str) -> KeigoEntry:
+        return self._key_map("keigo", self.vocab.keigo, "base")[base]
+
+    def _explanation_messages(self, entry: KeigoEntry, context: str | None) -> tuple[list[dict[str, str]], int]:
+        """Chat messages for ``entry``'s explanation and the tokens to charge for them."""
+        prompt_context = context or DEFAULT_EXPLANATION_CONTEXT
         system = (
             "You are a Japanese language tutor. "
             "Explain in English using 2 short sentences. "
@@ -226,42 +395,96 @@ class ContentGeneratorAgent:
             f"Context: {prompt_context}\n"
             "Explain the nuance for business usage."
         )
-        self._rate_limit()
-        response = self.llm.client.chat.completions.create(
-            model=self.llm.model,
-            messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-            temperature=0.2,
-            max_tokens=120,
-        )
-        content = response.choices[0].message.content or ""
-        return content.strip() or template
-
-    def _rate_limit(self) -> None:
-        now = time.monotonic()
-        delta = now - self._last_llm_call
-        if delta < 1.0:
-            time.sleep(1.0 - delta)
-        self._last_llm_call = time.monotonic()
-
-
-def _build_choices(rng: random.Random, pool: Sequence[str], correct: str) -> tuple[list[str], int]:
-    unique_pool = list(dict.fromkeys(pool))
-    if correct not in unique_pool:
-        unique_pool.append(correct)
-    distractors = [item for item in unique_pool if item != correct]
-    if len(distractors) < 2:
-        raise ValueError("Not enough distractors to build MCQ")
-    selected = rng.sample(distractors, 2)
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        return messages, (len(system) + len(user)) // CHARS_PER_TOKEN + EXPLANATION_MAX_TOKENS
+
+    def _explanation_key(self, entry: KeigoEntry, context: str | None) -> str:
+        return explanation_key(entry, context or DEFAULT_EXPLANATION_CONTEXT, self.llm.model)
+
+    def _rate_limit(self, tokens: int = 0, max_wait: float | None = None) -> None:
+        if self.llm is not None and self.llm.rate_limiter is not None:
+            self.llm.rate_limiter.acquire(tokens, max_wait=max_wait)
+            return
+        # Held while sleeping, so concurrent callers start their calls one interval apart.
+        with self._rate_lock:
+            now = time.monotonic()
+            delta = now - self._last_llm_call
+            if delta < self.llm_interval:
+                time.sleep(self.llm_interval - delta)
+            self._last_llm_call = time.monotonic()
+
+
+def _keigo_template(entry: KeigoEntry) -> str:
+    return (
+        f"{entry.keigo} is the {entry.type} form of {entry.base}. "
+        f"Meaning: {entry.meaning}. Usage: {entry.usage}."
+    )
+
+
+def _build_choices(
+    rng: random.Random,
+    pool: Sequence[str],
+    correct: str,
+    excluded: Collection[str] = (),
+    preferred: Sequence[str] = (),
+) -> tuple[list[str], int]:
+    """Return shuffled choices and the correct index.
+
+    Distractors are drawn from ``preferred`` (e.g. confusable neighbours) when
+    it has enough usable values, and topped up at random from ``pool``.
+    """
+    excluded = {correct, *excluded}
+    selected: list[str] = []
+    if preferred:
+        candidates = [item for item in dict.fromkeys(preferred) if item not in excluded]
+        selected = rng.sample(candidates, min(2, len(candidates)))
+    if len(selected) < 2:
+        selected += _sample_distractors(rng, pool, excluded | set(selected), 2 - len(selected))
     choices = selected + [correct]
     rng.shuffle(choices)
     correct_index = choices.index(correct)
     return choices, correct_index
 
 
+def _sample_distractors(
+    rng: random.Random,
+    pool: Sequence[str],
+    excluded: Collection[str],
+    count: int = 2,
+) -> list[str]:
+    """Pick ``count`` distinct pool values not in ``excluded``, in O(1) expected time."""
+    selected: list[str] = []
+    if pool:
+        for _ in range(MAX_SAMPLE_ATTEMPTS):
+            item = pool[rng.randrange(len(pool))]
+            if item not in excluded and item not in selected:
+                selected.append(item)
+                if len(selected) == count:
+                    return selected
+    distractors = [item for item in dict.fromkeys(pool) if item not in excluded]
+    if len(distractors) < count:
+        raise ValueError("Not enough distractors to build MCQ")
+    return rng.sample(distractors, count)
+
+
 def _random_meaning(rng: random.Random, entry: KanjiEntry) -> str:
     return rng.choice(entry.meaning)
 
 
+class _MeaningPool(Sequence):
+    """One random meaning per kanji, drawn when the position is read."""
+
+    def __init__(self, rng: random.Random, entries: MappedSection) -> None:
+        self.rng = rng
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return _random_meaning(self.rng, self.entries[index])
+
+
 def _indefinite_article(word: str) -> str:
     """Choose a simple English indefinite article for common context words.
 
@@ -1,57 +1,87 @@
 from __future__ import annotations
 
 import random
+import sys
 from datetime import date
 from typing import Iterable
 
 from jp_agent import db
 from jp_agent.cards import parse_vocab_key
-from jp_agent.models import CardSpec, Plan, StudyRequest
+from jp_agent.journal import ReviewJournal
+from jp_agent.models import CardSpec, CardState, Plan, StudyRequest
 
 
 class PlannerAgent:
+    def __init__(self, journal: ReviewJournal | None = None) -> None:
+        self.journal = journal
+
     def plan(self, conn, request: StudyRequest) -> Plan:
+        if self.journal is not None:
+            # Queued reviews change due dates, so commit them before selecting cards.
+            self.journal.flush()
         today_iso = date.today().isoformat()
+        # Card sampling and order both come from the seed, so a session can be replayed.
+        rng = random.Random(request.seed)
         if request.mode == "kana":
-            rows = self._fetch_mixed_kana(conn, today_iso, request.count)
+            rows = self._fetch_mixed_kana(conn, today_iso, request.count, rng)
         else:
             due_rows = db.fetch_due_cards(
-                conn, request.mode, request.level, today_iso, request.count, randomize=True
+                conn, request.mode, request.level, today_iso, request.count, randomize=True, rng=rng
             )
             remaining = request.count - len(due_rows)
             if remaining > 0:
                 next_rows = db.fetch_next_cards(
-                    conn, request.mode, request.level, today_iso, remaining, randomize=True
+                    conn, request.mode, request.level, today_iso, remaining, randomize=True, rng=rng
                 )
                 rows = list(due_rows) + list(next_rows)
             else:
                 rows = list(due_rows)
 
         card_specs = [self._row_to_card(row) for row in rows]
-        rng = random.Random(request.seed)
         rng.shuffle(card_specs)
-        return Plan(card_specs=card_specs)
+        # The selection query already returned each card's SRS state, so the
+        # session does not read the cards again one by one.
+        return Plan(card_specs=card_specs, states=_card_states(rows))
 
-    def _fetch_mixed_kana(self, conn, today_iso: str, count: int):
-        due_hira = db.fetch_due_cards(conn, "hiragana", None, today_iso, count, randomize=True)
-        due_kata = db.fetch_due_cards(conn, "katakana", None, today_iso, count, randomize=True)
+    def _fetch_mixed_kana(self, conn, today_iso: str, count: int, rng: random.Random):
+        due_hira = db.fetch_due_cards(conn, "hiragana", None, today_iso, count, randomize=True, rng=rng)
+        due_kata = db.fetch_due_cards(conn, "katakana", None, today_iso, count, randomize=True, rng=rng)
         due_rows = list(due_hira) + list(due_kata)
-        rng = random.Random()
         rng.shuffle(due_rows)
         if len(due_rows) >= count:
             return due_rows[:count]
 
         remaining = count - len(due_rows)
-        next_hira = db.fetch_next_cards(conn, "hiragana", None, today_iso, remaining, randomize=True)
-        next_kata = db.fetch_next_cards(conn, "katakana", None, today_iso, remaining, randomize=True)
+        next_hira = db.fetch_next_cards(conn, "hiragana", None, today_iso, remaining, randomize=True, rng=rng)
+        next_kata = db.fetch_next_cards(conn, "katakana", None, today_iso, remaining, randomize=True, rng=rng)
         next_rows = list(next_hira) + list(next_kata)
         rng.shuffle(next_rows)
         return due_rows + next_rows[:remaining]
 
     def _row_to_card(self, row) -> CardSpec:
         card_id = str(row["card_id"])
-        mode = str(row["mode"])
-        level = row["level"]
-        variant = str(row["variant"])
-        vocab_key = parse_vocab_key(card_id, mode)
+        mode = sys.intern(str(row["mode"]))
+        level = row["level"] and sys.intern(row["level"])
+        variant = sys.intern(str(row["variant"]))
+        vocab_key = row["vocab_key"]
+        if vocab_key is None:
+            vocab_key = parse_vocab_key(card_id, mode)
         return CardSpec(card_id=card_id, mode=mode, level=level, variant=variant, vocab_key=vocab_key)
+
+
+def refresh_plan(conn, plan: Plan) -> Plan:
+    """Re-read the SRS state of every card in ``plan`` in one batch.
+
+    ``QuizSession`` calls it for plans missing state; callers holding a plan
+    a while before the session starts call it themselves, since staleness is
+    not detected. Cards deleted since planning have no state afterwards.
+    """
+    rows = db.fetch_cards(conn, [card.card_id for card in plan.card_specs])
+    return Plan(card_specs=plan.card_specs, states=_card_states(rows.values()))
+
+
+def _card_states(rows: Iterable) -> dict[str, CardState]:
+    return {
+        str(row["card_id"]): CardState(ease=float(row["ease"]), interval=int(row["interval"]), due_date=row["due_date"])
+        for row in rows
+    }
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 
 from jp_agent import db
+from jp_agent.journal import ReviewJournal
+from jp_agent.models import ReviewRecord
 
 
 @dataclass(frozen=True)
@@ -25,10 +27,28 @@ def update_srs(ease: float, interval: int, correct: bool) -> SrsResult:
 
 
 class SrsAgent:
+    def __init__(self, journal: ReviewJournal | None = None) -> None:
+        self.journal = journal
+
     def apply(self, conn, card_row, correct: bool, response_ms: int) -> SrsResult:
         ease_before = float(card_row["ease"])
         interval_before = int(card_row["interval"])
         result = update_srs(ease_before, interval_before, correct)
+        if self.journal is not None:
+            self.journal.record(
+                ReviewRecord(
+                    card_id=str(card_row["card_id"]),
+                    correct=correct,
+                    response_ms=response_ms,
+                    ease_before=ease_before,
+                    ease_after=result.ease_after,
+                    interval_before=interval_before,
+                    interval_after=result.interval_after,
+                    due_date=result.due_date.isoformat(),
+                    reviewed_at=datetime.now(timezone.utc).isoformat(),
+                )
+            )
+            return result
         db.update_review(
             conn,
             card_id=str(card_row["card_id"]),
@@ -2,14 +2,21 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
+from typing import Sequence
 
-from jp_agent.models import CardSpec, GeneratedQuestion, VerifiedQuestion
+from jp_agent.models import BatchQuestion, CardSpec, GeneratedQuestion, VerifiedQuestion
 from jp_agent.vocab import VocabStore
+from jp_agent.whitelist import WhitelistIndex
 
 _JP_CHAR_RE = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
 
+EXPLANATION_ISSUE = "explanation includes non-whitelisted Japanese text"
+
 
 class VerifierAgent:
+    def __init__(self) -> None:
+        self._index: WhitelistIndex | None = None
+
     def verify(self, card: CardSpec, question: GeneratedQuestion, vocab: VocabStore) -> VerifiedQuestion:
         issues: list[str] = []
         if question.correct_index < 0 or question.correct_index >= len(question.choices):
@@ -17,83 +24,85 @@ class VerifierAgent:
         if len(question.choices) != len(set(question.choices)):
             issues.append("duplicate choices")
 
+        index = self._index_for(vocab)
         if card.mode in {"hiragana", "katakana"}:
-            self._verify_kana(card, question, vocab, issues)
+            self._verify_kana(card, question, index, issues)
         elif card.mode == "kanji":
-            self._verify_kanji(card, question, vocab, issues)
+            self._verify_kanji(card, question, index, issues)
         elif card.mode == "keigo":
-            self._verify_keigo(card, question, vocab, issues)
+            self._verify_keigo(card, question, index, issues)
         elif card.mode in {"vocab", "survival"}:
-            self._verify_phrase(card, question, vocab, issues)
+            self._verify_phrase(card, question, index, issues)
         else:
             issues.append(f"unsupported mode: {card.mode}")
 
         return VerifiedQuestion(valid=not issues, question=question, issues=issues)
 
-    def _verify_kana(self, card: CardSpec, question: GeneratedQuestion, vocab: VocabStore, issues: list[str]) -> None:
-        entries = vocab.kana_by_mode(card.mode)
-        kana_set = {entry.kana for entry in entries}
-        romaji_set = {entry.romaji for entry in entries}
-        if card.variant == "kana_to_romaji":
-            if any(choice not in romaji_set for choice in question.choices):
-                issues.append("kana_to_romaji choices not in whitelist")
-        elif card.variant == "romaji_to_kana":
-            if any(choice not in kana_set for choice in question.choices):
-                issues.append("romaji_to_kana choices not in whitelist")
-        else:
+    def verify_batch(self, batch: Sequence[BatchQuestion], vocab: VocabStore) -> list[BatchQuestion]:
+        """Verify every generated question in ``batch``; failed ones keep their issues and lose the question."""
+        verified: list[BatchQuestion] = []
+        for item in batch:
+            if item.question is None:
+                verified.append(item)
+                continue
+            result = self.verify(item.card, item.question, vocab)
+            question = result.question if result.valid else None
+            verified.append(BatchQuestion(card=item.card, question=question, issues=result.issues))
+        return verified
+
+    def _index_for(self, vocab: VocabStore) -> WhitelistIndex:
+        if self._index is None or self._index.vocab is not vocab:
+            self._index = WhitelistIndex(vocab)
+        return self._index
+
+    def _verify_kana(self, card: CardSpec, question: GeneratedQuestion, index: WhitelistIndex, issues: list[str]) -> None:
+        if card.variant not in {"kana_to_romaji", "romaji_to_kana"}:
             issues.append("unknown kana variant")
+            return
+        answers = index.answers(card.mode, None, card.variant)
+        if any(choice not in answers for choice in question.choices):
+            issues.append(f"{card.variant} choices not in whitelist")
 
-    def _verify_kanji(self, card: CardSpec, question: GeneratedQuestion, vocab: VocabStore, issues: list[str]) -> None:
+    def _verify_kanji(self, card: CardSpec, question: GeneratedQuestion, index: WhitelistIndex, issues: list[str]) -> None:
         if not card.level:
             issues.append("kanji card missing level")
             return
-        entries = vocab.kanji_by_level(card.level)
-        kanji_set = {entry.kanji for entry in entries}
-        meaning_set = {meaning for entry in entries for meaning in entry.meaning}
-        if card.variant == "kanji_to_meaning":
-            if any(choice not in meaning_set for choice in question.choices):
-                issues.append("kanji_to_meaning choices not in whitelist")
-        elif card.variant == "meaning_to_kanji":
-            if any(choice not in kanji_set for choice in question.choices):
-                issues.append("meaning_to_kanji choices not in whitelist")
-        else:
+        if card.variant not in {"kanji_to_meaning", "meaning_to_kanji"}:
             issues.append("unknown kanji variant")
+            return
+        answers = index.answers(card.mode, card.level, card.variant)
+        if any(choice not in answers for choice in question.choices):
+            issues.append(f"{card.variant} choices not in whitelist")
 
-    def _verify_phrase(self, card: CardSpec, question: GeneratedQuestion, vocab: VocabStore, issues: list[str]) -> None:
-        entries = vocab.core_vocab if card.mode == "vocab" else vocab.survival_phrases
-        entry_map = {entry.english: entry for entry in entries}
+    def _verify_phrase(self, card: CardSpec, question: GeneratedQuestion, index: WhitelistIndex, issues: list[str]) -> None:
+        entry_map = index.entries(card.mode, None)
         if card.vocab_key not in entry_map:
             issues.append(f"{card.mode} key missing in whitelist")
             return
 
         entry = entry_map[card.vocab_key]
-        japanese_set = {item.japanese for item in entries}
-        english_set = {item.english for item in entries}
-
         if card.variant == "english_to_japanese":
-            if any(choice not in japanese_set for choice in question.choices):
-                issues.append(f"{card.mode} english_to_japanese choices not in whitelist")
-            if question.choices[question.correct_index] != entry.japanese:
-                issues.append(f"{card.mode} english_to_japanese correct mismatch")
+            expected = entry.japanese
         elif card.variant == "japanese_to_english":
-            if any(choice not in english_set for choice in question.choices):
-                issues.append(f"{card.mode} japanese_to_english choices not in whitelist")
-            if question.choices[question.correct_index] != entry.english:
-                issues.append(f"{card.mode} japanese_to_english correct mismatch")
+            expected = entry.english
         else:
             issues.append(f"unknown {card.mode} variant")
-
-
-    def _verify_keigo(self, card: CardSpec, question: GeneratedQuestion, vocab: VocabStore, issues: list[str]) -> None:
-        keigo_entries = vocab.keigo
-        base_map = {entry.base: entry for entry in keigo_entries}
-        keigo_set = {entry.keigo for entry in keigo_entries}
+            return
+        answers = index.answers(card.mode, None, card.variant)
+        if any(choice not in answers for choice in question.choices):
+            issues.append(f"{card.mode} {card.variant} choices not in whitelist")
+        if question.choices[question.correct_index] != expected:
+            issues.append(f"{card.mode} {card.variant} correct mismatch")
+
+    def _verify_keigo(self, card: CardSpec, question: GeneratedQuestion, index: WhitelistIndex, issues: list[str]) -> None:
+        base_map = index.entries(card.mode, None)
         if card.vocab_key not in base_map:
             issues.append("keigo base missing in whitelist")
             return
         entry = base_map[card.vocab_key]
         if card.variant in {"plain_to_keigo", "context_selection"}:
-            if any(choice not in keigo_set for choice in question.choices):
+            answers = index.answers(card.mode, None, card.variant)
+            if any(choice not in answers for choice in question.choices):
                 issues.append("keigo choices not in whitelist")
             if question.choices[question.correct_index] != entry.keigo:
                 issues.append("keigo correct answer mismatch")
@@ -110,13 +119,14 @@ class VerifierAgent:
         self._verify_explanation(entry, question, issues)
 
     def _verify_explanation(self, entry, question: GeneratedQuestion, issues: list[str]) -> None:
-        if not question.explanation:
-            return
-        japanese_chars = _JP_CHAR_RE.findall(question.explanation)
-        if not japanese_chars:
-            return
-        allowed_chars = set(entry.base + entry.keigo)
-        for ch in japanese_chars:
-            if ch not in allowed_chars:
-                issues.append("explanation includes non-whitelisted Japanese text")
-                break
+        if question.explanation and not explanation_allowed(entry, question.explanation):
+            issues.append(EXPLANATION_ISSUE)
+
+
+def explanation_allowed(entry, text: str) -> bool:
+    """True if every Japanese character in ``text`` belongs to the entry's base or keigo form.
+
+    The rule is per character, so it can also vet a streamed explanation piece by piece.
+    """
+    allowed_chars = set(entry.base + entry.keigo)
+    return all(ch in allowed_chars for ch in _JP_CHAR_RE.findall(text))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import random
+from typing import Iterable, Iterator, Protocol
+
+from jp_agent.session import SessionQuestion
+
+# Response time recorded for a scripted answer that does not give one.
+DEFAULT_RESPONSE_MS = 1500
+# Simulated response times are log-normal around e**7.2 ≈ 1.3 s.
+RESPONSE_MS_MU = 7.2
+RESPONSE_MS_SIGMA = 0.5
+AUTO_POLICIES = ("correct", "incorrect", "random")
+
+
+class AnswerError(ValueError):
+    """A scripted answer line that cannot be used for the current question."""
+
+
+class AnswerSource(Protocol):
+    def answer(self, item: SessionQuestion) -> tuple[int, int] | None:
+        """``(answer_index, response_ms)`` for ``item``, or None when there are no answers left."""
+
+
+class ScriptedAnswers:
+    """Answers read one per line as ``<choice> [response_ms]``, with 1-based choices like the prompt.
+
+    Blank lines and lines starting with ``#`` are skipped.
+    """
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._lines: Iterator[tuple[int, str]] = enumerate(lines, start=1)
+
+    def answer(self, item: SessionQuestion) -> tuple[int, int] | None:
+        for number, line in self._lines:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) > 2 or not all(field.isdigit() for field in fields):
+                raise AnswerError(f"Answer line {number}: expected '<choice> [response_ms]', got {line.strip()!r}")
+            choice = int(fields[0])
+            choice_count = len(item.question.choices)
+            if not 1 <= choice <= choice_count:
+                raise AnswerError(f"Answer line {number}: choice {choice} is not between 1 and {choice_count}")
+            response_ms = int(fields[1]) if len(fields) == 2 else DEFAULT_RESPONSE_MS
+            return choice - 1, response_ms
+        return None
+
+
+class AutoAnswers:
+    """Answers chosen by ``policy`` with simulated response times, reproducible from ``seed``.
+
+    ``policy`` is ``correct``, ``incorrect``, ``random`` (any choice), or the
+    probability of answering correctly, e.g. ``0.8``.
+    """
+
+    def __init__(self, policy: str, seed: int) -> None:
+        self.accuracy = _parse_policy(policy)
+        self.rng = random.Random(seed)
+
+    def answer(self, item: SessionQuestion) -> tuple[int, int]:
+        question = item.question
+        response_ms = int(self.rng.lognormvariate(RESPONSE_MS_MU, RESPONSE_MS_SIGMA))
+        if self.accuracy is None:
+            return self.rng.randrange(len(question.choices)), response_ms
+        if self.rng.random() < self.accuracy:
+            return question.correct_index, response_ms
+        wrong = [idx for idx in range(len(question.choices)) if idx != question.correct_index]
+        return self.rng.choice(wrong), response_ms
+
+
+def _parse_policy(policy: str) -> float | None:
+    """Probability of a correct answer, or None for uniformly random answers."""
+    named = {"correct": 1.0, "incorrect": 0.0, "random": None}
+    if policy in named:
+        return named[policy]
+    try:
+        accuracy = float(policy)
+    except ValueError:
+        accuracy = -1.0
+    if not 0.0 <= accuracy <= 1.0:
+        raise ValueError(
+            f"Auto-answer policy must be one of {', '.join(AUTO_POLICIES)} or a probability between 0 and 1"
+        )
+    return accuracy
@@ -1,146 +1,164 @@
 from __future__ import annotations
 
+from typing import Iterable, Iterator
+
 from jp_agent.models import CardSpec
 from jp_agent.vocab import KanaEntry, KanjiEntry, KeigoEntry, PhraseEntry, VocabStore
 
+# (mode, level) of the cards built from each ``vocab.EXPECTED_FILES`` section.
+SECTION_SCOPES: dict[str, tuple[str, str | None]] = {
+    "hiragana": ("hiragana", None),
+    "katakana": ("katakana", None),
+    "keigo": ("keigo", None),
+    "core_vocab": ("vocab", None),
+    "survival": ("survival", None),
+    "kanji_N5": ("kanji", "N5"),
+    "kanji_N4": ("kanji", "N4"),
+    "kanji_N3": ("kanji", "N3"),
+    "kanji_N2": ("kanji", "N2"),
+}
 
-def build_kana_cards(mode: str, entries: list[KanaEntry]) -> list[CardSpec]:
-    cards: list[CardSpec] = []
+
+def iter_kana_cards(mode: str, entries: Iterable[KanaEntry]) -> Iterator[CardSpec]:
     for entry in entries:
         kana = entry.kana
-        cards.append(
-            CardSpec(
-                card_id=f"{mode}:{kana}:kana_to_romaji",
-                mode=mode,
-                level=None,
-                variant="kana_to_romaji",
-                vocab_key=kana,
-            )
+        yield CardSpec(
+            card_id=f"{mode}:{kana}:kana_to_romaji",
+            mode=mode,
+            level=None,
+            variant="kana_to_romaji",
+            vocab_key=kana,
         )
-        cards.append(
-            CardSpec(
-                card_id=f"{mode}:{kana}:romaji_to_kana",
-                mode=mode,
-                level=None,
-                variant="romaji_to_kana",
-                vocab_key=kana,
-            )
+        yield CardSpec(
+            card_id=f"{mode}:{kana}:romaji_to_kana",
+            mode=mode,
+            level=None,
+            variant="romaji_to_kana",
+            vocab_key=kana,
         )
-    return cards
 
 
-def build_kanji_cards(level: str, entries: list[KanjiEntry]) -> list[CardSpec]:
-    cards: list[CardSpec] = []
+def iter_kanji_cards(level: str, entries: Iterable[KanjiEntry]) -> Iterator[CardSpec]:
     for entry in entries:
         kanji = entry.kanji
-        cards.append(
-            CardSpec(
-                card_id=f"kanji:{level}:{kanji}:kanji_to_meaning",
-                mode="kanji",
-                level=level,
-                variant="kanji_to_meaning",
-                vocab_key=kanji,
-            )
+        yield CardSpec(
+            card_id=f"kanji:{level}:{kanji}:kanji_to_meaning",
+            mode="kanji",
+            level=level,
+            variant="kanji_to_meaning",
+            vocab_key=kanji,
         )
-        cards.append(
-            CardSpec(
-                card_id=f"kanji:{level}:{kanji}:meaning_to_kanji",
-                mode="kanji",
-                level=level,
-                variant="meaning_to_kanji",
-                vocab_key=kanji,
-            )
+        yield CardSpec(
+            card_id=f"kanji:{level}:{kanji}:meaning_to_kanji",
+            mode="kanji",
+            level=level,
+            variant="meaning_to_kanji",
+            vocab_key=kanji,
         )
-    return cards
 
 
-def build_keigo_cards(entries: list[KeigoEntry]) -> list[CardSpec]:
-    cards: list[CardSpec] = []
+def iter_keigo_cards(entries: Iterable[KeigoEntry]) -> Iterator[CardSpec]:
     for entry in entries:
         base = entry.base
-        cards.append(
-            CardSpec(
-                card_id=f"keigo:{base}:plain_to_keigo",
-                mode="keigo",
-                level=None,
-                variant="plain_to_keigo",
-                vocab_key=base,
-            )
+        yield CardSpec(
+            card_id=f"keigo:{base}:plain_to_keigo",
+            mode="keigo",
+            level=None,
+            variant="plain_to_keigo",
+            vocab_key=base,
         )
-        cards.append(
-            CardSpec(
-                card_id=f"keigo:{base}:context_selection",
-                mode="keigo",
-                level=None,
-                variant="context_selection",
-                vocab_key=base,
-            )
+        yield CardSpec(
+            card_id=f"keigo:{base}:context_selection",
+            mode="keigo",
+            level=None,
+            variant="context_selection",
+            vocab_key=base,
         )
-        cards.append(
-            CardSpec(
-                card_id=f"keigo:{base}:politeness_classification",
-                mode="keigo",
-                level=None,
-                variant="politeness_classification",
-                vocab_key=base,
-            )
+        yield CardSpec(
+            card_id=f"keigo:{base}:politeness_classification",
+            mode="keigo",
+            level=None,
+            variant="politeness_classification",
+            vocab_key=base,
         )
-    return cards
 
 
-def build_phrase_cards(mode: str, entries: list[PhraseEntry]) -> list[CardSpec]:
-    cards: list[CardSpec] = []
+def iter_phrase_cards(mode: str, entries: Iterable[PhraseEntry]) -> Iterator[CardSpec]:
     for entry in entries:
         key = entry.english
-        cards.append(
-            CardSpec(
-                card_id=f"{mode}:{key}:english_to_japanese",
-                mode=mode,
-                level=None,
-                variant="english_to_japanese",
-                vocab_key=key,
-            )
+        yield CardSpec(
+            card_id=f"{mode}:{key}:english_to_japanese",
+            mode=mode,
+            level=None,
+            variant="english_to_japanese",
+            vocab_key=key,
         )
-        cards.append(
-            CardSpec(
-                card_id=f"{mode}:{key}:japanese_to_english",
-                mode=mode,
-                level=None,
-                variant="japanese_to_english",
-                vocab_key=key,
-            )
+        yield CardSpec(
+            card_id=f"{mode}:{key}:japanese_to_english",
+            mode=mode,
+            level=None,
+            variant="japanese_to_english",
+            vocab_key=key,
         )
-    return cards
 
 
-def build_all_cards(vocab: VocabStore) -> list[CardSpec]:
-    cards: list[CardSpec] = []
-    cards.extend(build_kana_cards("hiragana", vocab.hiragana))
-    cards.extend(build_kana_cards("katakana", vocab.katakana))
+def iter_all_cards(vocab: VocabStore) -> Iterator[CardSpec]:
+    yield from iter_kana_cards("hiragana", vocab.hiragana)
+    yield from iter_kana_cards("katakana", vocab.katakana)
     for level, entries in vocab.kanji.items():
-        cards.extend(build_kanji_cards(level, entries))
-    cards.extend(build_keigo_cards(vocab.keigo))
-    cards.extend(build_phrase_cards("vocab", vocab.core_vocab))
-    cards.extend(build_phrase_cards("survival", vocab.survival_phrases))
-    return cards
+        yield from iter_kanji_cards(level, entries)
+    yield from iter_keigo_cards(vocab.keigo)
+    yield from iter_phrase_cards("vocab", vocab.core_vocab)
+    yield from iter_phrase_cards("survival", vocab.survival_phrases)
 
 
-def parse_vocab_key(card_id: str, mode: str) -> str:
-    parts = card_id.split(":")
+def iter_section_cards(section: str, entries: Iterable) -> Iterator[CardSpec]:
+    mode, level = SECTION_SCOPES[section]
     if mode in {"hiragana", "katakana"}:
-        if len(parts) < 3:
-            raise ValueError(f"Invalid card_id for kana: {card_id}")
-        return parts[1]
+        return iter_kana_cards(mode, entries)
     if mode == "kanji":
-        if len(parts) < 4:
-            raise ValueError(f"Invalid card_id for kanji: {card_id}")
-        return parts[2]
+        return iter_kanji_cards(level, entries)
     if mode == "keigo":
-        if len(parts) < 3:
-            raise ValueError(f"Invalid card_id for keigo: {card_id}")
-        return parts[1]
-    if mode in {"vocab", "survival"}:
-        if len(parts) < 3:
-            raise ValueError(f"Invalid card_id for {mode}: {card_id}")
-        return parts[1]
-    raise ValueError(f"Unsupported mode for card_id parse: {mode}")
+        return iter_keigo_cards(entries)
+    return iter_phrase_cards(mode, entries)
+
+
+def build_kana_cards(mode: str, entries: list[KanaEntry]) -> list[CardSpec]:
+    return list(iter_kana_cards(mode, entries))
+
+
+def build_kanji_cards(level: str, entries: list[KanjiEntry]) -> list[CardSpec]:
+    return list(iter_kanji_cards(level, entries))
+
+
+def build_keigo_cards(entries: list[KeigoEntry]) -> list[CardSpec]:
+    return list(iter_keigo_cards(entries))
+
+
+def build_phrase_cards(mode: str, entries: list[PhraseEntry]) -> list[CardSpec]:
+    return list(iter_phrase_cards(mode, entries))
+
+
+def build_all_cards(vocab: VocabStore) -> list[CardSpec]:
+    return list(iter_all_cards(vocab))
+
+
+def parse_vocab_key(card_id: str, mode: str) -> str:
+    """Recover the vocab key from a card_id built by the ``iter_*_cards`` functions.
+
+    The key sits between the ``mode[:level]`` prefix and the trailing variant,
+    and may itself contain ':' (e.g. "Time: 3 o'clock"). Only used to backfill
+    ``cards.vocab_key`` for rows written by older versions.
+    """
+    if mode in {"hiragana", "katakana"}:
+        label, prefix_parts = "kana", 1
+    elif mode == "kanji":
+        label, prefix_parts = "kanji", 2
+    elif mode in {"keigo", "vocab", "survival"}:
+        label, prefix_parts = mode, 1
+    else:
+        raise ValueError(f"Unsupported mode for card_id parse: {mode}")
+    parts = card_id.split(":", prefix_parts)
+    if len(parts) <= prefix_parts or ":" not in parts[-1]:
+        raise ValueError(f"Invalid card_id for {label}: {card_id}")
+    return parts[-1].rsplit(":", 1)[0]
@@ -1,26 +1,39 @@
 from __future__ import annotations
 
 import sys
+from dataclasses import replace
 from datetime import date, datetime, timedelta, timezone
+from itertools import chain
 from pathlib import Path
 
 import typer
 
 from jp_agent import db
-from jp_agent.cards import build_all_cards
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.answers import AnswerError, AutoAnswers, ScriptedAnswers
+from jp_agent.cards import SECTION_SCOPES, iter_section_cards
+from jp_agent.confusables import ConfusableIndex
 from jp_agent.config import resolve_paths
-from jp_agent.llm import get_llm_config
+from jp_agent.explanations import ExplanationCache
+from jp_agent.journal import ReviewJournal
+from jp_agent.llm import LlmConfig, get_llm_config
 from jp_agent.models import StudyRequest
 from jp_agent.quiz import run_quiz
+from jp_agent.ratelimit import RateLimits, TokenBucketLimiter
 from jp_agent.utils import sanitize_text
 from jp_agent.vocab import (
+    DEFAULT_WORKERS,
     EXPECTED_FILES,
-    compute_sha256,
-    load_all_vocab,
-    load_vocab_for_mode,
+    STREAM_SYNC_BYTES,
+    LazyVocabStore,
+    cached_sha256_fingerprints,
+    iter_section,
+    load_sections,
     resolve_vocab_path,
     verify_vocab_hashes,
 )
+from jp_agent.vocab_cache import VocabCache
+from jp_agent.warmup import DEFAULT_WARM_WORKERS, warm_explanations
 
 app = typer.Typer(no_args_is_help=True)
 
@@ -29,21 +42,49 @@ app = typer.Typer(no_args_is_help=True)
 def init(
     sync: bool = typer.Option(False, "--sync", help="Build or update cards from vocab files"),
     db_path: str | None = typer.Option(None, "--db", help="Path to SQLite DB"),
+    paranoid: bool = typer.Option(False, "--paranoid", help="Rehash every vocab file even if its stat is unchanged"),
+    workers: int = typer.Option(DEFAULT_WORKERS, "--workers", min=1, help="Vocab files to hash and load in parallel"),
 ) -> None:
     paths = resolve_paths(db_path)
     conn = db.connect(paths.db_path)
     db.ensure_schema(conn)
 
-    for filename in EXPECTED_FILES.values():
-        vocab_path = resolve_vocab_path(paths.data_dir, filename)
-        sha = compute_sha256(vocab_path)
-        db.upsert_vocab_hash(conn, filename, sha)
+    vocab_paths = {filename: resolve_vocab_path(paths.data_dir, filename) for filename in EXPECTED_FILES.values()}
+    hashes = cached_sha256_fingerprints(conn, vocab_paths, paranoid=paranoid, workers=workers)
+    changed: dict[str, str] = {}
+    for section, filename in EXPECTED_FILES.items():
+        sha, fingerprint = hashes[filename]
+        row = db.get_vocab_file(conn, filename)
+        if row is None or row["sha256"] != sha:
+            db.upsert_vocab_hash(conn, filename, sha, fingerprint)
+        if row is None or row["cards_sha256"] != sha:
+            changed[section] = sha
 
     if sync:
-        vocab = load_all_vocab(paths.data_dir)
-        cards = build_all_cards(vocab)
-        db.sync_cards(conn, cards, date.today().isoformat())
-        print("Synced cards from vocab files.")
+        if changed:
+            # Only files whose cards were built from an older version are reloaded,
+            # and the card diff is limited to their modes and levels. Very large
+            # files are streamed into the diff so memory stays bounded.
+            cache = VocabCache(paths.cache_dir, db.list_vocab_hashes(conn))
+            streamed = {
+                section
+                for section in changed
+                if vocab_paths[EXPECTED_FILES[section]].stat().st_size >= STREAM_SYNC_BYTES
+            }
+            in_memory = [section for section in changed if section not in streamed]
+            loaded = load_sections(paths.data_dir, in_memory, workers=workers, cache=cache)
+            entries = {
+                section: loaded[section] if section in loaded else iter_section(paths.data_dir, section)
+                for section in changed
+            }
+            cards = chain.from_iterable(iter_section_cards(section, entries[section]) for section in changed)
+            scopes = [SECTION_SCOPES[section] for section in changed]
+            db.sync_cards(conn, cards, date.today().isoformat(), scopes=scopes)
+            for section, sha in changed.items():
+                db.mark_cards_synced(conn, EXPECTED_FILES[section], sha)
+            print(f"Synced cards from vocab files: {', '.join(EXPECTED_FILES[section] for section in changed)}.")
+        else:
+            print("Cards are up to date with vocab files.")
 
     print(f"Initialized database at {paths.db_path}")
 
@@ -55,8 +96,29 @@ def study(
     context: str | None = typer.Option(None, "--context", help="Keigo context (email, meeting, etc.)"),
     count: int = typer.Option(30, "--count", help="Number of questions"),
     db_path: str | None = typer.Option(None, "--db", help="Path to SQLite DB"),
+    paranoid: bool = typer.Option(False, "--paranoid", help="Rehash vocab files even if their stat is unchanged"),
+    stream: bool = typer.Option(False, "--stream", help="Stream keigo LLM explanations as they are written"),
+    answers_from: str | None = typer.Option(
+        None, "--answers-from", help="Read answers ('<choice> [response_ms]' per line) from a file, or - for stdin"
+    ),
+    auto_answer: str | None = typer.Option(
+        None, "--auto-answer", help="Answer automatically: correct, incorrect, random, or a probability of correct"
+    ),
+    jsonl: bool = typer.Option(False, "--jsonl", help="Write JSON Lines events instead of text (needs scripted answers)"),
+    seed: int | None = typer.Option(
+        None, "--seed", help="Seed for card choice, questions and automatic answers (default: the clock)"
+    ),
 ) -> None:
     mode = mode.lower().strip()
+    if answers_from is not None and auto_answer is not None:
+        print("Use either --answers-from or --auto-answer, not both")
+        raise typer.Exit(code=2)
+    if jsonl and answers_from is None and auto_answer is None:
+        print("--jsonl requires --answers-from or --auto-answer")
+        raise typer.Exit(code=2)
+    if jsonl and stream:
+        print("--stream cannot be combined with --jsonl")
+        raise typer.Exit(code=2)
     if mode not in {"kana", "hiragana", "katakana", "kanji", "keigo", "vocab", "survival"}:
         print("Mode must be one of: kana, hiragana, katakana, kanji, keigo, vocab, survival")
         raise typer.Exit(code=2)
@@ -72,21 +134,68 @@ def study(
     else:
         level = None
 
+    if seed is None:
+        # Microseconds, so unattended sessions started together still differ.
+        seed = int(datetime.now(timezone.utc).timestamp() * 1_000_000)
+    answers = None
+    if auto_answer is not None:
+        try:
+            answers = AutoAnswers(auto_answer, seed)
+        except ValueError as exc:
+            print(str(exc))
+            raise typer.Exit(code=2)
+    elif answers_from == "-":
+        answers = ScriptedAnswers(sys.stdin)
+    elif answers_from is not None:
+        try:
+            answers = ScriptedAnswers(Path(answers_from).read_text(encoding="utf-8").splitlines())
+        except OSError as exc:
+            print(f"Cannot read answers: {exc}")
+            raise typer.Exit(code=1)
+
     paths = resolve_paths(db_path)
     conn = db.connect(paths.db_path)
     db.ensure_schema(conn)
 
     try:
-        verify_vocab_hashes(conn, paths.data_dir, mode, level)
+        verify_vocab_hashes(conn, paths.data_dir, mode, level, paranoid=paranoid)
     except Exception as exc:
         print(str(exc))
         raise typer.Exit(code=1)
 
-    vocab = load_vocab_for_mode(paths.data_dir, mode, level)
-    seed = int(datetime.now(timezone.utc).timestamp())
+    cache = VocabCache(paths.cache_dir, db.list_vocab_hashes(conn))
+    vocab = LazyVocabStore(paths.data_dir, cache=cache)
     request = StudyRequest(mode=mode, level=level, context=context, count=count, seed=seed)
     llm_config = get_llm_config() if mode == "keigo" else None
-    run_quiz(conn, request, vocab, llm_config)
+    explanations = None
+    if llm_config is not None:
+        explanations = ExplanationCache(paths.db_path)
+        llm_config = _with_rate_limiter(llm_config, paths.db_path, _env_rate_limits())
+    journal = ReviewJournal(conn, paths.journal_path)
+    journal.replay()
+    try:
+        run_quiz(
+            conn,
+            request,
+            vocab,
+            llm_config,
+            journal=journal,
+            confusables=ConfusableIndex(vocab, cache=cache),
+            explanations=explanations,
+            stream=stream,
+            answers=answers,
+            jsonl=jsonl,
+        )
+    except AnswerError as exc:
+        if not jsonl:
+            # JSON Lines output already carries it as an ``error`` event.
+            print(str(exc))
+        raise typer.Exit(code=1)
+    finally:
+        journal.close()
+        if llm_config is not None:
+            explanations.close()
+            llm_config.rate_limiter.close()
 
 
 @app.command()
@@ -96,6 +205,7 @@ def stats(
     paths = resolve_paths(db_path)
     conn = db.connect(paths.db_path)
     db.ensure_schema(conn)
+    ReviewJournal(conn, paths.journal_path).replay()
 
     today_iso = date.today().isoformat()
     overview = db.stats_overview(conn)
@@ -125,5 +235,75 @@ def stats(
             print(f"- {row['mode']}: total {row['total']}, due {row['due']}")
 
 
+@app.command("warm-explanations")
+def warm_explanations_command(
+    db_path: str | None = typer.Option(None, "--db", help="Path to SQLite DB"),
+    workers: int = typer.Option(DEFAULT_WARM_WORKERS, "--workers", min=1, help="LLM calls in flight at once"),
+    rpm: float | None = typer.Option(None, "--rpm", min=0.1, help="LLM requests per minute (default: JP_AGENT_LLM_RPM or 60)"),
+    tpm: float | None = typer.Option(None, "--tpm", min=1, help="LLM tokens per minute (default: JP_AGENT_LLM_TPM or none)"),
+    burst: int | None = typer.Option(None, "--burst", min=1, help="Requests allowed back to back (default: JP_AGENT_LLM_BURST or 1)"),
+    paranoid: bool = typer.Option(False, "--paranoid", help="Rehash vocab files even if their stat is unchanged"),
+) -> None:
+    llm_config = get_llm_config()
+    if llm_config is None:
+        print("Set OPENAI_API_KEY and OPENAI_MODEL to warm explanations.")
+        raise typer.Exit(code=1)
+
+    paths = resolve_paths(db_path)
+    conn = db.connect(paths.db_path)
+    db.ensure_schema(conn)
+    try:
+        verify_vocab_hashes(conn, paths.data_dir, "keigo", None, paranoid=paranoid)
+    except Exception as exc:
+        print(str(exc))
+        raise typer.Exit(code=1)
+
+    vocab = LazyVocabStore(paths.data_dir, cache=VocabCache(paths.cache_dir, db.list_vocab_hashes(conn)))
+    limits = _env_rate_limits()
+    limits = replace(
+        limits,
+        requests_per_minute=rpm or limits.requests_per_minute,
+        tokens_per_minute=tpm or limits.tokens_per_minute,
+        burst=burst or limits.burst,
+    )
+    llm_config = _with_rate_limiter(llm_config, paths.db_path, limits)
+    explanations = ExplanationCache(paths.db_path)
+    # Warm-up has no learner waiting, so it sleeps for budget instead of giving up on a call.
+    generator = ContentGeneratorAgent(vocab, llm_config, explanations=explanations, wait_for_budget=True)
+    try:
+        report = warm_explanations(generator, vocab.keigo, workers=workers)
+    finally:
+        explanations.close()
+        llm_config.rate_limiter.close()
+
+    print(f"Accepted: {report.accepted}")
+    print(f"Rejected by verifier: {report.rejected}")
+    print(f"Already cached: {report.cached}")
+    print(f"Waited for rate limit: {llm_config.rate_limiter.waited:.1f}s")
+    client = generator.llm_client
+    print(
+        f"LLM latency: p50 <= {client.latency.quantile(0.5):g}s, p95 <= {client.latency.quantile(0.95):g}s "
+        f"over {client.calls} calls (timeouts: {client.timeouts}, errors: {client.errors}, "
+        f"coalesced: {client.coalesced}, skipped by open circuit: {client.short_circuited})"
+    )
+    for failure in report.failures:
+        print(f"Failed: {sanitize_text(failure)}")
+    if report.failures:
+        raise typer.Exit(code=1)
+
+
+def _env_rate_limits() -> RateLimits:
+    try:
+        return RateLimits.from_env()
+    except ValueError as exc:
+        print(str(exc))
+        raise typer.Exit(code=2)
+
+
+def _with_rate_limiter(llm_config: LlmConfig, db_path: Path, limits: RateLimits) -> LlmConfig:
+    # One bucket per model in the app DB, so every jp-agent process on this DB shares its budget.
+    return replace(llm_config, rate_limiter=TokenBucketLimiter(db_path, llm_config.model, limits))
+
+
 if __name__ == "__main__":
     app()
@@ -14,6 +14,14 @@ class Paths:
     data_dir: Path
     db_path: Path
 
+    @property
+    def journal_path(self) -> Path:
+        return self.db_path.with_name(f"{self.db_path.name}.reviews.jsonl")
+
+    @property
+    def cache_dir(self) -> Path:
+        return self.db_path.with_name(f"{self.db_path.name}.vocab-cache")
+
 
 def resolve_paths(db_path: str | None = None, data_dir: str | None = None) -> Paths:
     env_db = os.getenv("JP_AGENT_DB")
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from jp_agent.vocab import VocabStore
+
+if TYPE_CHECKING:
+    from jp_agent.vocab_cache import VocabCache
+
+# Nearest neighbours kept per entry; the generator samples its distractors from these.
+CONFUSABLE_NEIGHBOURS = 8
+# Candidate buckets (shared romaji deletions, shared meaning words) larger than
+# this carry no signal and would make the build quadratic, so they are skipped.
+MAX_BUCKET_SIZE = 256
+SHAPE_WEIGHT = 2.0
+
+# Characters that are easy to mistake for one another at a glance.
+SHAPE_GROUPS = (
+    "シツ",
+    "ソンリ",
+    "ノメ",
+    "クケタ",
+    "ウワフ",
+    "コユロ",
+    "チテ",
+    "ヌス",
+    "マム",
+    "ナメ",
+    "ぬめ",
+    "わねれ",
+    "はほ",
+    "るろ",
+    "さきち",
+    "いり",
+    "あお",
+    "まも",
+    "未末",
+    "土士",
+    "日目曰",
+    "人入八",
+    "大犬太",
+    "王玉",
+    "千干",
+    "右石",
+    "見貝",
+)
+
+_WORD = re.compile(r"[a-z]+")
+_STOPWORDS = frozenset({"a", "an", "the", "to", "of", "be", "in", "on"})
+
+
+def edit_distance(left: str, right: str) -> int:
+    """Levenshtein distance between two short strings."""
+    previous = list(range(len(right) + 1))
+    for row, left_char in enumerate(left, start=1):
+        current = [row]
+        for column, right_char in enumerate(right, start=1):
+            current.append(
+                min(
+                    previous[column] + 1,
+                    current[column - 1] + 1,
+                    previous[column - 1] + (left_char != right_char),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def build_confusables(section: str, entries: Sequence) -> dict[str, tuple[str, ...]]:
+    """Map each entry's key to the keys of its most confusable entries, closest first.
+
+    Kana are compared by shape group and romaji edit distance, kanji by shape
+    group and overlap between their English meanings. Pairs that would both be
+    correct answers (same romaji, a shared meaning) are never listed.
+    """
+    if section in {"hiragana", "katakana"}:
+        return _rank(_kana_features(entries), _kana_score)
+    if section.startswith("kanji_"):
+        return _rank(_kanji_features(entries), _kanji_score)
+    raise ValueError(f"No confusable index for section: {section}")
+
+
+class ConfusableIndex:
+    """Per-section confusable neighbours for a ``VocabStore``.
+
+    Each section's table is built the first time a card from it is asked for.
+    With a ``cache`` the table is stored next to the compiled section, keyed by
+    the vocab file's sha256, so it is only ever computed once per vocab version.
+    """
+
+    def __init__(self, vocab: VocabStore, cache: VocabCache | None = None) -> None:
+        self.vocab = vocab
+        self.cache = cache
+        self._tables: dict[str, dict[str, tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def neighbours(self, mode: str, level: str | None, key: str) -> tuple[str, ...]:
+        if mode in {"hiragana", "katakana"}:
+            section, entries = mode, self.vocab.kana_by_mode(mode)
+        elif mode == "kanji":
+            section, entries = f"kanji_{level}", self.vocab.kanji_by_level(level)
+        else:
+            return ()
+        with self._lock:
+            table = self._tables.get(section)
+            if table is None:
+                if self.cache is not None:
+                    table = self.cache.confusables(section, entries)
+                else:
+                    table = build_confusables(section, entries)
+                self._tables[section] = table
+        return table.get(key, ())
+
+
+def _kana_features(entries: Iterable) -> dict[str, tuple[frozenset[str], str]]:
+    return {entry.kana: (_shape_keys(entry.kana), entry.romaji) for entry in entries}
+
+
+def _kanji_features(entries: Iterable) -> dict[str, tuple[frozenset[str], frozenset[str], frozenset[str]]]:
+    features = {}
+    for entry in entries:
+        meanings = frozenset(meaning.lower() for meaning in entry.meaning)
+        words = frozenset(word for meaning in meanings for word in _WORD.findall(meaning)) - _STOPWORDS
+        features[entry.kanji] = (_shape_keys(entry.kanji), meanings, words)
+    return features
+
+
+def _kana_score(left, right) -> float:
+    if left[1] == right[1]:
+        return 0.0
+    shape = SHAPE_WEIGHT if left[0] & right[0] else 0.0
+    return shape + 1.0 / (1 + edit_distance(left[1], right[1]))
+
+
+def _kanji_score(left, right) -> float:
+    if left[1] & right[1]:
+        return 0.0
+    shape = SHAPE_WEIGHT if left[0] & right[0] else 0.0
+    union = left[2] | right[2]
+    return shape + (len(left[2] & right[2]) / len(union) if union else 0.0)
+
+
+def _shape_keys(text: str) -> frozenset[str]:
+    if len(text) != 1:
+        return frozenset()
+    # Compare the base character, so ジ shares シ's group.
+    base = unicodedata.normalize("NFD", text)[0]
+    return frozenset(group for group in SHAPE_GROUPS if base in group)
+
+
+def _buckets(feature) -> Iterable[str]:
+    yield from (f"shape:{group}" for group in feature[0])
+    if isinstance(feature[1], str):
+        # Strings within one edit of each other share a single-character deletion.
+        romaji = feature[1]
+        yield f"romaji:{romaji}"
+        yield from (f"romaji:{romaji[:index]}{romaji[index + 1:]}" for index in range(len(romaji)))
+    else:
+        yield from (f"word:{word}" for word in feature[2])
+
+
+def _rank(features: dict, score) -> dict[str, tuple[str, ...]]:
+    buckets: dict[str, list[str]] = defaultdict(list)
+    for key, feature in features.items():
+        for bucket in _buckets(feature):
+            buckets[bucket].append(key)
+
+    candidates: dict[str, set[str]] = defaultdict(set)
+    for members in buckets.values():
+        if 1 < len(members) <= MAX_BUCKET_SIZE:
+            for key in members:
+                candidates[key].update(members)
+
+    table = {}
+    for key, others in candidates.items():
+        scored = sorted(
+            (-value, other)
+            for other in others
+            if other != key and (value := score(features[key], features[other])) > 0
+        )
+        if scored:
+            table[key] = tuple(other for _, other in scored[:CONFUSABLE_NEIGHBOURS])
+    return table
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import random
 import sqlite3
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
+from typing import Iterable, Sequence
 
-from jp_agent.models import CardSpec
+from jp_agent.models import CardSpec, ReviewRecord
 
+SAMPLE_PROBE_FACTOR = 8
+SYNC_BATCH_SIZE = 5000
+# Card ids bound per ``fetch_cards`` query, under SQLite's oldest default variable limit (999).
+FETCH_BATCH_SIZE = 900
 
-def connect(db_path: Path) -> sqlite3.Connection:
+
+def connect(db_path: Path, check_same_thread: bool = True) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -30,10 +38,16 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
             interval INTEGER NOT NULL,
             due_date TEXT NOT NULL,
             last_result INTEGER,
-            last_reviewed_at TEXT
+            last_reviewed_at TEXT,
+            rand_key INTEGER DEFAULT (RANDOM()),
+            vocab_key TEXT
         )
         """
     )
+    if _ensure_column(conn, "cards", "rand_key", "INTEGER"):
+        conn.execute("UPDATE cards SET rand_key = RANDOM() WHERE rand_key IS NULL")
+    if _ensure_column(conn, "cards", "vocab_key", "TEXT"):
+        _backfill_vocab_keys(conn)
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS reviews (
@@ -54,25 +68,97 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
         CREATE TABLE IF NOT EXISTS vocab_files (
             path TEXT PRIMARY KEY,
             sha256 TEXT NOT NULL,
-            updated_at TEXT NOT NULL
+            updated_at TEXT NOT NULL,
+            cards_sha256 TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS explanations (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            text TEXT NOT NULL,
+            accepted INTEGER,
+            created_at REAL NOT NULL,
+            used_at REAL NOT NULL
         )
         """
     )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            name TEXT PRIMARY KEY,
+            requests REAL NOT NULL,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    for column, decl in (("cards_sha256", "TEXT"), ("size", "INTEGER"), ("mtime_ns", "INTEGER"), ("inode", "INTEGER")):
+        _ensure_column(conn, "vocab_files", column, decl)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_due_date ON cards(due_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_mode_level_due ON cards(mode, level, due_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_mode_level_rand ON cards(mode, level, rand_key, due_date)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_reviewed_at ON reviews(reviewed_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_explanations_used_at ON explanations(used_at)")
     conn.commit()
 
 
-def upsert_vocab_hash(conn: sqlite3.Connection, path: str, sha256: str) -> None:
+def _ensure_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> bool:
+    """Add ``column`` to an existing ``table`` created by an older schema; return True if added."""
+    columns = {str(row["name"]) for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column in columns:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+def _backfill_vocab_keys(conn: sqlite3.Connection) -> None:
+    from jp_agent.cards import parse_vocab_key
+
+    updates = []
+    for row in conn.execute("SELECT card_id, mode FROM cards WHERE vocab_key IS NULL").fetchall():
+        try:
+            updates.append((parse_vocab_key(row["card_id"], row["mode"]), row["card_id"]))
+        except ValueError:
+            # Left NULL: a malformed legacy row must not break schema setup for
+            # every command; the planner parses NULL keys itself when it meets one.
+            continue
+    conn.executemany("UPDATE cards SET vocab_key = ? WHERE card_id = ?", updates)
+
+
+def upsert_vocab_hash(
+    conn: sqlite3.Connection,
+    path: str,
+    sha256: str,
+    fingerprint: tuple[int, int, int] | None = None,
+) -> None:
+    size, mtime_ns, inode = fingerprint or (None, None, None)
     conn.execute(
         """
-        INSERT INTO vocab_files (path, sha256, updated_at)
-        VALUES (?, ?, ?)
+        INSERT INTO vocab_files (path, sha256, updated_at, size, mtime_ns, inode)
+        VALUES (?, ?, ?, ?, ?, ?)
         ON CONFLICT(path) DO UPDATE SET
             sha256=excluded.sha256,
-            updated_at=excluded.updated_at
+            updated_at=excluded.updated_at,
+            size=excluded.size,
+            mtime_ns=excluded.mtime_ns,
+            inode=excluded.inode
         """,
-        (path, sha256, _utc_now_iso()),
+        (path, sha256, _utc_now_iso(), size, mtime_ns, inode),
+    )
+    conn.commit()
+
+
+def update_vocab_fingerprint(conn: sqlite3.Connection, path: str, fingerprint: tuple[int, int, int]) -> None:
+    size, mtime_ns, inode = fingerprint
+    conn.execute(
+        "UPDATE vocab_files SET size = ?, mtime_ns = ?, inode = ? WHERE path = ?",
+        (size, mtime_ns, inode, path),
     )
     conn.commit()
 
@@ -84,39 +170,90 @@ def get_vocab_hash(conn: sqlite3.Connection, path: str) -> str | None:
     return str(row["sha256"])
 
 
+def get_vocab_file(conn: sqlite3.Connection, path: str) -> sqlite3.Row | None:
+    return conn.execute("SELECT * FROM vocab_files WHERE path = ?", (path,)).fetchone()
+
+
+def mark_cards_synced(conn: sqlite3.Connection, path: str, sha256: str) -> None:
+    """Record that the cards built from ``path`` match the file with hash ``sha256``."""
+    conn.execute("UPDATE vocab_files SET cards_sha256 = ? WHERE path = ?", (sha256, path))
+    conn.commit()
+
+
 def list_vocab_hashes(conn: sqlite3.Connection) -> dict[str, str]:
     rows = conn.execute("SELECT path, sha256 FROM vocab_files").fetchall()
     return {str(row["path"]): str(row["sha256"]) for row in rows}
 
 
-def sync_cards(conn: sqlite3.Connection, cards: list[CardSpec], today_iso: str) -> None:
-    existing_rows = conn.execute("SELECT card_id FROM cards").fetchall()
-    existing_ids = {str(row["card_id"]) for row in existing_rows}
-    new_ids = {card.card_id for card in cards}
-
-    to_insert = [card for card in cards if card.card_id not in existing_ids]
-    to_delete = existing_ids - new_ids
+def sync_cards(
+    conn: sqlite3.Connection,
+    cards: Iterable[CardSpec],
+    today_iso: str,
+    scopes: Iterable[tuple[str, str | None]] | None = None,
+) -> None:
+    """Make the ``cards`` table match ``cards`` in one transaction.
 
-    for card in to_insert:
+    Specs are streamed into a temp table in batches and the insert/delete diff
+    is computed in SQL, so memory use does not grow with the deck size. Review
+    state of cards that already exist is left untouched. When ``scopes`` lists
+    ``(mode, level)`` pairs, only cards in those scopes are deleted.
+    """
+    conn.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS card_sync (
+            card_id TEXT PRIMARY KEY,
+            mode TEXT NOT NULL,
+            level TEXT,
+            variant TEXT NOT NULL,
+            vocab_key TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute("DELETE FROM card_sync")
+    card_iter = iter(cards)
+    while batch := list(islice(card_iter, SYNC_BATCH_SIZE)):
+        conn.executemany(
+            "INSERT OR IGNORE INTO card_sync (card_id, mode, level, variant, vocab_key) VALUES (?, ?, ?, ?, ?)",
+            [(card.card_id, card.mode, card.level, card.variant, card.vocab_key) for card in batch],
+        )
+    conn.execute(
+        """
+        INSERT INTO cards (
+            card_id, mode, level, variant, ease, interval, due_date, last_result, last_reviewed_at, rand_key, vocab_key
+        )
+        SELECT card_id, mode, level, variant, 2.0, 1, ?, NULL, NULL, RANDOM(), vocab_key
+        FROM card_sync
+        WHERE card_id NOT IN (SELECT card_id FROM cards)
+        """,
+        (today_iso,),
+    )
+    # Rows backfilled by parsing card_id (or inserted without a key) are
+    # corrected from the specs themselves.
+    conn.execute(
+        """
+        UPDATE cards SET vocab_key = card_sync.vocab_key
+        FROM card_sync
+        WHERE card_sync.card_id = cards.card_id AND cards.vocab_key IS NOT card_sync.vocab_key
+        """
+    )
+    if scopes is None:
+        conn.execute("DELETE FROM cards WHERE card_id NOT IN (SELECT card_id FROM card_sync)")
+    else:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS card_sync_scope (mode TEXT NOT NULL, level TEXT)")
+        conn.execute("DELETE FROM card_sync_scope")
+        conn.executemany("INSERT INTO card_sync_scope (mode, level) VALUES (?, ?)", list(scopes))
         conn.execute(
             """
-            INSERT INTO cards (card_id, mode, level, variant, ease, interval, due_date, last_result, last_reviewed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)
-            """,
-            (
-                card.card_id,
-                card.mode,
-                card.level,
-                card.variant,
-                2.0,
-                1,
-                today_iso,
-            ),
+            DELETE FROM cards
+            WHERE card_id NOT IN (SELECT card_id FROM card_sync)
+            AND EXISTS (
+                SELECT 1 FROM card_sync_scope
+                WHERE card_sync_scope.mode = cards.mode AND card_sync_scope.level IS cards.level
+            )
+            """
         )
-
-    if to_delete:
-        conn.executemany("DELETE FROM cards WHERE card_id = ?", [(card_id,) for card_id in to_delete])
-
+        conn.execute("DROP TABLE card_sync_scope")
+    conn.execute("DROP TABLE card_sync")
     conn.commit()
 
 
@@ -127,31 +264,9 @@ def fetch_due_cards(
     today_iso: str,
     limit: int,
     randomize: bool = False,
+    rng: random.Random | None = None,
 ) -> list[sqlite3.Row]:
-    order_clause = "RANDOM()" if randomize else "due_date ASC"
-    if level:
-        return conn.execute(
-            """
-            SELECT * FROM cards
-            WHERE mode = ? AND level = ? AND due_date <= ?
-            ORDER BY """
-            + order_clause
-            + """
-            LIMIT ?
-            """,
-            (mode, level, today_iso, limit),
-        ).fetchall()
-    return conn.execute(
-        """
-        SELECT * FROM cards
-        WHERE mode = ? AND due_date <= ?
-        ORDER BY """
-        + order_clause
-        + """
-        LIMIT ?
-        """,
-        (mode, today_iso, limit),
-    ).fetchall()
+    return _select_cards(conn, mode, level, "due_date <= ?", today_iso, limit, randomize, rng)
 
 
 def fetch_next_cards(
@@ -161,37 +276,89 @@ def fetch_next_cards(
     today_iso: str,
     limit: int,
     randomize: bool = False,
+    rng: random.Random | None = None,
+) -> list[sqlite3.Row]:
+    return _select_cards(conn, mode, level, "due_date > ?", today_iso, limit, randomize, rng)
+
+
+def _select_cards(
+    conn: sqlite3.Connection,
+    mode: str,
+    level: str | None,
+    due_clause: str,
+    today_iso: str,
+    limit: int,
+    randomize: bool,
+    rng: random.Random | None = None,
 ) -> list[sqlite3.Row]:
-    order_clause = "RANDOM()" if randomize else "due_date ASC"
-    if level:
+    # No level means any level: the filter is dropped and only the mode prefix
+    # of the indexes is used.
+    where = f"mode = ? AND level = ? AND {due_clause}" if level else f"mode = ? AND {due_clause}"
+    params = (mode, level, today_iso) if level else (mode, today_iso)
+    if not randomize:
         return conn.execute(
-            """
-            SELECT * FROM cards
-            WHERE mode = ? AND level = ? AND due_date > ?
-            ORDER BY """
-            + order_clause
-            + """
+            f"""
+            SELECT * FROM cards INDEXED BY idx_cards_mode_level_due
+            WHERE {where}
+            ORDER BY due_date ASC
             LIMIT ?
             """,
-            (mode, level, today_iso, limit),
+            (*params, limit),
         ).fetchall()
-    return conn.execute(
-        """
-        SELECT * FROM cards
-        WHERE mode = ? AND due_date > ?
-        ORDER BY """
-        + order_clause
-        + """
-        LIMIT ?
+
+    # Small candidate sets are read whole through the due-date index and sampled
+    # in Python; larger ones are sampled by walking the persisted random key
+    # from a random starting point, so only about ``limit`` rows are read.
+    # Both draw from ``rng`` when given, so a seeded plan picks the same cards.
+    probe_limit = limit * SAMPLE_PROBE_FACTOR
+    probe = conn.execute(
+        f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM cards INDEXED BY idx_cards_mode_level_due
+            WHERE {where}
+            LIMIT ?
+        )
         """,
-        (mode, today_iso, limit),
-    ).fetchall()
+        (*params, probe_limit),
+    ).fetchone()[0]
+    if probe < probe_limit:
+        rows = conn.execute(
+            f"""
+            SELECT * FROM cards INDEXED BY idx_cards_mode_level_due
+            WHERE {where}
+            """,
+            params,
+        ).fetchall()
+        return (rng or random).sample(rows, min(limit, len(rows)))
+
+    start = (rng or random).getrandbits(64) - 2**63
+    query = f"""
+        SELECT * FROM cards INDEXED BY idx_cards_mode_level_rand
+        WHERE {where} AND rand_key {{op}} ?
+        ORDER BY rand_key
+        LIMIT ?
+    """
+    rows = conn.execute(query.format(op=">="), (*params, start, limit)).fetchall()
+    if len(rows) < limit:
+        rows += conn.execute(query.format(op="<"), (*params, start, limit - len(rows))).fetchall()
+    return rows
 
 
 def fetch_card(conn: sqlite3.Connection, card_id: str) -> sqlite3.Row | None:
     return conn.execute("SELECT * FROM cards WHERE card_id = ?", (card_id,)).fetchone()
 
 
+def fetch_cards(conn: sqlite3.Connection, card_ids: Sequence[str]) -> dict[str, sqlite3.Row]:
+    """Rows for ``card_ids`` keyed by card_id, in one query per ``FETCH_BATCH_SIZE`` ids; missing cards are absent."""
+    rows: dict[str, sqlite3.Row] = {}
+    for start in range(0, len(card_ids), FETCH_BATCH_SIZE):
+        batch = card_ids[start : start + FETCH_BATCH_SIZE]
+        placeholders = ", ".join("?" * len(batch))
+        for row in conn.execute(f"SELECT * FROM cards WHERE card_id IN ({placeholders})", batch):
+            rows[row["card_id"]] = row
+    return rows
+
+
 def update_review(
     conn: sqlite3.Connection,
     card_id: str,
@@ -203,38 +370,75 @@ def update_review(
     interval_after: int,
     due_date_iso: str,
 ) -> None:
-    conn.execute(
+    review = ReviewRecord(
+        card_id=card_id,
+        correct=correct,
+        response_ms=response_ms,
+        ease_before=ease_before,
+        ease_after=ease_after,
+        interval_before=interval_before,
+        interval_after=interval_after,
+        due_date=due_date_iso,
+        reviewed_at=_utc_now_iso(),
+    )
+    apply_reviews(conn, [review])
+
+
+def apply_reviews(conn: sqlite3.Connection, reviews: Sequence[ReviewRecord], skip_existing: bool = False) -> int:
+    """Write a batch of reviews in a single transaction and return how many were applied.
+
+    With ``skip_existing`` reviews already logged for the same card and
+    timestamp are ignored, which makes replaying a journal idempotent.
+    """
+    if skip_existing:
+        reviews = [
+            review
+            for review in reviews
+            if conn.execute(
+                "SELECT 1 FROM reviews WHERE card_id = ? AND reviewed_at = ?",
+                (review.card_id, review.reviewed_at),
+            ).fetchone()
+            is None
+        ]
+    conn.executemany(
         """
         UPDATE cards
-        SET ease = ?, interval = ?, due_date = ?, last_result = ?, last_reviewed_at = ?
+        SET ease = ?, interval = ?, due_date = ?, last_result = ?, last_reviewed_at = ?, rand_key = RANDOM()
         WHERE card_id = ?
         """,
-        (
-            ease_after,
-            interval_after,
-            due_date_iso,
-            1 if correct else 0,
-            _utc_now_iso(),
-            card_id,
-        ),
+        [
+            (
+                review.ease_after,
+                review.interval_after,
+                review.due_date,
+                1 if review.correct else 0,
+                review.reviewed_at,
+                review.card_id,
+            )
+            for review in reviews
+        ],
     )
-    conn.execute(
+    conn.executemany(
         """
         INSERT INTO reviews (card_id, reviewed_at, correct, response_ms, ease_before, ease_after, interval_before, interval_after)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """,
-        (
-            card_id,
-            _utc_now_iso(),
-            1 if correct else 0,
-            response_ms,
-            ease_before,
-            ease_after,
-            interval_before,
-            interval_after,
-        ),
+        [
+            (
+                review.card_id,
+                review.reviewed_at,
+                1 if review.correct else 0,
+                review.response_ms,
+                review.ease_before,
+                review.ease_after,
+                review.interval_before,
+                review.interval_after,
+            )
+            for review in reviews
+        ],
     )
     conn.commit()
+    return len(reviews)
 
 
 def stats_overview(conn: sqlite3.Connection) -> dict[str, int]:
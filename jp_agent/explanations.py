@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from jp_agent import db
+from jp_agent.vocab import KeigoEntry
+
+DEFAULT_TTL = 30 * 24 * 3600.0
+DEFAULT_MAX_ENTRIES = 5000
+# Bump when the explanation prompt changes, so cached answers to the old prompt are not reused.
+PROMPT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CachedExplanation:
+    text: str
+    # True/False once the verifier has checked the text, None until then.
+    accepted: bool | None
+
+
+def explanation_key(entry: KeigoEntry, context: str | None, model: str) -> str:
+    """Hash of everything that goes into an explanation prompt."""
+    payload = [PROMPT_VERSION, model, entry.base, entry.keigo, entry.type, entry.meaning, entry.usage, context]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """LLM keigo explanations stored in the ``explanations`` table, keyed by ``explanation_key``.
+
+    Entries older than ``ttl`` seconds are treated as misses and deleted;
+    past ``max_entries`` the least recently used ones are evicted. The cache
+    has its own connection so the question prefetch thread can use it; calls
+    are serialized with a lock.
+    """
+
+    def __init__(self, db_path: Path, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = db.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            db.ensure_schema(self._conn)
+
+    def get(self, key: str) -> CachedExplanation | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT text, accepted, created_at FROM explanations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row["created_at"] < now - self.ttl:
+                self._conn.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE explanations SET used_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        accepted = None if row["accepted"] is None else bool(row["accepted"])
+        return CachedExplanation(text=row["text"], accepted=accepted)
+
+    def put(self, key: str, model: str, text: str, accepted: bool | None = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO explanations (key, model, text, accepted, created_at, used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    model=excluded.model,
+                    text=excluded.text,
+                    accepted=excluded.accepted,
+                    created_at=excluded.created_at,
+                    used_at=excluded.used_at
+                """,
+                (key, model, text, accepted, now, now),
+            )
+            self._conn.execute("DELETE FROM explanations WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                """
+                DELETE FROM explanations WHERE key IN (
+                    SELECT key FROM explanations ORDER BY used_at DESC, key LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def record_verdict(self, key: str, accepted: bool) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE explanations SET accepted = ? WHERE key = ?", (accepted, key))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
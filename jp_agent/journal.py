@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import fcntl
+import glob
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import TextIO
+
+from jp_agent import db
+from jp_agent.models import ReviewRecord
+
+DEFAULT_MAX_PENDING = 32
+DEFAULT_MAX_DELAY = 5.0
+
+
+class ReviewJournal:
+    """Write-behind buffer for review results.
+
+    Reviews are appended to a small JSON Lines file and queued in memory, then
+    written to SQLite in one transaction once ``max_pending`` reviews are queued
+    or, when the next review is recorded, the oldest one has waited
+    ``max_delay`` seconds. Nothing runs on a timer, so a lone answer waits for
+    the next one, the planner's next selection, or ``close()``. The file is
+    only flushed to the OS (not fsynced), which is enough to survive a crash of
+    the process; ``replay()`` applies whatever it still holds on the next start.
+
+    Each journal writes its own ``<stem>.<id><suffix>`` file next to ``path``
+    and holds an exclusive ``flock`` on it, so ``replay()`` in another process
+    only adopts files whose writer has exited.
+    """
+
+    def __init__(
+        self,
+        conn,
+        path: Path,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ) -> None:
+        self.conn = conn
+        self.base_path = path
+        self.path = path.with_name(f"{path.stem}.{uuid.uuid4().hex}{path.suffix}")
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self._pending: list[ReviewRecord] = []
+        self._latest: dict[str, ReviewRecord] = {}
+        self._oldest = 0.0
+        self._handle: TextIO | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def replay(self) -> int:
+        """Apply and remove journal files left by processes that no longer hold them."""
+        pattern = f"{glob.escape(self.base_path.stem)}*{self.base_path.suffix}"
+        applied = 0
+        for path in sorted(self.base_path.parent.glob(pattern)):
+            if path == self.path:
+                continue
+            try:
+                handle = path.open("r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # A live session still owns it.
+                    continue
+                if not _is_linked(handle, path):
+                    # Another replay adopted it before we got the lock.
+                    continue
+                applied += db.apply_reviews(self.conn, _read_reviews(handle), skip_existing=True)
+                path.unlink()
+        return applied
+
+    def record(self, review: ReviewRecord) -> None:
+        handle = self._open()
+        handle.write(json.dumps(asdict(review), ensure_ascii=False) + "\n")
+        handle.flush()
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append(review)
+        self._latest[review.card_id] = review
+        if len(self._pending) >= self.max_pending or time.monotonic() - self._oldest >= self.max_delay:
+            self.flush()
+
+    def card_row(self, row):
+        """Return ``row`` with the latest queued review for its card applied."""
+        if row is None:
+            return None
+        review = self._latest.get(str(row["card_id"]))
+        if review is None:
+            return row
+        merged = dict(row)
+        merged.update(
+            ease=review.ease_after,
+            interval=review.interval_after,
+            due_date=review.due_date,
+            last_result=1 if review.correct else 0,
+            last_reviewed_at=review.reviewed_at,
+        )
+        return merged
+
+    def flush(self) -> int:
+        if not self._pending:
+            return 0
+        applied = db.apply_reviews(self.conn, self._pending)
+        self._pending = []
+        self._latest = {}
+        if self._handle is not None:
+            self._handle.seek(0)
+            self._handle.truncate()
+        return applied
+
+    def close(self) -> None:
+        self.flush()
+        # Unlink while still holding the lock so no replay can adopt the file.
+        self.path.unlink(missing_ok=True)
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _open(self) -> TextIO:
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            while True:
+                handle = self.path.open("a", encoding="utf-8")
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                if _is_linked(handle, self.path):
+                    break
+                # A replay took the empty file between our open and our lock.
+                handle.close()
+            self._handle = handle
+        return self._handle
+
+
+def _is_linked(handle: TextIO, path: Path) -> bool:
+    """Whether ``path`` still names the file open as ``handle``."""
+    try:
+        return os.stat(path).st_ino == os.fstat(handle.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _read_reviews(handle: TextIO) -> list[ReviewRecord]:
+    reviews: list[ReviewRecord] = []
+    for line in handle:
+        try:
+            reviews.append(ReviewRecord(**json.loads(line)))
+        except (json.JSONDecodeError, TypeError):
+            # A torn final line from a crash mid-write; nothing after it was queued.
+            break
+    return reviews
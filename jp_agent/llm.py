@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jp_agent.ratelimit import TokenBucketLimiter
 
 
 @dataclass(frozen=True)
 class LlmConfig:
     client: object
     model: str
+    # Shared request/token budget; without one, each generator spaces its own calls.
+    rate_limiter: TokenBucketLimiter | None = None
 
 
 def get_llm_config() -> LlmConfig | None:
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Iterator
+
+from jp_agent.llm import LlmConfig
+from jp_agent.ratelimit import RateLimitExceeded
+
+# Seconds a caller waits for a completion, including any wait for rate-limit
+# budget. Kept under the prefetch deadline so a stalled call falls back to the
+# template before the quiz has to.
+DEFAULT_CALL_TIMEOUT = 6.0
+# Consecutive failed or timed-out calls that open the circuit.
+DEFAULT_FAILURE_THRESHOLD = 3
+# Seconds an open circuit skips the LLM before letting one trial call through.
+DEFAULT_RESET_AFTER = 30.0
+# Upper bounds in seconds of the latency histogram buckets; a final bucket holds the rest.
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+
+class LlmUnavailable(RuntimeError):
+    """The completion failed, missed its deadline, or was skipped by the open circuit."""
+
+
+class LatencyHistogram:
+    """Counts of call latencies per bucket of ``bounds``, safe to record from several threads."""
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.bounds, seconds)] += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile; ``inf`` past the last bound, 0.0 when empty."""
+        with self._lock:
+            counts = list(self.counts)
+        rank = q * sum(counts)
+        seen = 0
+        for bound, count in zip((*self.bounds, float("inf")), counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return 0.0
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            counts = list(self.counts)
+        labels = [f"<={bound:g}s" for bound in self.bounds] + [f">{self.bounds[-1]:g}s"]
+        return dict(zip(labels, counts))
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.future: Future = Future()
+        self.timed_out = False
+
+
+class CompletionClient:
+    """Chat completions with single-flight coalescing, a per-call deadline and a circuit breaker.
+
+    Callers asking for the same model, messages and parameters while a call
+    is in flight wait on that call instead of starting another; only the
+    first one spends rate-limit budget. Each call runs on a daemon thread and
+    a caller waits at most ``timeout`` seconds for it, counting the wait for
+    rate-limit budget; with ``wait_for_budget`` (batch warm-up) the budget
+    wait comes first and is unbounded. After
+    ``failure_threshold`` consecutive errors or timeouts the circuit opens:
+    calls raise ``LlmUnavailable`` without touching the API for
+    ``reset_after`` seconds, then one trial call decides whether it closes.
+    ``latency`` holds the duration of every finished call, including late ones.
+    """
+
+    def __init__(
+        self,
+        config: LlmConfig,
+        timeout: float = DEFAULT_CALL_TIMEOUT,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_after: float = DEFAULT_RESET_AFTER,
+        rate_limit: Callable[[int, float | None], None] | None = None,
+        wait_for_budget: bool = False,
+    ) -> None:
+        self.config = config
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.rate_limit = rate_limit
+        self.wait_for_budget = wait_for_budget
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+        self._failures = 0
+        self._open_until = 0.0
+        self._in_flight: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def circuit_open(self) -> bool:
+        with self._lock:
+            return self._failures >= self.failure_threshold and time.monotonic() < self._open_until
+
+    def complete(self, messages: list[dict[str, str]], max_tokens: int, temperature: float, tokens: int = 0) -> str:
+        """Return the stripped completion text; ``tokens`` is the budget charged to ``rate_limit``."""
+        params = {"model": self.config.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        key = json.dumps(params, ensure_ascii=False, sort_keys=True)
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                self._admit()
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self.coalesced += 1
+        started = time.monotonic()
+        if leader:
+            self._launch(key, flight, params, tokens)
+        timeout = self.timeout
+        if not self.wait_for_budget:
+            timeout = max(0.0, started + self.timeout - time.monotonic())
+        try:
+            return flight.future.result(timeout=timeout)
+        except FutureTimeout:
+            if leader:
+                with self._lock:
+                    flight.timed_out = True
+                    self.timeouts += 1
+                    self._record_failure()
+            raise LlmUnavailable(f"timed out after {self.timeout:g}s") from None
+        except Exception as exc:
+            raise LlmUnavailable(str(exc) or type(exc).__name__) from exc
+
+    def stream(self, messages: list[dict[str, str]], max_tokens: int, temperature: float, tokens: int = 0) -> Iterator[str]:
+        """Yield the completion text in pieces as they arrive.
+
+        Streams are not coalesced. ``timeout`` bounds each wait for the next
+        piece rather than the whole reply; a failure mid-stream raises
+        ``LlmUnavailable`` after the pieces already yielded and counts toward
+        the circuit breaker like a failed call.
+        """
+        params = {"model": self.config.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        with self._lock:
+            self._admit()
+        self._wait_for_rate_limit(tokens)
+        started = time.monotonic()
+        try:
+            with self.config.client.chat.completions.create(**params, stream=True, timeout=self.timeout) as response:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as exc:
+            self.latency.record(time.monotonic() - started)
+            with self._lock:
+                self._record_call(exc)
+            raise LlmUnavailable(str(exc) or type(exc).__name__) from exc
+        self.latency.record(time.monotonic() - started)
+        with self._lock:
+            self._record_call(None)
+
+    def _admit(self) -> None:
+        # Called with the lock held. Past ``_open_until`` the next call is the
+        # trial; pushing the deadline out keeps the others short-circuited until it ends.
+        if self._failures < self.failure_threshold:
+            return
+        now = time.monotonic()
+        if now < self._open_until:
+            self.short_circuited += 1
+            raise LlmUnavailable("circuit open")
+        self._open_until = now + self.reset_after
+
+    def _wait_for_rate_limit(self, tokens: int) -> None:
+        if self.rate_limit is None:
+            return
+        try:
+            self.rate_limit(tokens, None if self.wait_for_budget else self.timeout)
+        except RateLimitExceeded as exc:
+            raise LlmUnavailable(str(exc)) from exc
+
+    def _launch(self, key: str, flight: _Flight, params: dict, tokens: int) -> None:
+        try:
+            self._wait_for_rate_limit(tokens)
+        except BaseException as exc:
+            # No call was made, so this is not an LLM failure; waiting followers see the error too.
+            with self._lock:
+                del self._in_flight[key]
+            flight.future.set_exception(exc)
+            raise
+        threading.Thread(target=self._call, args=(key, flight, params), name="llm-call", daemon=True).start()
+
+    def _call(self, key: str, flight: _Flight, params: dict) -> None:
+        started = time.monotonic()
+        content, error = "", None
+        try:
+            # The client's own timeout ends the request so an abandoned thread does not linger.
+            response = self.config.client.chat.completions.create(**params, timeout=self.timeout)
+            content = (response.choices[0].message.content or "").strip()
+        except Exception as exc:
+            error = exc
+        self.latency.record(time.monotonic() - started)
+        self._finish(key, flight, content, error)
+
+    def _finish(self, key: str, flight: _Flight, result: str, exc: Exception | None) -> None:
+        with self._lock:
+            del self._in_flight[key]
+            self._record_call(exc, timed_out=flight.timed_out)
+        if exc is None:
+            flight.future.set_result(result)
+        else:
+            flight.future.set_exception(exc)
+
+    def _record_call(self, error: Exception | None, timed_out: bool = False) -> None:
+        # Called with the lock held. A timed-out call was already counted when its caller gave up.
+        self.calls += 1
+        if error is None:
+            self._failures = 0
+        elif not timed_out:
+            self.errors += 1
+            self._record_failure()
+
+    def _record_failure(self) -> None:
+        # Called with the lock held.
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._open_until = time.monotonic() + self.reset_after
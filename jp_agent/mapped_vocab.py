@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from dataclasses import fields
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from jp_agent.vocab import KanaEntry, KanjiEntry, KeigoEntry, PhraseEntry
+
+MAGIC = b"JPVMAP01"
+_HEADER = struct.Struct("<8sQ")
+
+# Fields that get a hash index, i.e. the ones the generator and verifier look
+# entries up by or check choices against.
+INDEX_FIELDS: dict[type, tuple[str, ...]] = {
+    KanaEntry: ("kana", "romaji"),
+    KanjiEntry: ("kanji", "meaning"),
+    KeigoEntry: ("base", "keigo"),
+    PhraseEntry: ("english", "japanese"),
+}
+_ENTRY_TYPES = {entry_type.__name__: entry_type for entry_type in INDEX_FIELDS}
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _values(value: Any) -> list[str]:
+    return value if isinstance(value, list) else [value]
+
+
+def write_mapped_section(path: Path, entry_type: type, entries: Iterable) -> None:
+    """Write ``entries`` in the memory-mappable section format.
+
+    Layout: a fixed header and a JSON description of the blocks, then one
+    offset table into the records block, a sorted (hash, position) index per
+    field in ``INDEX_FIELDS``, and the records themselves as compact JSON
+    arrays of field values.
+    """
+    getter = attrgetter(*(field.name for field in fields(entry_type)))
+    index_fields = INDEX_FIELDS[entry_type]
+    records = bytearray()
+    offsets = array("Q", [0])
+    pairs: dict[str, list[tuple[int, int]]] = {field: [] for field in index_fields}
+    for position, entry in enumerate(entries):
+        records += json.dumps(list(getter(entry)), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        offsets.append(len(records))
+        for field in index_fields:
+            for value in _values(getattr(entry, field)):
+                pairs[field].append((_hash(value), position))
+
+    blocks: list[bytes] = [offsets.tobytes()]
+    index_meta: dict[str, list[int]] = {}
+    for field in index_fields:
+        ordered = sorted(pairs[field])
+        blocks.append(array("Q", [pair[0] for pair in ordered]).tobytes())
+        blocks.append(array("I", [pair[1] for pair in ordered]).tobytes())
+        index_meta[field] = [len(blocks) - 2, len(blocks) - 1]
+    blocks.append(bytes(records))
+
+    # Block offsets depend on the metadata length, so grow the reserved space
+    # until the encoded metadata fits in it.
+    reserved = 0
+    while True:
+        position = _align(_HEADER.size + reserved)
+        spans = []
+        for block in blocks:
+            spans.append([position, len(block)])
+            position = _align(position + len(block))
+        meta = {
+            "entry_type": entry_type.__name__,
+            "count": len(offsets) - 1,
+            "byteorder": sys.byteorder,
+            "blocks": spans,
+            "indexes": index_meta,
+        }
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        if len(meta_bytes) <= reserved:
+            meta_bytes = meta_bytes.ljust(reserved)
+            break
+        reserved = len(meta_bytes)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, len(meta_bytes)))
+        handle.write(meta_bytes)
+        for (start, _length), block in zip(spans, blocks):
+            handle.write(b"\0" * (start - handle.tell()))
+            handle.write(block)
+    os.replace(tmp_path, path)
+
+
+def _align(position: int) -> int:
+    return (position + 7) & ~7
+
+
+class MappedSection(Sequence):
+    """Read-only vocab section backed by a memory-mapped file.
+
+    Entries are decoded on access, by position or through the per-field hash
+    indexes, so opening a section costs the same regardless of its size.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as handle:
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a mapped vocab file: {path}")
+        meta = json.loads(self._mm[_HEADER.size : _HEADER.size + meta_len])
+        if meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"Mapped vocab file has foreign byte order: {path}")
+        self.path = path
+        self.entry_type = _ENTRY_TYPES[meta["entry_type"]]
+        self._count = int(meta["count"])
+        self._view = memoryview(self._mm)
+        blocks = [self._view[start : start + length] for start, length in meta["blocks"]]
+        self._offsets = blocks[0].cast("Q")
+        self._records = blocks[-1]
+        self._indexes = {
+            field: (blocks[hashes].cast("Q"), blocks[positions].cast("I"))
+            for field, (hashes, positions) in meta["indexes"].items()
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("mapped section index out of range")
+        raw = self._records[self._offsets[index] : self._offsets[index + 1]]
+        return self.entry_type(*json.loads(bytes(raw)))
+
+    def __iter__(self) -> Iterator:
+        for position in range(self._count):
+            yield self[position]
+
+    def find(self, field: str, value: str):
+        """Return the first entry whose ``field`` equals (or, for lists, contains) ``value``."""
+        hashes, positions = self._indexes[field]
+        target = _hash(value)
+        slot = bisect_left(hashes, target)
+        while slot < len(hashes) and hashes[slot] == target:
+            entry = self[positions[slot]]
+            if value in _values(getattr(entry, field)):
+                return entry
+            slot += 1
+        return None
+
+    def column(self, field: str) -> MappedColumn:
+        return MappedColumn(self, field)
+
+    def key_map(self, field: str) -> MappedKeyMap:
+        return MappedKeyMap(self, field)
+
+    def close(self) -> None:
+        self._offsets.release()
+        self._records.release()
+        for hashes, positions in self._indexes.values():
+            hashes.release()
+            positions.release()
+        self._indexes = {}
+        self._view.release()
+        self._mm.close()
+
+
+class MappedColumn(Sequence):
+    """One field of a mapped section: indexable by position, ``in`` uses the hash index."""
+
+    def __init__(self, section: MappedSection, field: str) -> None:
+        self.section = section
+        self.field = field
+
+    def __len__(self) -> int:
+        return len(self.section)
+
+    def __getitem__(self, index):
+        return getattr(self.section[index], self.field)
+
+    def __contains__(self, value: object) -> bool:
+        return isinstance(value, str) and self.section.find(self.field, value) is not None
+
+
+class MappedKeyMap(Mapping):
+    """Read-only ``{field value: entry}`` view over a mapped section."""
+
+    def __init__(self, section: MappedSection, field: str) -> None:
+        self.section = section
+        self.field = field
+
+    def __getitem__(self, key: str):
+        entry = self.section.find(self.field, key) if isinstance(key, str) else None
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        for entry in self.section:
+            yield getattr(entry, self.field)
+
+    def __len__(self) -> int:
+        return len(self.section)
+
+
+def section_key_map(entries: Sequence, field: str) -> Mapping:
+    if isinstance(entries, MappedSection):
+        return entries.key_map(field)
+    return {getattr(entry, field): entry for entry in entries}
+
+
+def section_column(entries: Sequence, field: str) -> Sequence:
+    if isinstance(entries, MappedSection):
+        return entries.column(field)
+    return [getattr(entry, field) for entry in entries]
+
+
+def section_pool(entries: Sequence, field: str) -> Sequence[str]:
+    """Return the distinct values of ``field`` (list fields flattened) in entry order, indexable by position.
+
+    Mapped sections return their column as is; duplicates there are left to the caller.
+    """
+    if isinstance(entries, MappedSection):
+        return entries.column(field)
+    return tuple(dict.fromkeys(value for entry in entries for value in _values(getattr(entry, field))))
+
+
+def section_values(entries: Sequence, field: str):
+    """Return a container for ``in`` checks against every value of ``field`` (list fields flattened)."""
+    if isinstance(entries, MappedSection):
+        return entries.column(field)
+    return {value for entry in entries for value in _values(getattr(entry, field))}
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from typing import Any, Mapping
 
 
 @dataclass(frozen=True)
@@ -13,7 +13,7 @@ class StudyRequest:
     seed: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CardSpec:
     card_id: str
     mode: str
@@ -22,9 +22,31 @@ class CardSpec:
     vocab_key: str
 
 
+@dataclass(frozen=True, slots=True)
+class CardState:
+    ease: float
+    interval: int
+    due_date: str
+
+
 @dataclass(frozen=True)
 class Plan:
     card_specs: list[CardSpec]
+    # SRS state per card_id as of the planner's query; cards missing here are read before review.
+    states: Mapping[str, CardState] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ReviewRecord:
+    card_id: str
+    correct: bool
+    response_ms: int
+    ease_before: float
+    ease_after: float
+    interval_before: int
+    interval_after: int
+    due_date: str
+    reviewed_at: str
 
 
 @dataclass(frozen=True)
@@ -41,3 +63,12 @@ class VerifiedQuestion:
     valid: bool
     question: GeneratedQuestion
     issues: list[str]
+
+
+@dataclass(frozen=True)
+class BatchQuestion:
+    """One card's slot in a batch: the question, or ``None`` with the issues that stopped it."""
+
+    card: CardSpec
+    question: GeneratedQuestion | None
+    issues: list[str]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import queue
+import random
+import threading
+from typing import Callable, Iterator, Sequence
+
+from jp_agent.models import CardSpec, GeneratedQuestion
+
+DEFAULT_PREFETCH_DEPTH = 2
+# Seconds a question may spend on its LLM explanation before the template is used.
+DEFAULT_QUESTION_DEADLINE = 8.0
+# How often a blocked worker checks whether the session has ended.
+_POLL_INTERVAL = 0.1
+
+# ``build(card, rng, use_llm)`` -> ``(question or None, issues)``.
+QuestionBuilder = Callable[[CardSpec, random.Random, bool], tuple[GeneratedQuestion | None, list[str]]]
+
+_DONE = object()
+
+
+class QuestionPrefetcher:
+    """Builds upcoming questions on a worker thread while the learner answers the current one.
+
+    Questions are produced in card order into a queue holding at most
+    ``depth`` of them, so the worker stays a few cards ahead without building
+    the whole session up front. Each card gets its own ``random.Random`` seeded
+    from ``rng`` in card order, so a session is reproducible from its seed.
+
+    With ``use_llm``, a question whose build has not finished after
+    ``deadline`` seconds is rebuilt without the LLM from the same seed: same
+    prompt and choices, template explanation. The late build keeps running on
+    its daemon thread. ``close()`` cancels the worker at session end and
+    waits for late builds, so none writes to the explanation cache after it;
+    iteration (including a consumer already waiting) then ends.
+
+    With ``depth=0`` there is no worker: each question is built on the
+    consumer's thread when it is asked for, from the same per-card seeds, and
+    the LLM call is bounded by the generator's own deadline instead.
+    """
+
+    def __init__(
+        self,
+        build: QuestionBuilder,
+        cards: Sequence[CardSpec],
+        rng: random.Random,
+        use_llm: bool = True,
+        depth: int = DEFAULT_PREFETCH_DEPTH,
+        deadline: float = DEFAULT_QUESTION_DEADLINE,
+    ) -> None:
+        self.build = build
+        self.cards = cards
+        self.rng = rng
+        self.use_llm = use_llm
+        self.deadline = deadline
+        self.depth = depth
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._cancelled = threading.Event()
+        self._error: BaseException | None = None
+        self._attempts: list[threading.Thread] = []
+        self._worker = threading.Thread(target=self._run, name="question-prefetch", daemon=True)
+
+    def __enter__(self) -> QuestionPrefetcher:
+        return self.start()
+
+    def start(self) -> QuestionPrefetcher:
+        if self.depth > 0 and not self._cancelled.is_set():
+            self._worker.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple[CardSpec, GeneratedQuestion | None, list[str]]]:
+        if self.depth <= 0:
+            for card in self.cards:
+                if self._cancelled.is_set():
+                    return
+                seed = self.rng.getrandbits(64)
+                yield (card, *self.build(card, random.Random(seed), self.use_llm))
+            return
+        while True:
+            # A cancelled worker never queues ``_DONE``, so a waiting consumer polls for ``close()`` instead.
+            if self._cancelled.is_set():
+                return
+            try:
+                item = self._queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def close(self) -> None:
+        # A worker blocked on a full queue or an LLM deadline, or a consumer waiting for the
+        # next question, notices within one poll interval; iteration then ends.
+        self._cancelled.set()
+        if self._worker.ident is not None:
+            self._worker.join()
+        # Late LLM builds still write to the shared generator and explanation cache; let them
+        # finish before the caller closes those. Each is bounded by the LLM call timeout.
+        for attempt in self._attempts:
+            attempt.join()
+
+    def _run(self) -> None:
+        try:
+            for card in self.cards:
+                card_seed = self.rng.getrandbits(64)
+                question, issues = self._build(card, card_seed)
+                if not self._put((card, question, issues)):
+                    return
+        except BaseException as exc:
+            self._error = exc
+        self._put(_DONE)
+
+    def _build(self, card: CardSpec, seed: int) -> tuple[GeneratedQuestion | None, list[str]]:
+        if not self.use_llm:
+            return self.build(card, random.Random(seed), False)
+        result: queue.Queue = queue.Queue(maxsize=1)
+
+        def attempt() -> None:
+            try:
+                result.put((True, self.build(card, random.Random(seed), True)))
+            except BaseException as exc:
+                result.put((False, exc))
+
+        thread = threading.Thread(target=attempt, name="question-llm", daemon=True)
+        self._attempts = [pending for pending in self._attempts if pending.is_alive()]
+        self._attempts.append(thread)
+        thread.start()
+        waited = 0.0
+        while waited < self.deadline and not self._cancelled.is_set():
+            try:
+                ok, value = result.get(timeout=min(_POLL_INTERVAL, self.deadline - waited))
+            except queue.Empty:
+                waited += _POLL_INTERVAL
+                continue
+            if not ok:
+                raise value
+            return value
+        if self._cancelled.is_set():
+            # Nothing will consume this card's question; ``_run`` stops at its ``_put``.
+            return None, []
+        return self.build(card, random.Random(seed), False)
+
+    def _put(self, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -1,93 +1,267 @@
 from __future__ import annotations
 
-import random
+import json
 import time
+from contextlib import closing
 from datetime import date
 
-from jp_agent import db
 from jp_agent.agents.generator import ContentGeneratorAgent
 from jp_agent.agents.planner import PlannerAgent
 from jp_agent.agents.srs import SrsAgent
-from jp_agent.agents.verifier import VerifierAgent
+from jp_agent.agents.verifier import VerifierAgent, explanation_allowed
+from jp_agent.answers import AnswerError, AnswerSource
+from jp_agent.confusables import ConfusableIndex
+from jp_agent.explanations import ExplanationCache
+from jp_agent.journal import ReviewJournal
 from jp_agent.llm import LlmConfig
-from jp_agent.models import StudyRequest
+from jp_agent.llm_client import LlmUnavailable
+from jp_agent.models import CardSpec, StudyRequest
+from jp_agent.prefetch import DEFAULT_PREFETCH_DEPTH, DEFAULT_QUESTION_DEADLINE
+from jp_agent.session import SKIP_MISSING, QuizSession, SessionQuestion, SkippedCard
 from jp_agent.utils import sanitize_text
 from jp_agent.vocab import VocabStore
 
 
-def run_quiz(conn, request: StudyRequest, vocab: VocabStore, llm: LlmConfig | None) -> None:
-    planner = PlannerAgent()
-    generator = ContentGeneratorAgent(vocab=vocab, llm=llm)
+def run_quiz(
+    conn,
+    request: StudyRequest,
+    vocab: VocabStore,
+    llm: LlmConfig | None,
+    journal: ReviewJournal | None = None,
+    confusables: ConfusableIndex | None = None,
+    explanations: ExplanationCache | None = None,
+    prefetch: int = DEFAULT_PREFETCH_DEPTH,
+    deadline: float = DEFAULT_QUESTION_DEADLINE,
+    stream: bool = False,
+    answers: AnswerSource | None = None,
+    jsonl: bool = False,
+) -> None:
+    """Run a study session in the terminal.
+
+    Answers come from the learner at the prompt, or from ``answers`` (scripted
+    or automatic, see ``jp_agent.answers``) so sessions can run unattended.
+    With ``jsonl``, each question, skip and answer is written to stdout as a
+    JSON object on its own line, followed by a session summary, instead of
+    the human-readable output; it needs ``answers`` and does not stream. An
+    unusable scripted answer raises ``AnswerError``, after an ``error`` event
+    in JSON Lines mode.
+    """
+    if jsonl and answers is None:
+        raise ValueError("JSON Lines output needs scripted or automatic answers")
+    stream = stream and not jsonl
+    planner = PlannerAgent(journal=journal)
+    generator = ContentGeneratorAgent(vocab=vocab, llm=llm, confusables=confusables, explanations=explanations)
     verifier = VerifierAgent()
-    srs_agent = SrsAgent()
+    srs_agent = SrsAgent(journal=journal)
 
     plan = planner.plan(conn, request)
     if not plan.card_specs:
-        print("No cards available for review.")
+        if jsonl:
+            _emit_summary(request.seed, 0, 0, 0, 0.0, exhausted=False)
+        else:
+            print("No cards available for review.")
         return
 
-    rng = random.Random(request.seed)
+    # The next ``prefetch`` questions are generated and verified while the learner answers.
+    # When streaming, they carry the template explanation and the LLM one is streamed after the answer.
+    session = QuizSession(
+        conn,
+        request,
+        plan,
+        vocab,
+        generator,
+        verifier,
+        srs_agent,
+        journal=journal,
+        use_llm=llm is not None and not stream,
+        prefetch=prefetch,
+        deadline=deadline,
+    )
+    with session:
+        if jsonl:
+            _emit_events(session, answers)
+            return
+        while (item := session.next_question()) is not None:
+            if isinstance(item, SkippedCard):
+                _print_skipped(item)
+                continue
 
-    for idx, card in enumerate(plan.card_specs, start=1):
-        card_row = db.fetch_card(conn, card.card_id)
-        if card_row is None:
-            print(f"Skipping missing card: {card.card_id}")
-            continue
+            card, question = item.card, item.question
+            print(f"Q{item.number}: {sanitize_text(question.prompt)}")
+            for choice_idx, choice in enumerate(question.choices, start=1):
+                print(f"{choice_idx}) {sanitize_text(choice)}")
 
-        question = None
-        use_llm = True
-        issues: list[str] = []
-        for _ in range(3):
-            try:
-                generated = generator.generate(card, request, rng, use_llm=use_llm)
-            except Exception as exc:
-                issues = [str(exc)]
-                break
-            verified = verifier.verify(card, generated, vocab)
-            if verified.valid:
-                question = verified.question
+            answer = _next_answer(answers, item)
+            if answer is None:
+                print("No more scripted answers; ending the session.")
                 break
-            issues = verified.issues
-            if "explanation includes non-whitelisted Japanese text" in issues:
-                use_llm = False
-        if question is None:
-            print(f"Skipping card due to invalid question: {card.card_id}")
-            if issues:
-                print(f"Issues: {', '.join(issues)}")
-            continue
+            result = session.submit(*answer)
+
+            if result.correct:
+                print("✔ Correct")
+            else:
+                correct_choice = sanitize_text(question.choices[question.correct_index])
+                print(f"✘ Incorrect. Correct answer: {correct_choice}")
+
+            if stream and card.mode == "keigo" and llm is not None:
+                print("")
+                _stream_explanation(generator, card, request, question.explanation)
+            elif question.explanation:
+                print("")
+                print(sanitize_text(question.explanation))
 
-        prompt = sanitize_text(question.prompt)
-        print(f"Q{idx}: {prompt}")
-        for choice_idx, choice in enumerate(question.choices, start=1):
-            print(f"{choice_idx}) {sanitize_text(choice)}")
+            if card.mode == "keigo":
+                usage = sanitize_text(question.meta.get("usage", ""))
+                polite = sanitize_text(question.meta.get("type", ""))
+                if usage:
+                    print(f"Usage: {usage}")
+                if polite:
+                    print(f"Politeness level: {polite}")
 
+            print(f"Next review: {result.srs.interval_after} days")
+            print("")
+
+
+def _next_answer(answers: AnswerSource | None, item: SessionQuestion) -> tuple[int, int] | None:
+    """``(answer_index, response_ms)`` from the prompt, or from ``answers`` when set."""
+    if answers is None:
         start = time.monotonic()
-        answer_index = _prompt_for_answer(len(question.choices))
-        elapsed_ms = int((time.monotonic() - start) * 1000)
+        answer_index = _prompt_for_answer(len(item.question.choices))
+        return answer_index, int((time.monotonic() - start) * 1000)
+    answer = answers.answer(item)
+    if answer is not None:
+        print(f"Your answer: {answer[0] + 1}")
+    return answer
 
-        correct = answer_index == question.correct_index
-        if correct:
-            print("✔ Correct")
-        else:
-            correct_choice = sanitize_text(question.choices[question.correct_index])
-            print(f"✘ Incorrect. Correct answer: {correct_choice}")
 
-        result = srs_agent.apply(conn, card_row, correct, elapsed_ms)
+def _emit_events(session: QuizSession, answers: AnswerSource) -> None:
+    start = time.perf_counter()
+    answered = correct = skipped = 0
+    exhausted = False
+    while (item := session.next_question()) is not None:
+        if isinstance(item, SkippedCard):
+            skipped += 1
+            _emit(
+                {
+                    "event": "skipped",
+                    "number": item.number,
+                    "card_id": item.card.card_id,
+                    "reason": item.reason,
+                    "issues": item.issues,
+                }
+            )
+            continue
+        question = item.question
+        _emit(
+            {
+                "event": "question",
+                "number": item.number,
+                "card_id": item.card.card_id,
+                "prompt": question.prompt,
+                "choices": question.choices,
+            }
+        )
+        try:
+            answer = answers.answer(item)
+        except AnswerError as exc:
+            # Keep the stream parseable; the caller still sees the error.
+            _emit({"event": "error", "number": item.number, "message": str(exc)})
+            raise
+        if answer is None:
+            exhausted = True
+            break
+        result = session.submit(*answer)
+        answered += 1
+        correct += result.correct
+        _emit(
+            {
+                "event": "answer",
+                "number": item.number,
+                "card_id": item.card.card_id,
+                "answer_index": result.answer_index,
+                "correct_index": question.correct_index,
+                "correct": result.correct,
+                "response_ms": answer[1],
+                "explanation": question.explanation,
+                "interval_after": result.srs.interval_after,
+                "due_date": result.srs.due_date.isoformat(),
+            }
+        )
+    _emit_summary(session.request.seed, answered, correct, skipped, time.perf_counter() - start, exhausted)
 
-        if question.explanation:
-            print("")
-            print(sanitize_text(question.explanation))
 
-        if card.mode == "keigo":
-            usage = sanitize_text(question.meta.get("usage", ""))
-            polite = sanitize_text(question.meta.get("type", ""))
-            if usage:
-                print(f"Usage: {usage}")
-            if polite:
-                print(f"Politeness level: {polite}")
+def _emit_summary(seed: int, answered: int, correct: int, skipped: int, elapsed: float, exhausted: bool) -> None:
+    _emit(
+        {
+            "event": "summary",
+            # Replays the session with ``--seed`` on a DB in the same state.
+            "seed": seed,
+            "answered": answered,
+            "correct": correct,
+            "skipped": skipped,
+            "answers_exhausted": exhausted,
+            "elapsed_s": round(elapsed, 6),
+            "answers_per_s": round(answered / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+    )
+
+
+def _emit(event: dict) -> None:
+    print(json.dumps(event, ensure_ascii=False), flush=True)
+
+
+def _print_skipped(skipped: SkippedCard) -> None:
+    if skipped.reason == SKIP_MISSING:
+        print(f"Skipping missing card: {skipped.card.card_id}")
+        return
+    print(f"Skipping card due to invalid question: {skipped.card.card_id}")
+    if skipped.issues:
+        print(f"Issues: {', '.join(skipped.issues)}")
+
+
+def _stream_explanation(
+    generator: ContentGeneratorAgent,
+    card: CardSpec,
+    request: StudyRequest,
+    template: str,
+) -> None:
+    """Print the LLM explanation for a keigo ``card`` as it streams, falling back to ``template``.
+
+    Each piece is vetted before it is printed, so non-whitelisted Japanese
+    never reaches the screen: at the first bad piece the partial text is
+    withdrawn and the template shown instead. The assembled text is then
+    checked as a whole and cached with its verdict.
+    """
+    entry = generator.keigo_entry(card.vocab_key)
+    parts: list[str] = []
+    try:
+        with closing(generator.stream_explanation(entry, request.context)) as pieces:
+            for piece in pieces:
+                parts.append(piece)
+                if not explanation_allowed(entry, piece):
+                    break
+                text = sanitize_text(piece)
+                print(text if len(parts) > 1 else text.lstrip(), end="", flush=True)
+    except LlmUnavailable:
+        _explanation_fallback(parts, "interrupted", template)
+        return
+    text = "".join(parts).strip()
+    if not text:
+        print(sanitize_text(template))
+        return
+    accepted = explanation_allowed(entry, text)
+    generator.remember_explanation(entry, request.context, text, accepted)
+    if not accepted:
+        _explanation_fallback(parts[:-1], "withdrawn: it used Japanese outside this card", template)
+    else:
+        print("")
+
 
-        print(f"Next review: {result.interval_after} days")
+def _explanation_fallback(printed: list[str], reason: str, template: str) -> None:
+    if "".join(printed).strip():
         print("")
+        print(f"(Explanation {reason}.)")
+    print(sanitize_text(template))
 
 
 def _prompt_for_answer(choice_count: int) -> int:
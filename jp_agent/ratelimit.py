@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from jp_agent import db
+
+DEFAULT_RPM = 60.0
+DEFAULT_BURST = 1
+# A bucket this close to a whole request counts as full; float refills rarely land exactly on 1.0.
+_EPSILON = 1e-9
+
+
+class RateLimitExceeded(RuntimeError):
+    """The budget would not allow a call within the caller's ``max_wait``."""
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Budgets for one API key and model.
+
+    ``burst`` requests may go out back to back before the per-minute rate
+    applies; the token budget holds at most one minute's worth of tokens.
+    ``tokens_per_minute=None`` disables the token budget.
+    """
+
+    requests_per_minute: float = DEFAULT_RPM
+    tokens_per_minute: float | None = None
+    burst: int = DEFAULT_BURST
+
+    @classmethod
+    def from_env(cls) -> RateLimits:
+        """Budgets from ``JP_AGENT_LLM_RPM``, ``JP_AGENT_LLM_TPM`` and ``JP_AGENT_LLM_BURST``.
+
+        Raises ValueError for a value that is not a number greater than 0.
+        """
+        tpm = _env_number("JP_AGENT_LLM_TPM", float)
+        return cls(
+            requests_per_minute=_env_number("JP_AGENT_LLM_RPM", float) or DEFAULT_RPM,
+            tokens_per_minute=tpm,
+            burst=_env_number("JP_AGENT_LLM_BURST", int) or DEFAULT_BURST,
+        )
+
+
+def _env_number(name: str, kind: type[int] | type[float]) -> int | float | None:
+    raw = os.getenv(name)
+    if not raw:
+        return None
+    try:
+        value = kind(raw)
+    except ValueError:
+        value = 0
+    # A zero rate would divide by zero in ``_take``; a negative one never refills.
+    if value <= 0:
+        noun = "a whole number" if kind is int else "a number"
+        raise ValueError(f"{name} must be {noun} greater than 0, got {raw!r}")
+    return value
+
+
+class TokenBucketLimiter:
+    """Request and token buckets kept in the ``rate_buckets`` table, shared by every process using the DB.
+
+    ``acquire`` takes one request (and an estimated token count) from bucket
+    ``name``, sleeping until the budget allows it. Each take is one
+    ``BEGIN IMMEDIATE`` transaction, so concurrent processes and threads never
+    spend the same budget twice. ``waited`` and ``acquired`` report how long
+    this limiter's callers slept in total and how many calls went through.
+    """
+
+    def __init__(self, db_path: Path, name: str, limits: RateLimits) -> None:
+        self.name = name
+        self.limits = limits
+        self.waited = 0.0
+        self.acquired = 0
+        self._conn = db.connect(db_path, check_same_thread=False)
+        db.ensure_schema(self._conn)
+        # Transactions are opened explicitly with BEGIN IMMEDIATE.
+        self._conn.isolation_level = None
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0, max_wait: float | None = None) -> float:
+        """Take one request and ``tokens`` tokens; return the seconds slept waiting for them.
+
+        With ``max_wait``, raise ``RateLimitExceeded`` instead of sleeping past
+        it; nothing is taken from the budget then.
+        """
+        if self.limits.tokens_per_minute is not None:
+            # A request larger than the whole budget would otherwise never fit.
+            tokens = min(tokens, int(self.limits.tokens_per_minute))
+        waited = 0.0
+        try:
+            while True:
+                wait = self._take(tokens)
+                if wait <= 0:
+                    break
+                if max_wait is not None and waited + wait > max_wait:
+                    raise RateLimitExceeded(f"rate limit wait would exceed {max_wait:g}s")
+                time.sleep(wait)
+                waited += wait
+        finally:
+            with self._lock:
+                self.waited += waited
+        with self._lock:
+            self.acquired += 1
+        return waited
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _take(self, tokens: int) -> float:
+        """Take the budget if it is available and return 0, else return the seconds until it will be."""
+        limits = self.limits
+        request_rate = limits.requests_per_minute / 60.0
+        token_rate = (limits.tokens_per_minute or 0.0) / 60.0
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT requests, tokens, updated_at FROM rate_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row is None:
+                    requests, budget = float(limits.burst), float(limits.tokens_per_minute or 0.0)
+                else:
+                    # A clock step backwards refills nothing rather than draining the bucket.
+                    elapsed = max(0.0, now - row["updated_at"])
+                    requests = min(float(limits.burst), row["requests"] + elapsed * request_rate)
+                    budget = min(float(limits.tokens_per_minute or 0.0), row["tokens"] + elapsed * token_rate)
+                wait = 0.0
+                if requests < 1.0 - _EPSILON:
+                    wait = (1.0 - requests) / request_rate
+                if token_rate and budget < tokens - _EPSILON:
+                    wait = max(wait, (tokens - budget) / token_rate)
+                if wait == 0.0:
+                    requests -= 1.0
+                    budget -= tokens if token_rate else 0.0
+                self._conn.execute(
+                    """
+                    INSERT INTO rate_buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        requests=excluded.requests,
+                        tokens=excluded.tokens,
+                        updated_at=excluded.updated_at
+                    """,
+                    (self.name, requests, budget, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
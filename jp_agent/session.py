@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from dataclasses import dataclass
+
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.agents.planner import refresh_plan
+from jp_agent.agents.srs import SrsAgent, SrsResult
+from jp_agent.agents.verifier import EXPLANATION_ISSUE, VerifierAgent
+from jp_agent.journal import ReviewJournal
+from jp_agent.models import BatchQuestion, CardSpec, CardState, GeneratedQuestion, Plan, StudyRequest
+from jp_agent.prefetch import DEFAULT_PREFETCH_DEPTH, DEFAULT_QUESTION_DEADLINE, QuestionPrefetcher
+from jp_agent.vocab import VocabStore
+
+# Each card gets this many generate/verify attempts before it is skipped.
+MAX_ATTEMPTS = 3
+# ``SkippedCard.reason`` values.
+SKIP_MISSING = "missing"
+SKIP_INVALID = "invalid"
+
+
+@dataclass(frozen=True, slots=True)
+class SessionQuestion:
+    # 1-based position of the card in the plan, counting skipped cards.
+    number: int
+    card: CardSpec
+    question: GeneratedQuestion
+
+
+@dataclass(frozen=True, slots=True)
+class SkippedCard:
+    number: int
+    card: CardSpec
+    reason: str
+    issues: list[str]
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerResult:
+    question: SessionQuestion
+    answer_index: int
+    correct: bool
+    srs: SrsResult
+
+
+class QuizSession:
+    """One learner's pass through a plan, driven step by step with no terminal I/O.
+
+    ``next_question()`` returns the next ``SessionQuestion``, a ``SkippedCard``
+    for a card that was deleted or could not be built, or None at the end;
+    ``submit(answer_index, response_ms)`` grades the pending question and
+    applies SRS. The agents hold no per-learner state, so one set can be
+    shared by many sessions; a session keeps only the plan, the cards' SRS
+    state, its seed stream and the pending question.
+
+    Questions are built ahead on a worker thread (``prefetch`` deep), or on
+    the caller's thread with ``prefetch=0`` so thousands of sessions need no
+    thread each. ``next_question`` never touches the DB connection;
+    ``submit`` writes through it (or the journal) and must run on the
+    connection's thread. From asyncio, await ``next_question_async`` and call
+    ``submit`` directly.
+    """
+
+    def __init__(
+        self,
+        conn,
+        request: StudyRequest,
+        plan: Plan,
+        vocab: VocabStore,
+        generator: ContentGeneratorAgent,
+        verifier: VerifierAgent,
+        srs: SrsAgent,
+        journal: ReviewJournal | None = None,
+        use_llm: bool = True,
+        prefetch: int = DEFAULT_PREFETCH_DEPTH,
+        deadline: float = DEFAULT_QUESTION_DEADLINE,
+    ) -> None:
+        if any(card.card_id not in plan.states for card in plan.card_specs):
+            # Plans built elsewhere may lack SRS state; read it in one query rather than per card.
+            plan = refresh_plan(conn, plan)
+        self.conn = conn
+        self.request = request
+        self.plan = plan
+        self.vocab = vocab
+        self.generator = generator
+        self.verifier = verifier
+        self.srs = srs
+        self.journal = journal
+        self._states = dict(plan.states)
+        self._pending: SessionQuestion | None = None
+        self._closed = False
+        self._number = 0
+        self._prefetcher = QuestionPrefetcher(
+            self._build,
+            plan.card_specs,
+            random.Random(request.seed),
+            use_llm=use_llm,
+            depth=prefetch,
+            deadline=deadline,
+        )
+        self._items = None
+
+    def __enter__(self) -> QuizSession:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def next_question(self) -> SessionQuestion | SkippedCard | None:
+        """The next card's question or skip notice, or None once the plan is done.
+
+        Until it is answered, the pending question is returned again. After
+        ``close()`` it returns None, including in a call already waiting.
+        """
+        if self._closed:
+            return None
+        if self._pending is not None:
+            return self._pending
+        if self._items is None:
+            self._items = iter(self._prefetcher.start())
+        item = next(self._items, None)
+        if item is None or self._closed:
+            return None
+        card, question, issues = item
+        self._number += 1
+        if card.card_id not in self._states:
+            return SkippedCard(self._number, card, SKIP_MISSING, [])
+        if question is None:
+            return SkippedCard(self._number, card, SKIP_INVALID, issues)
+        self._pending = SessionQuestion(self._number, card, question)
+        return self._pending
+
+    async def next_question_async(self) -> SessionQuestion | SkippedCard | None:
+        # Waiting on a build or the prefetch queue would block the event loop.
+        return await asyncio.to_thread(self.next_question)
+
+    def submit(self, answer_index: int, response_ms: int) -> AnswerResult:
+        """Grade the pending question with the 0-based ``answer_index`` and record the review."""
+        pending = self._pending
+        if pending is None:
+            raise ValueError("No question is waiting for an answer")
+        if not 0 <= answer_index < len(pending.question.choices):
+            raise ValueError(f"Answer must be between 0 and {len(pending.question.choices) - 1}")
+        card_id = pending.card.card_id
+        state = self._states[card_id]
+        card_row = {"card_id": card_id, "ease": state.ease, "interval": state.interval, "due_date": state.due_date}
+        if self.journal is not None:
+            card_row = self.journal.card_row(card_row)
+        correct = answer_index == pending.question.correct_index
+        result = self.srs.apply(self.conn, card_row, correct, response_ms)
+        self._states[card_id] = CardState(result.ease_after, result.interval_after, result.due_date.isoformat())
+        self._pending = None
+        return AnswerResult(pending, answer_index, correct, result)
+
+    def close(self) -> None:
+        self._closed = True
+        self._pending = None
+        self._prefetcher.close()
+
+    def _build(self, card: CardSpec, rng: random.Random, use_llm: bool) -> tuple[GeneratedQuestion | None, list[str]]:
+        return _build_question(self.generator, self.verifier, self.vocab, card, self.request, rng, use_llm)
+
+
+def _build_question(
+    generator: ContentGeneratorAgent,
+    verifier: VerifierAgent,
+    vocab: VocabStore,
+    card: CardSpec,
+    request: StudyRequest,
+    rng: random.Random,
+    use_llm: bool = True,
+) -> tuple[GeneratedQuestion | None, list[str]]:
+    """Generate and verify ``card``'s question, retrying up to ``MAX_ATTEMPTS`` times."""
+    issues: list[str] = []
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            generated = generator.generate(card, request, rng, use_llm=use_llm)
+        except Exception as exc:
+            return None, [str(exc)]
+        verified = verifier.verify(card, generated, vocab)
+        if not _record_explanation_verdict(generator, generated, verified.issues):
+            use_llm = False
+        if verified.valid:
+            return verified.question, []
+        issues = verified.issues
+    return None, issues
+
+
+def prepare_questions(
+    plan: Plan,
+    request: StudyRequest,
+    generator: ContentGeneratorAgent,
+    verifier: VerifierAgent,
+    vocab: VocabStore,
+    rng: random.Random,
+) -> list[BatchQuestion]:
+    """Generate and verify a question for every card in ``plan`` up front, in plan order.
+
+    Follows ``_build_question``'s retry rules: each round regenerates only the
+    cards the verifier rejected, a rejected LLM explanation falls back to the
+    template, and generation errors are not retried. The result is the same
+    for the same ``rng`` seed.
+    """
+    results: list[BatchQuestion | None] = [None] * len(plan.card_specs)
+    pending = list(range(len(plan.card_specs)))
+    use_llm = [True] * len(pending)
+    for _ in range(MAX_ATTEMPTS):
+        if not pending:
+            break
+        retry: list[int] = []
+        groups = {with_llm: [pos for pos in pending if use_llm[pos] is with_llm] for with_llm in (True, False)}
+        for with_llm, positions in groups.items():
+            if not positions:
+                continue
+            sub_plan = Plan(card_specs=[plan.card_specs[pos] for pos in positions])
+            generated = generator.generate_batch(sub_plan, request, rng, use_llm=with_llm)
+            for pos, item, verified in zip(positions, generated, verifier.verify_batch(generated, vocab)):
+                results[pos] = verified
+                if item.question is None:
+                    continue
+                if not _record_explanation_verdict(generator, item.question, verified.issues):
+                    use_llm[pos] = False
+                if verified.question is None:
+                    retry.append(pos)
+        pending = sorted(retry)
+    return results
+
+
+def _record_explanation_verdict(generator: ContentGeneratorAgent, question: GeneratedQuestion, issues: list[str]) -> bool:
+    """Record whether ``question``'s LLM explanation passed; a rejected one means retrying with the template."""
+    accepted = EXPLANATION_ISSUE not in issues
+    key = question.meta.get("explanation_key")
+    if key is not None:
+        generator.record_explanation_verdict(key, accepted)
+    return accepted
@@ -2,25 +2,48 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
+
+if TYPE_CHECKING:
+    from jp_agent.vocab_cache import VocabCache
 
 VALID_KEIGO_TYPES = {"sonkeigo", "kenjogo", "teineigo"}
 
+# Vocab files are read, parsed and hashed on a thread pool of this size. Most
+# of the time goes to I/O (slow or network storage) and hashlib, which release
+# the GIL.
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+STREAM_CHUNK_SIZE = 1 << 16
+# A decode error or item end within this many characters of the end of the
+# buffer may be a token cut by the chunk boundary (``-Infinity`` and a
+# ``\uXXXX`` escape are the longest), so more text is read before deciding.
+_TOKEN_TAIL = 10
+# ``init --sync`` streams files at least this large straight into the card
+# diff instead of loading (and caching) them whole.
+STREAM_SYNC_BYTES = 64 << 20
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class KanaEntry:
     kana: str
     romaji: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class KanjiEntry:
     kanji: str
     meaning: list[str]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class KeigoEntry:
     base: str
     keigo: str
@@ -30,7 +53,7 @@ class KeigoEntry:
     example_contexts: list[str]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PhraseEntry:
     english: str
     japanese: str
@@ -62,6 +85,79 @@ class VocabStore:
         return self.kanji[level]
 
 
+KANJI_LEVELS = ("N5", "N4", "N3", "N2")
+
+
+class LazyVocabStore(VocabStore):
+    """``VocabStore`` that reads each section the first time it is used and keeps it.
+
+    Sections come from ``cache`` when one is given, otherwise straight from the
+    JSON files, so a session only pays for the modes and kanji levels it touches.
+    """
+
+    def __init__(self, data_dir: Path, cache: VocabCache | None = None) -> None:
+        self.data_dir = data_dir
+        self.cache = cache
+        self.kanji = _LazyKanjiLevels(self)
+        self._sections: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def section(self, name: str) -> list:
+        with self._lock:
+            if name not in self._sections:
+                if self.cache is not None:
+                    self._sections[name] = self.cache.load(self.data_dir, name)
+                else:
+                    self._sections[name] = load_section(self.data_dir, name)
+            return self._sections[name]
+
+    @property
+    def loaded_sections(self) -> list[str]:
+        return list(self._sections)
+
+    @property
+    def hiragana(self) -> list[KanaEntry]:
+        return self.section("hiragana")
+
+    @property
+    def katakana(self) -> list[KanaEntry]:
+        return self.section("katakana")
+
+    @property
+    def keigo(self) -> list[KeigoEntry]:
+        return self.section("keigo")
+
+    @property
+    def core_vocab(self) -> list[PhraseEntry]:
+        return self.section("core_vocab")
+
+    @property
+    def survival_phrases(self) -> list[PhraseEntry]:
+        return self.section("survival")
+
+    def __repr__(self) -> str:
+        return f"LazyVocabStore({str(self.data_dir)!r}, loaded={self.loaded_sections})"
+
+
+class _LazyKanjiLevels(Mapping):
+    def __init__(self, store: LazyVocabStore) -> None:
+        self.store = store
+
+    def __getitem__(self, level: str) -> list[KanjiEntry]:
+        if level not in KANJI_LEVELS:
+            raise KeyError(level)
+        return self.store.section(f"kanji_{level}")
+
+    def __contains__(self, level: object) -> bool:
+        return level in KANJI_LEVELS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(KANJI_LEVELS)
+
+    def __len__(self) -> int:
+        return len(KANJI_LEVELS)
+
+
 EXPECTED_FILES = {
     "hiragana": "hiragana.json",
     "katakana": "katakana.json",
@@ -79,6 +175,7 @@ def resolve_vocab_path(data_dir: Path, filename: str) -> Path:
     candidates = [data_dir / filename, data_dir / filename.lower()]
     if filename.lower().endswith(".json"):
         stem = filename[:-5]
+        candidates.append(data_dir / f"{stem}.jsonl")
         candidates.append(data_dir / stem)
         candidates.append(data_dir / stem.lower())
     for candidate in candidates:
@@ -105,15 +202,15 @@ def required_filenames(mode: str, level: str | None) -> list[str]:
     raise ValueError(f"Unsupported mode: {mode}")
 
 
-def verify_vocab_hashes(conn, data_dir: Path, mode: str, level: str | None) -> None:
+def verify_vocab_hashes(conn, data_dir: Path, mode: str, level: str | None, paranoid: bool = False) -> None:
     from jp_agent import db
 
     for filename in required_filenames(mode, level):
         vocab_path = resolve_vocab_path(data_dir, filename)
-        current_hash = compute_sha256(vocab_path)
         stored_hash = db.get_vocab_hash(conn, filename)
         if stored_hash is None:
             raise ValueError("Vocab hashes not initialized. Run 'jp-agent init --sync'.")
+        current_hash = cached_sha256(conn, filename, vocab_path, paranoid=paranoid)
         if current_hash != stored_hash:
             raise ValueError("Vocab file hash mismatch. Run 'jp-agent init --sync'.")
 
@@ -126,28 +223,183 @@ def compute_sha256(path: Path) -> str:
     return digest.hexdigest()
 
 
+def file_fingerprint(path: Path) -> tuple[int, int, int]:
+    stat = path.stat()
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def cached_sha256(conn, filename: str, path: Path, paranoid: bool = False) -> str:
+    """Return the sha256 of ``path``, reusing the stored hash while size, mtime and inode match.
+
+    ``paranoid`` always rehashes. When a rehash finds the stored content
+    unchanged (for example after a ``touch``), the new stat is remembered.
+    """
+    return cached_sha256_many(conn, {filename: path}, paranoid=paranoid)[filename]
+
+
+def cached_sha256_many(
+    conn,
+    paths: dict[str, Path],
+    paranoid: bool = False,
+    workers: int = DEFAULT_WORKERS,
+) -> dict[str, str]:
+    """``cached_sha256`` for several files, hashing the stale ones on up to ``workers`` threads.
+
+    The DB is only touched from the calling thread.
+    """
+    hashed = cached_sha256_fingerprints(conn, paths, paranoid=paranoid, workers=workers)
+    return {filename: sha for filename, (sha, _) in hashed.items()}
+
+
+def cached_sha256_fingerprints(
+    conn,
+    paths: dict[str, Path],
+    paranoid: bool = False,
+    workers: int = DEFAULT_WORKERS,
+) -> dict[str, tuple[str, tuple[int, int, int]]]:
+    """Like ``cached_sha256_many``, also returning the fingerprint each hash belongs to.
+
+    The fingerprint is taken before hashing, so storing it next to the hash
+    can only make a later run rehash; a stat taken afterwards could pair a
+    newer file with the older hash and hide the change.
+    """
+    from jp_agent import db
+
+    hashes: dict[str, tuple[str, tuple[int, int, int]]] = {}
+    stale: dict[str, tuple] = {}
+    for filename, path in paths.items():
+        fingerprint = file_fingerprint(path)
+        row = db.get_vocab_file(conn, filename)
+        if row is not None and not paranoid and (row["size"], row["mtime_ns"], row["inode"]) == fingerprint:
+            hashes[filename] = (str(row["sha256"]), fingerprint)
+        else:
+            stale[filename] = (row, fingerprint)
+    fresh = _map(compute_sha256, [paths[filename] for filename in stale], workers)
+    for (filename, (row, fingerprint)), sha in zip(stale.items(), fresh):
+        if row is not None and row["sha256"] == sha:
+            db.update_vocab_fingerprint(conn, filename, fingerprint)
+        hashes[filename] = (sha, fingerprint)
+    return {filename: hashes[filename] for filename in paths}
+
+
+def _map(fn, items: list, workers: int) -> list:
+    """``[fn(item) for item in items]`` on a thread pool; the first failure in item order is raised."""
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
 def _load_json(path: Path) -> list[dict]:
+    return list(iter_json_records(path))
+
+
+def iter_json_records(path: Path) -> Iterator[object]:
+    """Yield the items of a vocab file one at a time.
+
+    ``.jsonl`` files hold one item per line (blank lines are skipped); any
+    other file must be a JSON array, which is decoded incrementally so only
+    the current item is held in memory.
+    """
     if not path.exists():
         raise FileNotFoundError(f"Missing vocab file: {path}")
     with path.open("r", encoding="utf-8") as handle:
-        data = json.load(handle)
-    if not isinstance(data, list):
+        if path.suffix == ".jsonl":
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"Invalid JSON in {path} at line {line_number}: {exc.msg}") from exc
+        else:
+            yield from _iter_json_array(handle, path)
+
+
+def _iter_json_array(handle: TextIO, path: Path) -> Iterator[object]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    # Characters dropped from the front of ``buffer``, so errors report file offsets.
+    consumed = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, consumed, eof
+        # Reading at least as much as is buffered keeps an item that spans many chunks linear to assemble.
+        chunk = handle.read(max(STREAM_CHUNK_SIZE, len(buffer) - pos))
+        if not chunk:
+            # Offsets into ``buffer`` stay valid when there is nothing more to read.
+            eof = True
+            return False
+        consumed += pos
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_char() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return buffer[pos : pos + 1]
+
+    def invalid(message: str, offset: int, index: int) -> ValueError:
+        return ValueError(f"Invalid JSON in {path} at item {index} (char {consumed + offset}): {message}")
+
+    if next_char() != "[":
         raise ValueError(f"Vocab file must be a JSON array: {path}")
-    return data
+    pos += 1
+    if next_char() == "]":
+        return
+    index = 0
+    while True:
+        next_char()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                # Only an error in the last token can mean the item runs past the buffered text;
+                # anything earlier is malformed, and reading on would pull the rest of the file in.
+                if _cut_short(exc, len(buffer)) and fill():
+                    continue
+                raise invalid(exc.msg, exc.pos, index) from exc
+            # A number or literal can also be cut short by the chunk boundary.
+            if len(buffer) - end < _TOKEN_TAIL and not eof and fill():
+                continue
+            break
+        pos = end
+        yield item
+        index += 1
+        separator = next_char()
+        pos += 1
+        if separator == "]":
+            break
+        if separator != ",":
+            raise invalid("Expecting ',' delimiter", pos - 1, index)
+    if next_char():
+        raise invalid("Extra data", pos, index)
+
+
+def _cut_short(exc: json.JSONDecodeError, buffered: int) -> bool:
+    # An unterminated string reports where it starts, which may be far back.
+    return exc.msg.startswith("Unterminated string") or exc.pos >= buffered - _TOKEN_TAIL
 
 
 def load_kana(path: Path) -> list[KanaEntry]:
-    raw = _load_json(path)
-    entries: list[KanaEntry] = []
-    for idx, item in enumerate(raw):
+    return list(iter_kana(path))
+
+
+def iter_kana(path: Path) -> Iterator[KanaEntry]:
+    for idx, item in enumerate(iter_json_records(path)):
         if not isinstance(item, dict):
             raise ValueError(f"Invalid kana entry at index {idx} in {path}")
         kana = item.get("kana")
         romaji = item.get("romaji")
         if not isinstance(kana, str) or not isinstance(romaji, str):
             raise ValueError(f"Kana entries require 'kana' and 'romaji' strings at index {idx} in {path}")
-        entries.append(KanaEntry(kana=kana, romaji=romaji))
-    return entries
+        yield KanaEntry(kana=kana, romaji=romaji)
 
 
 def _normalize_meaning(value: object, path: Path, idx: int) -> list[str]:
@@ -159,23 +411,26 @@ def _normalize_meaning(value: object, path: Path, idx: int) -> list[str]:
 
 
 def load_kanji(path: Path) -> list[KanjiEntry]:
-    raw = _load_json(path)
-    entries: list[KanjiEntry] = []
-    for idx, item in enumerate(raw):
+    return list(iter_kanji(path))
+
+
+def iter_kanji(path: Path) -> Iterator[KanjiEntry]:
+    for idx, item in enumerate(iter_json_records(path)):
         if not isinstance(item, dict):
             raise ValueError(f"Invalid kanji entry at index {idx} in {path}")
         kanji = item.get("kanji")
         meaning = item.get("meaning")
         if not isinstance(kanji, str):
             raise ValueError(f"Kanji entry requires 'kanji' string at index {idx} in {path}")
-        entries.append(KanjiEntry(kanji=kanji, meaning=_normalize_meaning(meaning, path, idx)))
-    return entries
+        yield KanjiEntry(kanji=kanji, meaning=_normalize_meaning(meaning, path, idx))
 
 
 def load_keigo(path: Path) -> list[KeigoEntry]:
-    raw = _load_json(path)
-    entries: list[KeigoEntry] = []
-    for idx, item in enumerate(raw):
+    return list(iter_keigo(path))
+
+
+def iter_keigo(path: Path) -> Iterator[KeigoEntry]:
+    for idx, item in enumerate(iter_json_records(path)):
         if not isinstance(item, dict):
             raise ValueError(f"Invalid keigo entry at index {idx} in {path}")
         base = item.get("base")
@@ -190,25 +445,24 @@ def load_keigo(path: Path) -> list[KeigoEntry]:
             raise ValueError(f"Keigo entry 'type' must be one of {sorted(VALID_KEIGO_TYPES)} at index {idx} in {path}")
         if not isinstance(contexts, list) or not all(isinstance(val, str) for val in contexts):
             raise ValueError(f"Keigo entry 'example_contexts' must be list of strings at index {idx} in {path}")
-        entries.append(
-            KeigoEntry(
-                base=base,
-                keigo=keigo,
-                type=ktype,
-                meaning=meaning,
-                usage=usage,
-                example_contexts=list(contexts),
-            )
+        yield KeigoEntry(
+            base=base,
+            keigo=keigo,
+            type=sys.intern(ktype),
+            meaning=meaning,
+            usage=sys.intern(usage),
+            example_contexts=[sys.intern(context) for context in contexts],
         )
-    return entries
 
 
 
 
 def load_phrases(path: Path) -> list[PhraseEntry]:
-    raw = _load_json(path)
-    entries: list[PhraseEntry] = []
-    for idx, item in enumerate(raw):
+    return list(iter_phrases(path))
+
+
+def iter_phrases(path: Path) -> Iterator[PhraseEntry]:
+    for idx, item in enumerate(iter_json_records(path)):
         if not isinstance(item, dict):
             raise ValueError(f"Invalid phrase entry at index {idx} in {path}")
         english = item.get("english")
@@ -223,59 +477,73 @@ def load_phrases(path: Path) -> list[PhraseEntry]:
             raise ValueError(f"Phrase entry category must be string at index {idx} in {path}")
         if note is not None and not isinstance(note, str):
             raise ValueError(f"Phrase entry note must be string at index {idx} in {path}")
-        entries.append(PhraseEntry(english=english, japanese=japanese, kana=kana, romaji=romaji, category=category, note=note))
-    return entries
-
-def load_all_vocab(data_dir: Path) -> VocabStore:
-    hiragana = load_kana(resolve_vocab_path(data_dir, EXPECTED_FILES["hiragana"]))
-    katakana = load_kana(resolve_vocab_path(data_dir, EXPECTED_FILES["katakana"]))
-    kanji = {
-        "N5": load_kanji(resolve_vocab_path(data_dir, EXPECTED_FILES["kanji_N5"])),
-        "N4": load_kanji(resolve_vocab_path(data_dir, EXPECTED_FILES["kanji_N4"])),
-        "N3": load_kanji(resolve_vocab_path(data_dir, EXPECTED_FILES["kanji_N3"])),
-        "N2": load_kanji(resolve_vocab_path(data_dir, EXPECTED_FILES["kanji_N2"])),
-    }
-    keigo = load_keigo(resolve_vocab_path(data_dir, EXPECTED_FILES["keigo"]))
-    core_vocab = load_phrases(resolve_vocab_path(data_dir, EXPECTED_FILES["core_vocab"]))
-    survival_phrases = load_phrases(resolve_vocab_path(data_dir, EXPECTED_FILES["survival"]))
-    return VocabStore(
-        hiragana=hiragana,
-        katakana=katakana,
-        kanji=kanji,
-        keigo=keigo,
-        core_vocab=core_vocab,
-        survival_phrases=survival_phrases,
-    )
+        if category is not None:
+            category = sys.intern(category)
+        yield PhraseEntry(english=english, japanese=japanese, kana=kana, romaji=romaji, category=category, note=note)
+
+
+_SECTION_ITERATORS = {
+    "hiragana": iter_kana,
+    "katakana": iter_kana,
+    "keigo": iter_keigo,
+    "core_vocab": iter_phrases,
+    "survival": iter_phrases,
+    "kanji_N5": iter_kanji,
+    "kanji_N4": iter_kanji,
+    "kanji_N3": iter_kanji,
+    "kanji_N2": iter_kanji,
+}
 
 
-def load_vocab_for_mode(data_dir: Path, mode: str, level: str | None) -> VocabStore:
-    if mode == "kana":
-        hiragana = load_kana(resolve_vocab_path(data_dir, EXPECTED_FILES["hiragana"]))
-        katakana = load_kana(resolve_vocab_path(data_dir, EXPECTED_FILES["katakana"]))
-        return VocabStore(hiragana=hiragana, katakana=katakana, kanji={}, keigo=[], core_vocab=[], survival_phrases=[])
-    if mode in {"hiragana", "katakana"}:
-        hiragana = (
-            load_kana(resolve_vocab_path(data_dir, EXPECTED_FILES["hiragana"])) if mode == "hiragana" else []
-        )
-        katakana = (
-            load_kana(resolve_vocab_path(data_dir, EXPECTED_FILES["katakana"])) if mode == "katakana" else []
-        )
-        return VocabStore(hiragana=hiragana, katakana=katakana, kanji={}, keigo=[], core_vocab=[], survival_phrases=[])
-    if mode == "kanji":
-        if not level:
-            raise ValueError("Kanji mode requires a level (N5, N4, N3, N2)")
-        filename = EXPECTED_FILES.get(f"kanji_{level}")
-        if not filename:
-            raise ValueError(f"Unsupported kanji level: {level}")
-        kanji_entries = load_kanji(resolve_vocab_path(data_dir, filename))
-        return VocabStore(hiragana=[], katakana=[], kanji={level: kanji_entries}, keigo=[], core_vocab=[], survival_phrases=[])
-    if mode == "keigo":
-        keigo = load_keigo(resolve_vocab_path(data_dir, EXPECTED_FILES["keigo"]))
-        return VocabStore(hiragana=[], katakana=[], kanji={}, keigo=keigo, core_vocab=[], survival_phrases=[])
-    if mode == "vocab":
-        entries = load_phrases(resolve_vocab_path(data_dir, EXPECTED_FILES["core_vocab"]))
-        return VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[], core_vocab=entries, survival_phrases=[])
-    if mode == "survival":
-        entries = load_phrases(resolve_vocab_path(data_dir, EXPECTED_FILES["survival"]))
-        return VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[], core_vocab=[], survival_phrases=entries)
-    raise ValueError(f"Unsupported mode: {mode}")
+SECTION_ENTRY_TYPES = {
+    "hiragana": KanaEntry,
+    "katakana": KanaEntry,
+    "keigo": KeigoEntry,
+    "core_vocab": PhraseEntry,
+    "survival": PhraseEntry,
+    "kanji_N5": KanjiEntry,
+    "kanji_N4": KanjiEntry,
+    "kanji_N3": KanjiEntry,
+    "kanji_N2": KanjiEntry,
+}
+
+
+def load_section(data_dir: Path, section: str) -> list:
+    """Load the entries of one ``EXPECTED_FILES`` section, e.g. ``"kanji_N5"``."""
+    return list(iter_section(data_dir, section))
+
+
+def iter_section(data_dir: Path, section: str) -> Iterator:
+    """Stream the validated entries of one section without loading the whole file."""
+    if section not in _SECTION_ITERATORS:
+        raise ValueError(f"Unsupported vocab section: {section}")
+    return _SECTION_ITERATORS[section](resolve_vocab_path(data_dir, EXPECTED_FILES[section]))
+
+
+def load_sections(
+    data_dir: Path,
+    sections: Iterable[str],
+    workers: int = DEFAULT_WORKERS,
+    cache: VocabCache | None = None,
+) -> dict[str, list]:
+    """Load several sections concurrently, raising the first error in ``sections`` order."""
+    sections = list(sections)
+
+    def load(section: str) -> list:
+        if cache is not None:
+            return cache.load(data_dir, section)
+        return load_section(data_dir, section)
+
+    return dict(zip(sections, _map(load, sections, workers)))
+
+
+def load_all_vocab(data_dir: Path, workers: int = DEFAULT_WORKERS) -> VocabStore:
+    loaded = load_sections(data_dir, EXPECTED_FILES, workers=workers)
+    return VocabStore(
+        hiragana=loaded["hiragana"],
+        katakana=loaded["katakana"],
+        kanji={level: loaded[f"kanji_{level}"] for level in KANJI_LEVELS},
+        keigo=loaded["keigo"],
+        core_vocab=loaded["core_vocab"],
+        survival_phrases=loaded["survival"],
+    )
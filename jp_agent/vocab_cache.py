@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import marshal
+import os
+from dataclasses import fields
+from operator import attrgetter
+from pathlib import Path
+from typing import Mapping
+
+from jp_agent.confusables import build_confusables
+from jp_agent.mapped_vocab import MappedSection, write_mapped_section
+from jp_agent.vocab import EXPECTED_FILES, SECTION_ENTRY_TYPES, load_section
+
+CACHE_FORMAT = 1
+CACHE_SUFFIX = ".marshal"
+MAPPED_SUFFIX = ".jpvm"
+CONFUSABLES_SUFFIX = ".confusables"
+DEFAULT_MAPPED_THRESHOLD = 50_000
+
+
+class VocabCache:
+    """Compiled copies of vocab sections, keyed by the sha256 of their source file.
+
+    Each section is stored as a marshalled list of field tuples that were
+    validated when the JSON was first parsed, so a warm load skips both JSON
+    parsing and validation. ``hashes`` maps vocab filenames to their current
+    sha256 (as returned by ``db.list_vocab_hashes``); sections without a known
+    hash are loaded from JSON and not cached.
+
+    Sections with at least ``mapped_threshold`` entries are stored in the
+    memory-mapped format instead and returned as a ``MappedSection``, so
+    dictionary-scale packs are decoded lazily rather than held in memory.
+
+    Derived tables (the confusable-distractor index) are stored under the same
+    hash and dropped together with the section they were computed from.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        hashes: Mapping[str, str],
+        mapped_threshold: int = DEFAULT_MAPPED_THRESHOLD,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.hashes = hashes
+        self.mapped_threshold = mapped_threshold
+
+    def load(self, data_dir: Path, section: str) -> list:
+        sha256 = self.hashes.get(EXPECTED_FILES.get(section, ""))
+        if sha256 is None:
+            return load_section(data_dir, section)
+        mapped_path = self.path_for(section, sha256, MAPPED_SUFFIX)
+        if mapped_path.exists():
+            return MappedSection(mapped_path)
+        cached = self._read(section, sha256)
+        if cached is not None:
+            return cached
+        entries = load_section(data_dir, section)
+        if len(entries) >= self.mapped_threshold:
+            write_mapped_section(mapped_path, SECTION_ENTRY_TYPES[section], entries)
+            self._prune(section, mapped_path)
+            return MappedSection(mapped_path)
+        self._write(section, sha256, entries)
+        return entries
+
+    def confusables(self, section: str, entries) -> dict[str, tuple[str, ...]]:
+        sha256 = self.hashes.get(EXPECTED_FILES.get(section, ""))
+        if sha256 is None:
+            return build_confusables(section, entries)
+        path = self.path_for(section, sha256, CONFUSABLES_SUFFIX)
+        try:
+            header, table = marshal.loads(path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            header = table = None
+        if header == (CACHE_FORMAT, marshal.version, section, sha256):
+            return table
+        table = build_confusables(section, entries)
+        self._replace(section, path, marshal.dumps(((CACHE_FORMAT, marshal.version, section, sha256), table)))
+        return table
+
+    def path_for(self, section: str, sha256: str, suffix: str = CACHE_SUFFIX) -> Path:
+        return self.cache_dir / f"{section}-{sha256}{suffix}"
+
+    def _read(self, section: str, sha256: str) -> list | None:
+        path = self.path_for(section, sha256)
+        try:
+            header, rows = marshal.loads(path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if header != (CACHE_FORMAT, marshal.version, section, sha256):
+            return None
+        entry_type = SECTION_ENTRY_TYPES[section]
+        return [entry_type(*row) for row in rows]
+
+    def _write(self, section: str, sha256: str, entries: list) -> None:
+        entry_type = SECTION_ENTRY_TYPES[section]
+        getter = attrgetter(*(field.name for field in fields(entry_type)))
+        payload = marshal.dumps(((CACHE_FORMAT, marshal.version, section, sha256), [getter(entry) for entry in entries]))
+        self._replace(section, self.path_for(section, sha256), payload)
+
+    def _replace(self, section: str, path: Path, payload: bytes) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        self._prune(section, path)
+
+    def _prune(self, section: str, keep: Path) -> None:
+        """Remove this section's other files: other hashes, or the other storage format.
+
+        Derived tables computed for the same hash as ``keep`` stay.
+        """
+        for suffix in (CACHE_SUFFIX, MAPPED_SUFFIX, CONFUSABLES_SUFFIX):
+            for stale in self.cache_dir.glob(f"{section}-*{suffix}"):
+                if stale == keep or (CONFUSABLES_SUFFIX in (suffix, keep.suffix) and stale.stem == keep.stem):
+                    continue
+                stale.unlink(missing_ok=True)
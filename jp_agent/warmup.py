@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.agents.verifier import explanation_allowed
+from jp_agent.vocab import KeigoEntry
+
+DEFAULT_WARM_WORKERS = 4
+
+
+@dataclass
+class WarmupReport:
+    accepted: int = 0
+    rejected: int = 0
+    cached: int = 0
+    failures: list[str] = field(default_factory=list)
+
+
+def warm_contexts(entries: Iterable[KeigoEntry]) -> list[tuple[KeigoEntry, str | None]]:
+    """Every (entry, context) a keigo session can ask about: each example context plus no context."""
+    return [(entry, context) for entry in entries for context in (*entry.example_contexts, None)]
+
+
+def warm_explanations(
+    generator: ContentGeneratorAgent,
+    entries: Iterable[KeigoEntry],
+    workers: int = DEFAULT_WARM_WORKERS,
+) -> WarmupReport:
+    """Fetch, verify and cache the LLM explanation for every keigo entry and context.
+
+    Calls run on up to ``workers`` threads and are spaced by the generator's
+    rate limit. Explanations the cache already has a verdict for are skipped;
+    new ones are stored with the ``explanation_allowed`` verdict, so a later
+    session serves accepted text straight from the cache and never retries
+    rejected text.
+    """
+    if generator.explanations is None:
+        raise ValueError("Explanation warm-up needs an explanation cache")
+    report = WarmupReport()
+    pairs = warm_contexts(entries)
+
+    def warm(pair: tuple[KeigoEntry, str | None]) -> str:
+        entry, context = pair
+        explanation = generator.fetch_explanation(entry, context)
+        if explanation.accepted is not None:
+            return "cached"
+        if not explanation.text:
+            raise ValueError("empty response")
+        accepted = explanation_allowed(entry, explanation.text)
+        generator.remember_explanation(entry, context, explanation.text, accepted)
+        return "accepted" if accepted else "rejected"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(warm, pair) for pair in pairs]
+        for (entry, context), future in zip(pairs, futures):
+            try:
+                outcome = future.result()
+            except Exception as exc:
+                report.failures.append(f"{entry.base} ({context or 'no context'}): {exc}")
+                continue
+            setattr(report, outcome, getattr(report, outcome) + 1)
+    return report
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Container, Mapping
+
+from jp_agent.mapped_vocab import MappedSection, section_key_map, section_values
+from jp_agent.vocab import VocabStore
+
+# Field whose values are the valid answers for each card variant.
+VARIANT_FIELDS = {
+    "kana_to_romaji": "romaji",
+    "romaji_to_kana": "kana",
+    "kanji_to_meaning": "meaning",
+    "meaning_to_kanji": "kanji",
+    "english_to_japanese": "japanese",
+    "japanese_to_english": "english",
+    "plain_to_keigo": "keigo",
+    "context_selection": "keigo",
+}
+
+# Field each section's cards are keyed by (``CardSpec.vocab_key``).
+KEY_FIELDS = {
+    "hiragana": "kana",
+    "katakana": "kana",
+    "kanji": "kanji",
+    "keigo": "base",
+    "vocab": "english",
+    "survival": "english",
+}
+
+
+class WhitelistIndex:
+    """Frozen answer sets and entry maps for one ``VocabStore``.
+
+    Each (mode, level, variant) set and (mode, level) map is built the first
+    time it is asked for and reused afterwards, so checking a question costs
+    O(number of choices) instead of a pass over the vocab.
+    """
+
+    def __init__(self, vocab: VocabStore) -> None:
+        self.vocab = vocab
+        self._answers: dict[tuple[str, str | None, str], Container[str]] = {}
+        self._entries: dict[tuple[str, str | None], Mapping] = {}
+
+    def answers(self, mode: str, level: str | None, variant: str) -> Container[str]:
+        """Return every whitelisted answer for ``variant`` cards of ``mode``/``level``."""
+        key = (mode, level, variant)
+        answers = self._answers.get(key)
+        if answers is None:
+            entries = self._section(mode, level)
+            values = section_values(entries, VARIANT_FIELDS[variant])
+            answers = self._answers[key] = values if isinstance(entries, MappedSection) else frozenset(values)
+        return answers
+
+    def entries(self, mode: str, level: str | None) -> Mapping:
+        """Return a read-only ``{vocab_key: entry}`` map for ``mode``/``level``."""
+        key = (mode, level)
+        entries = self._entries.get(key)
+        if entries is None:
+            section = self._section(mode, level)
+            entries = section_key_map(section, KEY_FIELDS[mode])
+            if not isinstance(section, MappedSection):
+                entries = MappingProxyType(entries)
+            self._entries[key] = entries
+        return entries
+
+    def _section(self, mode: str, level: str | None):
+        if mode in {"hiragana", "katakana"}:
+            return self.vocab.kana_by_mode(mode)
+        if mode == "kanji":
+            return self.vocab.kanji_by_level(level)
+        if mode == "keigo":
+            return self.vocab.keigo
+        if mode == "vocab":
+            return self.vocab.core_vocab
+        if mode == "survival":
+            return self.vocab.survival_phrases
+        raise ValueError(f"Unsupported mode: {mode}")
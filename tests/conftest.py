@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
@@ -73,3 +75,82 @@ def vocab_dir(tmp_path: Path) -> Path:
     (data_dir / EXPECTED_FILES["survival"]).write_text(json.dumps(survival_entries), encoding="utf-8")
 
     return data_dir
+
+
+class StubChatServer(ThreadingHTTPServer):
+    """Minimal OpenAI-compatible ``/v1/chat/completions`` endpoint.
+
+    Streamed requests get the reply as server-sent events, one word per chunk.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.requests: list[dict] = []
+        self.empty_for: set[tuple[str, str]] = set()
+
+    def reply(self, body: dict) -> str:
+        user = body["messages"][-1]["content"]
+        fields = dict(line.split(": ", 1) for line in user.splitlines() if ": " in line)
+        if (fields["Base"], fields["Context"]) in self.empty_for:
+            return ""
+        if fields["Base"] == "見る":
+            return "Similar to 言う in tone."
+        return f"The humble form of {fields['Base']} for {fields['Context']}."
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        if body.get("stream"):
+            self._stream(body)
+            return
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": self.server.reply(body)},
+                    }
+                ],
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for piece in [piece + " " for piece in self.server.reply(body).split(" ")]:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": None, "delta": {"content": piece}}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def stub_server():
+    server = StubChatServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
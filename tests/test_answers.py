@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import shutil
+from types import SimpleNamespace
+
+import pytest
+from typer.testing import CliRunner
+
+from jp_agent import cli, db, quiz
+from jp_agent.answers import DEFAULT_RESPONSE_MS, AnswerError, AutoAnswers, ScriptedAnswers
+from jp_agent.config import Paths
+from jp_agent.models import CardSpec, GeneratedQuestion, Plan, StudyRequest
+
+runner = CliRunner()
+
+
+def _item(correct_index: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(question=GeneratedQuestion("q", ["a", "b", "c"], correct_index, "", {}))
+
+
+def test_scripted_answers_parse_lines_and_run_out():
+    answers = ScriptedAnswers(["# warm-up", "", "2 800", "3"])
+    assert answers.answer(_item()) == (1, 800)
+    assert answers.answer(_item()) == (2, DEFAULT_RESPONSE_MS)
+    assert answers.answer(_item()) is None
+
+    with pytest.raises(AnswerError, match="line 1: expected"):
+        ScriptedAnswers(["b"]).answer(_item())
+    with pytest.raises(AnswerError, match="line 1: choice 4 is not between 1 and 3"):
+        ScriptedAnswers(["4"]).answer(_item())
+
+
+def test_auto_answers_follow_policy_reproducibly():
+    items = [_item(idx % 3) for idx in range(30)]
+    assert all(AutoAnswers("correct", 1).answer(item)[0] == item.question.correct_index for item in items)
+    assert all(AutoAnswers("incorrect", 1).answer(item)[0] != item.question.correct_index for item in items)
+    first, second = AutoAnswers("random", 5), AutoAnswers("random", 5)
+    assert [first.answer(item) for item in items] == [second.answer(item) for item in items]
+    mixed = AutoAnswers("0.5", 3)
+    hits = sum(mixed.answer(item)[0] == item.question.correct_index for item in items)
+    assert 0 < hits < 30
+    assert all(100 < AutoAnswers("correct", seed).answer(items[0])[1] < 60_000 for seed in range(20))
+    for policy in ("always", "1.5"):
+        with pytest.raises(ValueError, match="Auto-answer policy must be one of"):
+            AutoAnswers(policy, 1)
+
+
+def _synced_paths(monkeypatch, tmp_path, vocab_dir, name: str = "auto.db") -> Paths:
+    paths = Paths(data_dir=vocab_dir, db_path=tmp_path / name)
+    monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
+    assert runner.invoke(cli.app, ["init", "--sync", "--db", str(paths.db_path)]).exit_code == 0
+    return paths
+
+
+def test_study_jsonl_with_auto_answers(monkeypatch, tmp_path, vocab_dir):
+    _synced_paths(monkeypatch, tmp_path, vocab_dir)
+    monkeypatch.setattr(quiz, "_prompt_for_answer", lambda choice_count: pytest.fail("prompted"))
+
+    result = runner.invoke(cli.app, ["study", "hiragana", "--count", "3", "--auto-answer", "correct", "--jsonl"])
+    assert result.exit_code == 0
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [event["event"] for event in events] == ["question", "answer"] * 3 + ["summary"]
+    assert all(event["correct"] for event in events if event["event"] == "answer")
+    summary = events[-1]
+    assert (summary["answered"], summary["correct"], summary["skipped"]) == (3, 3, 0)
+    assert not summary["answers_exhausted"]
+    assert summary["answers_per_s"] > 0
+
+
+def test_study_replays_from_seed(monkeypatch, tmp_path, vocab_dir):
+    synced = _synced_paths(monkeypatch, tmp_path, vocab_dir, "synced.db")
+    runs = []
+    for name in ("first.db", "second.db"):
+        # Sync draws each card's random key, so replays start from copies of one DB.
+        paths = Paths(data_dir=vocab_dir, db_path=tmp_path / name)
+        shutil.copyfile(synced.db_path, paths.db_path)
+        monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None, paths=paths: paths)
+        options = ["--count", "3", "--auto-answer", "random", "--jsonl", "--seed", "42"]
+        result = runner.invoke(cli.app, ["study", "hiragana", *options])
+        assert result.exit_code == 0
+        events = [json.loads(line) for line in result.stdout.splitlines()]
+        assert events[-1]["seed"] == 42
+        runs.append([event for event in events if event["event"] != "summary"])
+    assert runs[0] == runs[1]
+
+
+def test_study_text_with_scripted_answers_from_stdin_and_file(monkeypatch, tmp_path, vocab_dir):
+    _synced_paths(monkeypatch, tmp_path, vocab_dir)
+
+    result = runner.invoke(cli.app, ["study", "hiragana", "--count", "3", "--answers-from", "-"], input="1 900\n")
+    assert result.exit_code == 0
+    assert "Your answer: 1" in result.stdout
+    assert "No more scripted answers; ending the session." in result.stdout
+
+    script = tmp_path / "answers.txt"
+    script.write_text("1\n2\n3\n", encoding="utf-8")
+    result = runner.invoke(cli.app, ["study", "hiragana", "--count", "3", "--answers-from", str(script), "--jsonl"])
+    assert result.exit_code == 0
+    summary = json.loads(result.stdout.splitlines()[-1])
+    assert summary["answered"] == 3
+
+    script.write_text("9\n", encoding="utf-8")
+    result = runner.invoke(cli.app, ["study", "hiragana", "--answers-from", str(script), "--jsonl"])
+    assert result.exit_code == 1
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [event["event"] for event in events] == ["question", "error"]
+    assert events[-1]["message"] == "Answer line 1: choice 9 is not between 1 and 3"
+    result = runner.invoke(cli.app, ["study", "hiragana", "--answers-from", str(script)])
+    assert result.exit_code == 1
+    assert result.stdout.splitlines()[-1] == "Answer line 1: choice 9 is not between 1 and 3"
+
+    result = runner.invoke(cli.app, ["study", "hiragana", "--answers-from", "-", "--jsonl"], input="")
+    assert json.loads(result.stdout.splitlines()[-1])["answers_exhausted"]
+
+
+def test_study_rejects_conflicting_answer_options(tmp_path):
+    missing = str(tmp_path / "missing.txt")
+    cases = [
+        (["--answers-from", "-", "--auto-answer", "correct"], 2, "either --answers-from or --auto-answer"),
+        (["--jsonl"], 2, "--jsonl requires"),
+        (["--jsonl", "--stream", "--auto-answer", "correct"], 2, "--stream cannot be combined"),
+        (["--auto-answer", "sometimes"], 2, "Auto-answer policy must be one of"),
+        (["--answers-from", missing], 1, "Cannot read answers"),
+    ]
+    for options, code, message in cases:
+        result = runner.invoke(cli.app, ["study", "hiragana", *options])
+        assert result.exit_code == code
+        assert message in result.stdout
+
+
+def test_run_quiz_jsonl_reports_empty_plans_and_skips(monkeypatch, capsys):
+    request = StudyRequest("hiragana", None, None, 1, 1)
+    with pytest.raises(ValueError, match="needs scripted or automatic answers"):
+        quiz.run_quiz(None, request, SimpleNamespace(), None, jsonl=True)
+
+    card = CardSpec("hiragana:a:kana_to_romaji", "hiragana", None, "kana_to_romaji", "a")
+    monkeypatch.setattr(quiz.PlannerAgent, "plan", lambda self, conn, request: Plan(card_specs=[card]))
+    monkeypatch.setattr(db, "fetch_cards", lambda conn, card_ids: {})
+    quiz.run_quiz(None, request, SimpleNamespace(), None, answers=AutoAnswers("correct", 1), jsonl=True)
+    skipped, summary = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert skipped == {"event": "skipped", "number": 1, "card_id": card.card_id, "reason": "missing", "issues": []}
+    assert (summary["answered"], summary["skipped"]) == (0, 1)
+
+    monkeypatch.setattr(quiz.PlannerAgent, "plan", lambda self, conn, request: Plan(card_specs=[]))
+    quiz.run_quiz(None, request, SimpleNamespace(), None, answers=AutoAnswers("correct", 1), jsonl=True)
+    assert json.loads(capsys.readouterr().out) == {
+        "event": "summary",
+        "seed": 1,
+        "answered": 0,
+        "correct": 0,
+        "skipped": 0,
+        "answers_exhausted": False,
+        "elapsed_s": 0.0,
+        "answers_per_s": 0.0,
+    }
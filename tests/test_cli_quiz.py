@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import json
 import runpy
 from datetime import date, timedelta
 from types import SimpleNamespace
 
 from typer.testing import CliRunner
 
-from jp_agent import cli, db, quiz
+from jp_agent import cli, db, quiz, session, vocab_cache
+from jp_agent.cards import build_all_cards
 from jp_agent.config import Paths
+from jp_agent.llm import LlmConfig
 from jp_agent.models import CardSpec, GeneratedQuestion, Plan, StudyRequest, VerifiedQuestion
-from jp_agent.vocab import load_all_vocab
+from jp_agent.vocab import EXPECTED_FILES, compute_sha256, load_all_vocab
 
 runner = CliRunner()
 
@@ -32,24 +35,32 @@ def test_cli_init_and_study_validation(monkeypatch, tmp_path, vocab_dir):
     run_calls: list[tuple[StudyRequest, object | None]] = []
 
     monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
-    monkeypatch.setattr(cli, "load_all_vocab", lambda data_dir: vocab)
-    monkeypatch.setattr(cli, "build_all_cards", lambda loaded: [CardSpec("hiragana:a:kana_to_romaji", "hiragana", None, "kana_to_romaji", "a")])
-    monkeypatch.setattr(cli.db, "sync_cards", lambda conn, cards, today: sync_calls.append((len(cards), today)))
-    monkeypatch.setattr(cli, "verify_vocab_hashes", lambda conn, data_dir, mode, level: None)
-    monkeypatch.setattr(cli, "load_vocab_for_mode", lambda data_dir, mode, level: vocab)
-    monkeypatch.setattr(cli, "run_quiz", lambda conn, request, loaded_vocab, llm: run_calls.append((request, llm)))
-    monkeypatch.setattr(cli, "get_llm_config", lambda: "llm-config")
+    monkeypatch.setattr(
+        cli.VocabCache, "load", lambda self, data_dir, section: vocab.hiragana[:1] if section == "hiragana" else []
+    )
+    monkeypatch.setattr(
+        cli.db, "sync_cards", lambda conn, cards, today, scopes: sync_calls.append((len(list(cards)), today))
+    )
+    monkeypatch.setattr(cli, "verify_vocab_hashes", lambda conn, data_dir, mode, level, paranoid=False: None)
+    monkeypatch.setattr(cli, "LazyVocabStore", lambda data_dir, cache=None: vocab)
+    monkeypatch.setattr(
+        cli,
+        "run_quiz",
+        lambda conn, request, loaded_vocab, llm, journal=None, confusables=None, explanations=None, stream=False, answers=None, jsonl=False: run_calls.append((request, llm)),
+    )
+    monkeypatch.setattr(cli, "get_llm_config", lambda: LlmConfig(client=None, model="llm-model"))
 
     init_result = runner.invoke(cli.app, ["init", "--sync", "--db", str(paths.db_path)])
     assert init_result.exit_code == 0
-    assert "Synced cards from vocab files." in init_result.stdout
+    assert "Synced cards from vocab files: hiragana.json" in init_result.stdout
     assert "Initialized database" in init_result.stdout
-    assert sync_calls and sync_calls[0][0] == 1
+    assert sync_calls and sync_calls[0][0] == 2
 
     study_result = runner.invoke(cli.app, ["study", "keigo", "--db", str(paths.db_path)])
     assert study_result.exit_code == 0
     assert run_calls and run_calls[0][0].mode == "keigo"
-    assert run_calls[0][1] == "llm-config"
+    assert run_calls[0][1].model == "llm-model"
+    assert run_calls[0][1].rate_limiter.name == "llm-model"
 
     invalid_mode = runner.invoke(cli.app, ["study", "bad"])
     assert invalid_mode.exit_code == 2
@@ -84,7 +95,7 @@ def test_cli_study_hash_failure_and_stats_output(monkeypatch, tmp_path, vocab_di
     conn.commit()
 
     monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
-    monkeypatch.setattr(cli, "verify_vocab_hashes", lambda conn, data_dir, mode, level: (_ for _ in ()).throw(ValueError("bad hashes")))
+    monkeypatch.setattr(cli, "verify_vocab_hashes", lambda conn, data_dir, mode, level, paranoid=False: (_ for _ in ()).throw(ValueError("bad hashes")))
 
     failed = runner.invoke(cli.app, ["study", "hiragana", "--db", str(paths.db_path)])
     assert failed.exit_code == 1
@@ -135,10 +146,10 @@ def test_run_quiz_handles_empty_plan_and_missing_card(monkeypatch, capsys):
         def plan(self, conn, request):
             return Plan(card_specs=[])
 
-    monkeypatch.setattr(quiz, "PlannerAgent", lambda: EmptyPlanner())
-    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm: object())
+    monkeypatch.setattr(quiz, "PlannerAgent", lambda journal=None: EmptyPlanner())
+    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm, confusables=None, explanations=None: object())
     monkeypatch.setattr(quiz, "VerifierAgent", lambda: object())
-    monkeypatch.setattr(quiz, "SrsAgent", lambda: object())
+    monkeypatch.setattr(quiz, "SrsAgent", lambda journal=None: object())
     quiz.run_quiz(None, StudyRequest("hiragana", None, None, 1, 1), SimpleNamespace(), None)
     assert "No cards available for review." in capsys.readouterr().out
 
@@ -148,18 +159,18 @@ def test_run_quiz_handles_empty_plan_and_missing_card(monkeypatch, capsys):
         def plan(self, conn, request):
             return Plan(card_specs=[card])
 
-    monkeypatch.setattr(quiz, "PlannerAgent", lambda: OnePlanner())
-    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm: object())
+    monkeypatch.setattr(quiz, "PlannerAgent", lambda journal=None: OnePlanner())
+    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm, confusables=None, explanations=None: object())
     monkeypatch.setattr(quiz, "VerifierAgent", lambda: object())
-    monkeypatch.setattr(quiz, "SrsAgent", lambda: object())
-    monkeypatch.setattr(quiz.db, "fetch_card", lambda conn, card_id: None)
+    monkeypatch.setattr(quiz, "SrsAgent", lambda journal=None: object())
+    monkeypatch.setattr(db, "fetch_cards", lambda conn, card_ids: {})
     quiz.run_quiz(None, StudyRequest("hiragana", None, None, 1, 1), SimpleNamespace(), None)
     assert "Skipping missing card: hiragana:a:kana_to_romaji" in capsys.readouterr().out
 
 
 def test_run_quiz_retries_and_prints_keigo_metadata(monkeypatch, capsys):
     card = CardSpec("keigo:言う:plain_to_keigo", "keigo", None, "plain_to_keigo", "言う")
-    card_row = {"card_id": card.card_id, "ease": 2.0, "interval": 1}
+    card_row = {"card_id": card.card_id, "ease": 2.0, "interval": 1, "due_date": "2024-01-01"}
     calls: list[bool] = []
 
     class Planner:
@@ -192,13 +203,13 @@ def test_run_quiz_retries_and_prints_keigo_metadata(monkeypatch, capsys):
 
     class Srs:
         def apply(self, conn, row, correct, elapsed_ms):
-            return SimpleNamespace(interval_after=4)
+            return SimpleNamespace(ease_after=2.1, interval_after=4, due_date=date.today())
 
-    monkeypatch.setattr(quiz, "PlannerAgent", lambda: Planner())
-    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm: Generator(vocab, llm))
+    monkeypatch.setattr(quiz, "PlannerAgent", lambda journal=None: Planner())
+    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm, confusables=None, explanations=None: Generator(vocab, llm))
     monkeypatch.setattr(quiz, "VerifierAgent", Verifier)
-    monkeypatch.setattr(quiz, "SrsAgent", lambda: Srs())
-    monkeypatch.setattr(quiz.db, "fetch_card", lambda conn, card_id: card_row)
+    monkeypatch.setattr(quiz, "SrsAgent", lambda journal=None: Srs())
+    monkeypatch.setattr(db, "fetch_cards", lambda conn, card_ids: {card.card_id: card_row})
     monkeypatch.setattr(quiz, "_prompt_for_answer", lambda choice_count: 2)
 
     quiz.run_quiz(None, StudyRequest("keigo", None, "email", 1, 1), SimpleNamespace(), "llm")
@@ -216,8 +227,8 @@ def test_run_quiz_skips_invalid_question_and_handles_incorrect_answer(monkeypatc
     invalid_card = CardSpec("hiragana:a:kana_to_romaji", "hiragana", None, "kana_to_romaji", "a")
     wrong_card = CardSpec("hiragana:i:kana_to_romaji", "hiragana", None, "kana_to_romaji", "i")
     rows = {
-        invalid_card.card_id: {"card_id": invalid_card.card_id, "ease": 2.0, "interval": 1},
-        wrong_card.card_id: {"card_id": wrong_card.card_id, "ease": 2.0, "interval": 1},
+        invalid_card.card_id: {"card_id": invalid_card.card_id, "ease": 2.0, "interval": 1, "due_date": "2024-01-01"},
+        wrong_card.card_id: {"card_id": wrong_card.card_id, "ease": 2.0, "interval": 1, "due_date": "2024-01-01"},
     }
 
     class Planner:
@@ -240,14 +251,14 @@ def test_run_quiz_skips_invalid_question_and_handles_incorrect_answer(monkeypatc
 
     class Srs:
         def apply(self, conn, row, correct, elapsed_ms):
-            return SimpleNamespace(interval_after=2)
+            return SimpleNamespace(ease_after=1.8, interval_after=2, due_date=date.today())
 
     answers = iter([0])
-    monkeypatch.setattr(quiz, "PlannerAgent", lambda: Planner())
-    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm: Generator(vocab, llm))
+    monkeypatch.setattr(quiz, "PlannerAgent", lambda journal=None: Planner())
+    monkeypatch.setattr(quiz, "ContentGeneratorAgent", lambda vocab, llm, confusables=None, explanations=None: Generator(vocab, llm))
     monkeypatch.setattr(quiz, "VerifierAgent", lambda: Verifier())
-    monkeypatch.setattr(quiz, "SrsAgent", lambda: Srs())
-    monkeypatch.setattr(quiz.db, "fetch_card", lambda conn, card_id: rows[card_id])
+    monkeypatch.setattr(quiz, "SrsAgent", lambda journal=None: Srs())
+    monkeypatch.setattr(db, "fetch_cards", lambda conn, card_ids: {card_id: rows[card_id] for card_id in card_ids})
     monkeypatch.setattr(quiz, "_prompt_for_answer", lambda choice_count: next(answers))
 
     quiz.run_quiz(None, StudyRequest("hiragana", None, None, 2, 1), SimpleNamespace(), None)
@@ -257,9 +268,85 @@ def test_run_quiz_skips_invalid_question_and_handles_incorrect_answer(monkeypatc
     assert "✘ Incorrect. Correct answer: two" in output
 
 
+def test_build_question_gives_up_after_max_attempts():
+    card = CardSpec("keigo:言う:plain_to_keigo", "keigo", None, "plain_to_keigo", "言う")
+    calls: list[bool] = []
+
+    class Generator:
+        def generate(self, _card, _request, _rng, *, use_llm=True):
+            calls.append(use_llm)
+            return GeneratedQuestion("?", ["a", "b", "c"], 0, "", {})
+
+    class Verifier:
+        def verify(self, _card, question, vocab):
+            return VerifiedQuestion(False, question, ["explanation includes non-whitelisted Japanese text"])
+
+    request = StudyRequest("keigo", None, None, 1, 1)
+    question, issues = session._build_question(Generator(), Verifier(), None, card, request, None)
+    assert question is None
+    assert issues == ["explanation includes non-whitelisted Japanese text"]
+    assert calls == [True, False, False]
+
+
 def test_prompt_for_answer_retries_until_valid(monkeypatch, capsys):
     answers = iter(["x", "4", "2"])
     monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
     assert quiz._prompt_for_answer(3) == 1
     output = capsys.readouterr().out
     assert output.count("Please enter a number between 1 and 3.") == 2
+
+
+def test_cli_init_sync_only_rebuilds_changed_files(monkeypatch, tmp_path, vocab_dir):
+    paths = Paths(data_dir=vocab_dir, db_path=tmp_path / "incremental.db")
+    monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
+
+    first = runner.invoke(cli.app, ["init", "--sync"])
+    assert first.exit_code == 0
+    conn = db.connect(paths.db_path)
+    kanji_before = conn.execute("SELECT card_id, rand_key FROM cards WHERE mode = 'kanji' ORDER BY card_id").fetchall()
+    assert len(kanji_before) == 24
+
+    unchanged = runner.invoke(cli.app, ["init", "--sync"])
+    assert "Cards are up to date with vocab files." in unchanged.stdout
+
+    survival_path = vocab_dir / EXPECTED_FILES["survival"]
+    survival = json.loads(survival_path.read_text(encoding="utf-8"))
+    survival[0]["english"] = "thanks a lot"
+    survival_path.write_text(json.dumps(survival), encoding="utf-8")
+
+    loaded: list[str] = []
+    original_load_section = vocab_cache.load_section
+    monkeypatch.setattr(
+        vocab_cache, "load_section", lambda data_dir, section: loaded.append(section) or original_load_section(data_dir, section)
+    )
+
+    changed = runner.invoke(cli.app, ["init", "--sync"])
+    assert changed.exit_code == 0
+    assert "Synced cards from vocab files: survival_phrases.json." in changed.stdout
+    assert loaded == ["survival"]
+    survival_ids = {row["card_id"] for row in conn.execute("SELECT card_id FROM cards WHERE mode = 'survival'")}
+    assert "survival:thanks a lot:english_to_japanese" in survival_ids
+    assert "survival:thank you:english_to_japanese" not in survival_ids
+    kanji_after = conn.execute("SELECT card_id, rand_key FROM cards WHERE mode = 'kanji' ORDER BY card_id").fetchall()
+    assert [tuple(row) for row in kanji_after] == [tuple(row) for row in kanji_before]
+    assert db.get_vocab_file(conn, EXPECTED_FILES["survival"])["cards_sha256"] == compute_sha256(survival_path)
+
+    # Hashing without --sync leaves the file marked as needing a card rebuild.
+    survival[0]["english"] = "many thanks"
+    survival_path.write_text(json.dumps(survival), encoding="utf-8")
+    assert runner.invoke(cli.app, ["init"]).exit_code == 0
+    resynced = runner.invoke(cli.app, ["init", "--sync"])
+    assert "Synced cards from vocab files: survival_phrases.json." in resynced.stdout
+
+
+def test_cli_init_sync_streams_large_files(monkeypatch, tmp_path, vocab_dir):
+    paths = Paths(data_dir=vocab_dir, db_path=tmp_path / "streamed.db")
+    monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
+    monkeypatch.setattr(cli, "STREAM_SYNC_BYTES", 0)
+    monkeypatch.setattr(cli, "load_sections", lambda *args, **kwargs: {})
+
+    result = runner.invoke(cli.app, ["init", "--sync"])
+    assert result.exit_code == 0
+    conn = db.connect(paths.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0] == len(build_all_cards(load_all_vocab(vocab_dir)))
+    assert not paths.cache_dir.exists()
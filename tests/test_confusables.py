@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from jp_agent import vocab_cache
+from jp_agent.agents.generator import ContentGeneratorAgent, _build_choices
+from jp_agent.agents.verifier import VerifierAgent
+from jp_agent.cards import build_all_cards
+from jp_agent.confusables import ConfusableIndex, build_confusables, edit_distance
+from jp_agent.models import StudyRequest
+from jp_agent.vocab import EXPECTED_FILES, KanaEntry, KanjiEntry, LazyVocabStore, VocabStore, compute_sha256
+from jp_agent.vocab_cache import CONFUSABLES_SUFFIX, VocabCache
+
+KATAKANA = [
+    KanaEntry("シ", "shi"),
+    KanaEntry("ツ", "tsu"),
+    KanaEntry("チ", "chi"),
+    KanaEntry("ジ", "ji"),
+    KanaEntry("ヂ", "ji"),
+    KanaEntry("ア", "a"),
+    KanaEntry("キャ", "kya"),
+]
+KANJI = [
+    KanjiEntry("未", ["not yet"]),
+    KanjiEntry("末", ["end"]),
+    KanjiEntry("大", ["big", "large"]),
+    KanjiEntry("広", ["wide", "large"]),
+    KanjiEntry("長", ["long", "leader"]),
+    KanjiEntry("姉", ["older sister"]),
+    KanjiEntry("妹", ["younger sister"]),
+]
+
+
+def test_edit_distance():
+    assert edit_distance("shi", "chi") == 1
+    assert edit_distance("shi", "tsu") == 3
+    assert edit_distance("", "ka") == 2
+
+
+def test_kana_neighbours_rank_shape_then_romaji_and_skip_identical_readings():
+    table = build_confusables("katakana", KATAKANA)
+    assert table["シ"][:3] == ("ジ", "ツ", "チ")
+    assert table["ツ"][:2] == ("シ", "ジ")
+    # ジ and ヂ both read "ji", so one can never be a distractor for the other.
+    assert "ヂ" not in table["ジ"]
+    assert "ジ" not in table["ヂ"]
+    assert "キャ" not in table
+
+
+def test_kanji_neighbours_use_shape_and_meaning_overlap():
+    table = build_confusables("kanji_N5", KANJI)
+    assert table["未"] == ("末",)
+    assert table["姉"] == ("妹",)
+    # 大 and 広 share the meaning "large": both would be correct, so they are not neighbours.
+    assert "大" not in table
+    assert "長" not in table
+
+    with pytest.raises(ValueError, match="No confusable index"):
+        build_confusables("keigo", [])
+
+
+def test_generator_prefers_confusable_distractors():
+    vocab = VocabStore([], KATAKANA, {"N5": KANJI}, [], [], [])
+    index = ConfusableIndex(vocab)
+    generator = ContentGeneratorAgent(vocab, confusables=index)
+    verifier = VerifierAgent()
+    rng = random.Random(3)
+    for card in build_all_cards(vocab):
+        request = StudyRequest(mode=card.mode, level=card.level, context=None, count=1, seed=3)
+        question = generator.generate(card, request, rng, use_llm=False)
+        assert verifier.verify(card, question, vocab).valid, card
+
+    kana = next(card for card in build_all_cards(vocab) if card.vocab_key == "ツ" and card.variant == "romaji_to_kana")
+    for seed in range(10):
+        question = generator.generate(kana, StudyRequest("katakana", None, None, 1, seed), random.Random(seed))
+        assert set(question.choices) <= {"ツ", "シ", "ジ", "チ"}
+    assert index.neighbours("vocab", None, "friend") == ()
+
+    # Too few usable neighbours are topped up from the uniform pool.
+    choices, correct_index = _build_choices(random.Random(1), ["a", "b", "c"], "a", preferred=["a", "b"])
+    assert choices[correct_index] == "a"
+    assert sorted(choices) == ["a", "b", "c"]
+
+
+def test_confusables_are_persisted_once_per_vocab_hash(monkeypatch, tmp_path, vocab_dir):
+    (vocab_dir / EXPECTED_FILES["katakana"]).write_text(
+        json.dumps([{"kana": entry.kana, "romaji": entry.romaji} for entry in KATAKANA]), encoding="utf-8"
+    )
+    hashes = {filename: compute_sha256(vocab_dir / filename) for filename in EXPECTED_FILES.values()}
+    cache_dir = tmp_path / "cache"
+    built: list[str] = []
+    original = vocab_cache.build_confusables
+    monkeypatch.setattr(
+        vocab_cache, "build_confusables", lambda section, entries: built.append(section) or original(section, entries)
+    )
+
+    cache = VocabCache(cache_dir, hashes)
+    cache.path_for("katakana", "stale", CONFUSABLES_SUFFIX).parent.mkdir(parents=True)
+    cache.path_for("katakana", "stale", CONFUSABLES_SUFFIX).write_bytes(b"old")
+    index = ConfusableIndex(LazyVocabStore(vocab_dir, cache=cache), cache=cache)
+    assert index.neighbours("katakana", None, "シ")[0] == "ジ"
+    assert index.neighbours("katakana", None, "ア") == index.neighbours("katakana", None, "ア")
+    assert built == ["katakana"]
+    sha = hashes[EXPECTED_FILES["katakana"]]
+    assert sorted(path.name for path in cache_dir.glob("katakana-*")) == [
+        f"katakana-{sha}.confusables",
+        f"katakana-{sha}.marshal",
+    ]
+
+    fresh = ConfusableIndex(LazyVocabStore(vocab_dir, cache=cache), cache=cache)
+    assert fresh.neighbours("katakana", None, "シ")[0] == "ジ"
+    assert built == ["katakana"]
+
+    cache.path_for("katakana", sha, CONFUSABLES_SUFFIX).write_bytes(b"corrupt")
+    assert ConfusableIndex(LazyVocabStore(vocab_dir), cache=cache).neighbours("kanji", "N5", "日") == ()
+    assert ConfusableIndex(LazyVocabStore(vocab_dir), cache=cache).neighbours("katakana", None, "ツ")[0] == "シ"
+    assert built == ["katakana", "kanji_N5", "katakana"]
+
+    unhashed = VocabCache(cache_dir, {})
+    assert unhashed.confusables("katakana", KATAKANA) == build_confusables("katakana", KATAKANA)
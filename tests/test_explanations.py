@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+
+from jp_agent import explanations as explanations_module
+from jp_agent import session
+from jp_agent.agents import generator as generator_module
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.agents.verifier import VerifierAgent
+from jp_agent.explanations import CachedExplanation, ExplanationCache, explanation_key
+from jp_agent.llm import LlmConfig
+from jp_agent.models import CardSpec, Plan, StudyRequest
+from jp_agent.vocab import KeigoEntry, VocabStore
+
+ENTRY = KeigoEntry("言う", "申し上げる", "kenjogo", "to say", "business", ["email"])
+OTHER = KeigoEntry("見る", "拝見する", "kenjogo", "to see", "business", ["email"])
+
+
+class FakeCompletions:
+    def __init__(self, *contents: str) -> None:
+        self.contents = list(contents)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        content = self.contents[min(self.calls, len(self.contents) - 1)]
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _llm(completions: FakeCompletions, model: str = "gpt") -> LlmConfig:
+    return LlmConfig(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), model=model)
+
+
+def test_explanation_key_covers_prompt_inputs_and_model():
+    key = explanation_key(ENTRY, "email", "gpt")
+    assert key == explanation_key(ENTRY, "email", "gpt")
+    assert len({key, explanation_key(ENTRY, "meeting", "gpt"), explanation_key(ENTRY, "email", "other")}) == 3
+    assert key != explanation_key(OTHER, "email", "gpt")
+
+
+def test_cache_expires_and_evicts_least_recently_used(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(explanations_module.time, "time", lambda: now[0])
+    cache = ExplanationCache(tmp_path / "app.db", ttl=100, max_entries=2)
+
+    assert cache.get("a") is None
+    cache.put("a", "gpt", "text a")
+    now[0] += 1
+    cache.put("b", "gpt", "text b")
+    now[0] += 1
+    assert cache.get("a") == CachedExplanation("text a", None)
+    cache.record_verdict("a", False)
+    assert cache.get("a") == CachedExplanation("text a", False)
+    cache.record_verdict("a", True)
+
+    now[0] += 1
+    cache.put("c", "gpt", "text c")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == CachedExplanation("text a", True)
+
+    now[0] += 101
+    assert cache.get("a") is None
+    cache.put("d", "gpt", "text d")
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_generator_serves_cached_explanations_without_llm_or_sleep(monkeypatch, tmp_path):
+    sleeps: list[float] = []
+    monkeypatch.setattr(generator_module.time, "sleep", lambda seconds: sleeps.append(seconds))
+    vocab = VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[ENTRY, OTHER], core_vocab=[], survival_phrases=[])
+    cache = ExplanationCache(tmp_path / "app.db")
+    completions = FakeCompletions("  Used when speaking humbly.  ")
+    generator = ContentGeneratorAgent(vocab=vocab, llm=_llm(completions), explanations=cache)
+
+    assert generator._keigo_explanation(ENTRY, None, use_llm=True) == "Used when speaking humbly."
+    sleeps.clear()
+    fresh = ContentGeneratorAgent(vocab=vocab, llm=_llm(completions), explanations=cache)
+    assert fresh._keigo_explanation(ENTRY, "general business", use_llm=True) == "Used when speaking humbly."
+    assert completions.calls == 1
+    assert sleeps == []
+
+    card = CardSpec("keigo:言う:politeness_classification", "keigo", None, "politeness_classification", "言う")
+    request = StudyRequest("keigo", None, None, 1, 1)
+    question = fresh.generate(card, request, random.Random(1))
+    assert question.meta["explanation_key"] == explanation_key(ENTRY, "general business", "gpt")
+    template = fresh.generate(card, request, random.Random(1), use_llm=False)
+    assert "explanation_key" not in template.meta
+
+    ContentGeneratorAgent(vocab=vocab, llm=None).record_explanation_verdict("missing", True)
+
+
+def test_rejected_explanations_are_recorded_and_not_served_again(monkeypatch, tmp_path):
+    monkeypatch.setattr(generator_module.time, "sleep", lambda seconds: None)
+    vocab = VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[ENTRY, OTHER], core_vocab=[], survival_phrases=[])
+    cache = ExplanationCache(tmp_path / "app.db")
+    completions = FakeCompletions("Like 拝見する, it is humble.")
+    generator = ContentGeneratorAgent(vocab=vocab, llm=_llm(completions), explanations=cache)
+    card = CardSpec("keigo:言う:politeness_classification", "keigo", None, "politeness_classification", "言う")
+    request = StudyRequest("keigo", None, "email", 1, 1)
+
+    question, issues = session._build_question(generator, VerifierAgent(), vocab, card, request, random.Random(1))
+    assert issues == []
+    assert question.explanation.startswith("申し上げる is the kenjogo form")
+    key = explanation_key(ENTRY, "email", "gpt")
+    assert cache.get(key) == CachedExplanation("Like 拝見する, it is humble.", False)
+
+    again = generator._keigo_explanation(ENTRY, "email", use_llm=True)
+    assert again.startswith("申し上げる is the kenjogo form")
+    assert completions.calls == 1
+
+    accepted = ContentGeneratorAgent(vocab=vocab, llm=_llm(FakeCompletions("Humble form.")), explanations=cache)
+    batch = session.prepare_questions(
+        Plan([CardSpec("keigo:見る:politeness_classification", "keigo", None, "politeness_classification", "見る")]),
+        request,
+        accepted,
+        VerifierAgent(),
+        vocab,
+        random.Random(1),
+    )
+    assert batch[0].question.explanation == "Humble form."
+    assert cache.get(explanation_key(OTHER, "email", "gpt")).accepted is True
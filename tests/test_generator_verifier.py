@@ -4,12 +4,14 @@ import random
 
 from jp_agent.agents.generator import ContentGeneratorAgent
 from jp_agent.agents.verifier import VerifierAgent
-from jp_agent.models import CardSpec, StudyRequest
-from jp_agent.vocab import load_vocab_for_mode
+from jp_agent.cards import build_all_cards
+from jp_agent.models import BatchQuestion, CardSpec, GeneratedQuestion, Plan, StudyRequest
+from jp_agent.session import prepare_questions
+from jp_agent.vocab import LazyVocabStore, load_all_vocab
 
 
 def test_kana_generator_and_verifier(vocab_dir):
-    vocab = load_vocab_for_mode(vocab_dir, "hiragana", None)
+    vocab = LazyVocabStore(vocab_dir)
     generator = ContentGeneratorAgent(vocab)
     verifier = VerifierAgent()
     card = CardSpec(
@@ -27,7 +29,7 @@ def test_kana_generator_and_verifier(vocab_dir):
 
 
 def test_keigo_classification_generator_and_verifier(vocab_dir):
-    vocab = load_vocab_for_mode(vocab_dir, "keigo", None)
+    vocab = LazyVocabStore(vocab_dir)
     generator = ContentGeneratorAgent(vocab)
     verifier = VerifierAgent()
     card = CardSpec(
@@ -42,3 +44,71 @@ def test_keigo_classification_generator_and_verifier(vocab_dir):
     verified = verifier.verify(card, question, vocab)
     assert verified.valid
     assert set(question.choices) == {"Sonkeigo", "Kenjogo", "Teineigo"}
+
+
+def test_generate_batch_is_deterministic_and_reports_bad_cards(vocab_dir):
+    vocab = load_all_vocab(vocab_dir)
+    generator = ContentGeneratorAgent(vocab)
+    verifier = VerifierAgent()
+    bad = CardSpec("other:x:y", "other", None, "y", "x")
+    plan = Plan(card_specs=build_all_cards(vocab) + [bad])
+    request = StudyRequest(mode="keigo", level=None, context="email", count=len(plan.card_specs), seed=9)
+
+    batch = generator.generate_batch(plan, request, random.Random(9))
+    assert batch == generator.generate_batch(plan, request, random.Random(9))
+    assert [item.card for item in batch] == plan.card_specs
+    assert batch[-1] == BatchQuestion(card=bad, question=None, issues=["Unsupported mode: other"])
+
+    verified = verifier.verify_batch(batch, vocab)
+    assert all(item.question is not None and not item.issues for item in verified[:-1])
+    assert verified[-1] is batch[-1]
+
+    broken = BatchQuestion(card=batch[0].card, question=GeneratedQuestion("?", ["x", "x"], 0, "", {}), issues=[])
+    [rejected] = verifier.verify_batch([broken], vocab)
+    assert rejected.question is None
+    assert "duplicate choices" in rejected.issues
+
+
+def test_prepare_questions_retries_like_build_question():
+    cards = [CardSpec(f"keigo:{key}:plain_to_keigo", "keigo", None, "plain_to_keigo", key) for key in "abcd"]
+    calls: list[tuple[str, bool]] = []
+
+    class Generator:
+        def generate_batch(self, plan, request, rng, use_llm=True):
+            batch = []
+            for card in plan.card_specs:
+                calls.append((card.vocab_key, use_llm))
+                question = None if card.vocab_key == "c" else GeneratedQuestion("?", ["1", "2", "3"], 0, "", {"llm": use_llm})
+                batch.append(BatchQuestion(card, question, ["boom"] if question is None else []))
+            return batch
+
+    class Verifier:
+        def verify_batch(self, batch, vocab):
+            verified = []
+            for item in batch:
+                if item.question is None:
+                    verified.append(item)
+                elif item.card.vocab_key == "b" and item.question.meta["llm"]:
+                    verified.append(BatchQuestion(item.card, None, ["explanation includes non-whitelisted Japanese text"]))
+                elif item.card.vocab_key == "d":
+                    verified.append(BatchQuestion(item.card, None, ["keigo correct answer mismatch"]))
+                else:
+                    verified.append(item)
+            return verified
+
+    request = StudyRequest(mode="keigo", level=None, context=None, count=4, seed=1)
+    results = prepare_questions(Plan(cards), request, Generator(), Verifier(), None, random.Random(1))
+
+    assert [item.card for item in results] == cards
+    assert results[0].question.meta == {"llm": True}
+    assert results[1].question.meta == {"llm": False}
+    assert results[2].issues == ["boom"]
+    assert results[3].question is None and results[3].issues == ["keigo correct answer mismatch"]
+    assert calls == [
+        ("a", True), ("b", True), ("c", True), ("d", True),
+        ("d", True), ("b", False),
+        ("d", True),
+    ]
+    calls.clear()
+    assert prepare_questions(Plan(cards[:1]), request, Generator(), Verifier(), None, random.Random(1)) == results[:1]
+    assert calls == [("a", True)]
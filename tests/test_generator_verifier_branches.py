@@ -351,3 +351,45 @@ def test_verifier_covers_invalid_paths(vocab_dir):
         vocab,
     )
     assert "explanation includes non-whitelisted Japanese text" in jp_explanation.issues
+
+
+def test_generator_reuses_distractor_pools_and_excludes_synonyms():
+    vocab = VocabStore(
+        hiragana=[],
+        katakana=[],
+        kanji={"N5": [KanjiEntry("日", ["sun", "day"]), KanjiEntry("月", ["moon"]), KanjiEntry("火", ["fire"])]},
+        keigo=[],
+        core_vocab=[],
+        survival_phrases=[],
+    )
+    generator = ContentGeneratorAgent(vocab=vocab, llm=None)
+    card = CardSpec("kanji:N5:日:kanji_to_meaning", "kanji", "N5", "kanji_to_meaning", "日")
+    for seed in range(20):
+        question = generator._generate_kanji(card, random.Random(seed))
+        others = [choice for idx, choice in enumerate(question.choices) if idx != question.correct_index]
+        assert sorted(others) == ["fire", "moon"]
+    assert generator._pools == {("kanji", "N5", "meaning"): ("sun", "day", "moon", "fire")}
+
+    first = generator._generate_kanji(card, random.Random(3))
+    assert generator._generate_kanji(card, random.Random(3)) == first
+
+
+def test_verifier_builds_whitelist_index_once_per_vocab(vocab_dir):
+    vocab = load_all_vocab(vocab_dir)
+    verifier = VerifierAgent()
+    card = CardSpec("kanji:N5:日:kanji_to_meaning", "kanji", "N5", "kanji_to_meaning", "日")
+    question = GeneratedQuestion("日 -> ?", ["sun", "moon", "fire"], 0, "", {})
+
+    assert verifier.verify(card, question, vocab).valid
+    index = verifier._index
+    assert verifier.verify(card, question, vocab).valid
+    assert verifier._index is index
+    assert index.answers("kanji", "N5", "kanji_to_meaning") is index.answers("kanji", "N5", "kanji_to_meaning")
+    assert isinstance(index.answers("kanji", "N5", "kanji_to_meaning"), frozenset)
+    with pytest.raises(TypeError):
+        index.entries("vocab", None)["new"] = None
+    with pytest.raises(ValueError, match="Unsupported mode"):
+        index.entries("other", None)
+
+    verifier.verify(card, question, load_all_vocab(vocab_dir))
+    assert verifier._index is not index
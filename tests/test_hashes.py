@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import json
+import os
 
 import pytest
+from typer.testing import CliRunner
 
-from jp_agent import db
-from jp_agent.vocab import EXPECTED_FILES, compute_sha256, verify_vocab_hashes
+from jp_agent import cli, db
+from jp_agent import vocab as vocab_module
+from jp_agent.config import Paths
+from jp_agent.vocab import EXPECTED_FILES, compute_sha256, file_fingerprint, verify_vocab_hashes
 
 
 def test_hash_mismatch_requires_sync(tmp_path, vocab_dir):
@@ -21,3 +25,63 @@ def test_hash_mismatch_requires_sync(tmp_path, vocab_dir):
 
     with pytest.raises(ValueError):
         verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
+
+
+def test_verify_skips_rehash_while_stat_is_unchanged(monkeypatch, tmp_path, vocab_dir):
+    conn = db.connect(tmp_path / "stat.db")
+    db.ensure_schema(conn)
+
+    filename = EXPECTED_FILES["hiragana"]
+    vocab_path = vocab_dir / filename
+    db.upsert_vocab_hash(conn, filename, compute_sha256(vocab_path), file_fingerprint(vocab_path))
+    row = db.get_vocab_file(conn, filename)
+    assert (row["size"], row["mtime_ns"], row["inode"]) == file_fingerprint(vocab_path)
+
+    hashed: list[str] = []
+    original = vocab_module.compute_sha256
+    monkeypatch.setattr(vocab_module, "compute_sha256", lambda path: hashed.append(path.name) or original(path))
+
+    verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
+    assert hashed == []
+
+    verify_vocab_hashes(conn, vocab_dir, "hiragana", None, paranoid=True)
+    assert hashed == [filename]
+
+    # A touch changes the stat but not the content: rehash once, then trust the new stat.
+    stat = vocab_path.stat()
+    os.utime(vocab_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
+    verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
+    assert hashed == [filename, filename]
+    assert db.get_vocab_file(conn, filename)["mtime_ns"] == vocab_path.stat().st_mtime_ns
+
+    vocab_path.write_text(json.dumps([{"kana": "a", "romaji": "a"}]), encoding="utf-8")
+    with pytest.raises(ValueError, match="hash mismatch"):
+        verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
+    assert db.get_vocab_file(conn, filename)["mtime_ns"] != vocab_path.stat().st_mtime_ns
+
+
+def test_init_stores_the_fingerprint_taken_before_hashing(monkeypatch, tmp_path, vocab_dir):
+    paths = Paths(data_dir=vocab_dir, db_path=tmp_path / "race.db")
+    monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
+    filename = EXPECTED_FILES["hiragana"]
+    vocab_path = vocab_dir / filename
+    before = file_fingerprint(vocab_path)
+    original = vocab_module.compute_sha256
+
+    def hash_then_edit(path):
+        sha = original(path)
+        if path == vocab_path:
+            # The file changes after it was read but before init stores its stat.
+            path.write_text(json.dumps([{"kana": "a", "romaji": "a"}]) + " " * 64, encoding="utf-8")
+        return sha
+
+    monkeypatch.setattr(vocab_module, "compute_sha256", hash_then_edit)
+    assert CliRunner().invoke(cli.app, ["init"]).exit_code == 0
+    row = db.get_vocab_file(db.connect(paths.db_path), filename)
+    assert (row["size"], row["mtime_ns"], row["inode"]) == before
+
+    monkeypatch.setattr(vocab_module, "compute_sha256", original)
+    conn = db.connect(paths.db_path)
+    with pytest.raises(ValueError, match="hash mismatch"):
+        verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+from datetime import date, timedelta
+
+from jp_agent import db, quiz
+from jp_agent import journal as journal_module
+from jp_agent.agents.planner import PlannerAgent
+from jp_agent.agents.srs import SrsAgent
+from jp_agent.cards import build_all_cards
+from jp_agent.config import Paths
+from jp_agent.journal import ReviewJournal
+from jp_agent.models import ReviewRecord, StudyRequest
+from jp_agent.vocab import LazyVocabStore
+
+
+def _review(card_id: str, reviewed_at: str, *, correct: bool = True, due_date: str = "2999-01-01") -> ReviewRecord:
+    return ReviewRecord(
+        card_id=card_id,
+        correct=correct,
+        response_ms=100,
+        ease_before=2.0,
+        ease_after=2.1,
+        interval_before=1,
+        interval_after=2,
+        due_date=due_date,
+        reviewed_at=reviewed_at,
+    )
+
+
+def _synced_conn(tmp_path, vocab_dir):
+    conn = db.connect(tmp_path / "journal.db")
+    db.ensure_schema(conn)
+    vocab = LazyVocabStore(vocab_dir)
+    db.sync_cards(conn, build_all_cards(vocab), date.today().isoformat())
+    return conn, vocab
+
+
+def _review_count(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+
+
+def test_paths_journal_path_sits_next_to_db(tmp_path):
+    paths = Paths(data_dir=tmp_path, db_path=tmp_path / "app.db")
+    assert paths.journal_path == tmp_path / "app.db.reviews.jsonl"
+
+
+def test_journal_group_commits_on_size_and_overlays_queued_state(tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl", max_pending=2, max_delay=60.0)
+
+    assert journal.card_row(None) is None
+    row = db.fetch_card(conn, "hiragana:a:kana_to_romaji")
+    assert journal.card_row(row) is row
+
+    journal.record(_review("hiragana:a:kana_to_romaji", "2000-01-01T00:00:00+00:00"))
+    assert journal.pending == 1
+    assert _review_count(conn) == 0
+    assert journal.path.parent == tmp_path
+    assert journal.path.name.startswith("reviews.") and journal.path.suffix == ".jsonl"
+    assert len(journal.path.read_text(encoding="utf-8").splitlines()) == 1
+
+    overlaid = journal.card_row(db.fetch_card(conn, "hiragana:a:kana_to_romaji"))
+    assert overlaid["ease"] == 2.1
+    assert overlaid["interval"] == 2
+    assert overlaid["due_date"] == "2999-01-01"
+    assert overlaid["last_result"] == 1
+
+    journal.record(_review("hiragana:i:kana_to_romaji", "2000-01-01T00:00:01+00:00", correct=False))
+    assert journal.pending == 0
+    assert _review_count(conn) == 2
+    assert journal.path.read_text(encoding="utf-8") == ""
+    assert db.fetch_card(conn, "hiragana:i:kana_to_romaji")["last_result"] == 0
+
+    assert journal.flush() == 0
+    journal.close()
+    journal.close()
+    assert not journal.path.exists()
+
+
+def test_journal_flushes_when_oldest_review_is_too_old(monkeypatch, tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    times = iter([100.0, 100.5, 106.0])
+    monkeypatch.setattr(journal_module.time, "monotonic", lambda: next(times))
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl", max_pending=10, max_delay=5.0)
+
+    journal.record(_review("hiragana:a:kana_to_romaji", "2000-01-01T00:00:00+00:00"))
+    assert journal.pending == 1
+    journal.record(_review("hiragana:i:kana_to_romaji", "2000-01-01T00:00:01+00:00"))
+    assert journal.pending == 0
+    assert _review_count(conn) == 2
+
+
+def test_journal_replay_is_idempotent_and_stops_at_torn_line(tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    path = tmp_path / "reviews.jsonl"
+    journal = ReviewJournal(conn, path)
+    assert journal.replay() == 0
+
+    committed = _review("hiragana:a:kana_to_romaji", "2000-01-01T00:00:00+00:00")
+    db.apply_reviews(conn, [committed])
+    lost = _review("hiragana:i:kana_to_romaji", "2000-01-01T00:00:01+00:00")
+    lines = [json.dumps(committed.__dict__), json.dumps(lost.__dict__), '{"card_id": "hiragana:u']
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+    assert journal.replay() == 1
+    assert _review_count(conn) == 2
+    assert not path.exists()
+    assert db.fetch_card(conn, "hiragana:i:kana_to_romaji")["interval"] == 2
+
+
+def test_srs_agent_and_planner_use_the_journal(tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl")
+
+    row = db.fetch_card(conn, "hiragana:a:kana_to_romaji")
+    result = SrsAgent(journal=journal).apply(conn, row, True, 250)
+    assert result.interval_after == 2
+    assert journal.pending == 1
+    assert _review_count(conn) == 0
+
+    request = StudyRequest(mode="hiragana", level=None, context=None, count=6, seed=1)
+    plan = PlannerAgent(journal=journal).plan(conn, request)
+    assert journal.pending == 0
+    assert _review_count(conn) == 1
+    assert len(plan.card_specs) == 6
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    assert db.fetch_card(conn, "hiragana:a:kana_to_romaji")["due_date"] >= tomorrow
+
+
+def test_run_quiz_writes_reviews_through_the_journal(monkeypatch, tmp_path, vocab_dir):
+    conn, vocab = _synced_conn(tmp_path, vocab_dir)
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl")
+    monkeypatch.setattr(quiz, "_prompt_for_answer", lambda choice_count: 0)
+
+    request = StudyRequest(mode="hiragana", level=None, context=None, count=3, seed=3)
+    quiz.run_quiz(conn, request, vocab, None, journal=journal)
+    assert journal.pending == 3
+    assert _review_count(conn) == 0
+
+    journal.close()
+    assert _review_count(conn) == 3
+
+
+def test_replay_leaves_a_live_sessions_journal_alone(tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    live = ReviewJournal(conn, tmp_path / "reviews.jsonl", max_pending=10)
+    live.record(_review("hiragana:a:kana_to_romaji", "2000-01-01T00:00:00+00:00"))
+
+    assert live.replay() == 0
+    other = ReviewJournal(conn, tmp_path / "reviews.jsonl")
+    assert other.replay() == 0
+    assert live.path.exists()
+    other.close()
+    assert live.path.exists()
+
+    live.record(_review("hiragana:i:kana_to_romaji", "2000-01-01T00:00:01+00:00"))
+    handle = live._handle
+    live.close()
+    assert not journal_module._is_linked(handle, live.path)
+    assert _review_count(conn) == 2
+    assert list(tmp_path.glob("reviews*.jsonl")) == []
+
+
+def test_replay_skips_journals_already_adopted_elsewhere(monkeypatch, tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    review = _review("hiragana:a:kana_to_romaji", "2000-01-01T00:00:00+00:00")
+    stale = tmp_path / "reviews.old.jsonl"
+    stale.write_text(json.dumps(review.__dict__) + "\n", encoding="utf-8")
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl")
+
+    monkeypatch.setattr(journal_module, "_is_linked", lambda handle, path: False)
+    assert journal.replay() == 0
+    assert stale.exists()
+
+    def removed(self, *args, **kwargs):
+        raise FileNotFoundError(self)
+
+    monkeypatch.setattr(type(stale), "open", removed)
+    assert journal.replay() == 0
+    monkeypatch.undo()
+
+    assert journal.replay() == 1
+    assert not stale.exists()
+
+
+def test_journal_reopens_its_file_if_a_replay_removed_it(monkeypatch, tmp_path, vocab_dir):
+    conn, _ = _synced_conn(tmp_path, vocab_dir)
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl")
+    linked = iter([False, True])
+    monkeypatch.setattr(journal_module, "_is_linked", lambda handle, path: next(linked))
+
+    journal.record(_review("hiragana:a:kana_to_romaji", "2000-01-01T00:00:00+00:00"))
+    assert next(linked, None) is None
+    monkeypatch.undo()
+    journal.close()
+    assert _review_count(conn) == 1
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from jp_agent import llm_client
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.llm import LlmConfig
+from jp_agent.llm_client import CompletionClient, LatencyHistogram, LlmUnavailable
+from jp_agent.ratelimit import RateLimitExceeded
+from jp_agent.vocab import KeigoEntry, VocabStore
+
+MESSAGES = [{"role": "user", "content": "Explain 申し上げる."}]
+
+
+class GatedCompletions:
+    """Fake ``chat.completions`` whose calls block until ``release`` is set, then answer or raise."""
+
+    def __init__(self, content: str = "Humble form.") -> None:
+        self.content = content
+        self.error: Exception | None = None
+        self.release = threading.Event()
+        self.release.set()
+        self.calls: list[dict] = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"  {self.content}  "))])
+
+
+def _client(completions: GatedCompletions, **kwargs) -> CompletionClient:
+    config = LlmConfig(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), model="gpt")
+    return CompletionClient(config, **kwargs)
+
+
+def _wait_until(predicate) -> None:
+    for _ in range(500):
+        if predicate():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_latency_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram((1.0, 2.0))
+    assert histogram.quantile(0.5) == 0.0
+    for seconds in (0.5, 0.7, 1.5, 9.0):
+        histogram.record(seconds)
+    assert histogram.count == 4
+    assert histogram.total == pytest.approx(11.7)
+    assert histogram.snapshot() == {"<=1s": 2, "<=2s": 1, ">2s": 1}
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.75) == 2.0
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_identical_in_flight_prompts_share_one_call():
+    completions = GatedCompletions()
+    completions.release.clear()
+    charged: list[int] = []
+    client = _client(completions, rate_limit=lambda tokens, max_wait: charged.append(tokens))
+    results: list[str] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.complete(MESSAGES, max_tokens=50, temperature=0.2, tokens=9)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_until(lambda: client.coalesced == 2)
+    completions.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["Humble form."] * 3
+    assert len(completions.calls) == 1
+    assert completions.calls[0]["timeout"] == client.timeout
+    assert charged == [9]
+    assert client.calls == 1
+    assert client.latency.count == 1
+    # Once the call has finished, the same prompt goes out again.
+    assert client.complete(MESSAGES, max_tokens=50, temperature=0.2) == "Humble form."
+    assert len(completions.calls) == 2
+
+
+def test_deadline_errors_and_circuit_breaker(monkeypatch):
+    completions = GatedCompletions()
+    client = _client(completions, timeout=0.05, failure_threshold=2, reset_after=30.0)
+
+    completions.release.clear()
+    with pytest.raises(LlmUnavailable, match="timed out after 0.05s"):
+        client.complete(MESSAGES, max_tokens=50, temperature=0.2)
+    assert client.timeouts == 1
+    completions.error = RuntimeError("boom")
+    completions.release.set()
+    # The late call fails too, but its timeout was already counted.
+    _wait_until(lambda: client.calls == 1)
+    assert client.errors == 0
+    assert not client.circuit_open
+
+    with pytest.raises(LlmUnavailable, match="boom"):
+        client.complete(MESSAGES, max_tokens=50, temperature=0.2)
+    assert client.errors == 1
+    assert client.circuit_open
+    with pytest.raises(LlmUnavailable, match="circuit open"):
+        client.complete(MESSAGES, max_tokens=50, temperature=0.2)
+    assert client.short_circuited == 1
+    assert len(completions.calls) == 2
+
+    now = time.monotonic() + 31.0
+    monkeypatch.setattr(llm_client.time, "monotonic", lambda: now)
+    completions.error = ValueError()
+    with pytest.raises(LlmUnavailable, match="ValueError"):
+        client.complete(MESSAGES, max_tokens=50, temperature=0.2)
+    assert client.circuit_open
+    now += 31.0
+    completions.error = None
+    assert client.complete(MESSAGES, max_tokens=50, temperature=0.2) == "Humble form."
+    assert not client.circuit_open
+
+
+def test_rate_limit_errors_are_not_llm_failures():
+    def rate_limit(tokens: int, max_wait: float | None) -> None:
+        raise OSError("database is locked")
+
+    completions = GatedCompletions()
+    client = _client(completions, rate_limit=rate_limit)
+    with pytest.raises(OSError, match="database is locked"):
+        client.complete(MESSAGES, max_tokens=50, temperature=0.2)
+    assert (client.calls, client.errors, completions.calls) == (0, 0, [])
+
+
+def test_rate_limit_wait_counts_against_the_call_timeout():
+    waits: list[float | None] = []
+
+    def exhausted(tokens: int, max_wait: float | None) -> None:
+        waits.append(max_wait)
+        raise RateLimitExceeded(f"rate limit wait would exceed {max_wait:g}s")
+
+    def slow(tokens: int, max_wait: float | None) -> None:
+        waits.append(max_wait)
+        time.sleep(0.3)
+
+    completions = GatedCompletions()
+    client = _client(completions, timeout=0.5, rate_limit=exhausted)
+    with pytest.raises(LlmUnavailable, match="rate limit wait would exceed 0.5s"):
+        client.complete(MESSAGES, max_tokens=50, temperature=0.2)
+    with pytest.raises(LlmUnavailable, match="rate limit wait would exceed 0.5s"):
+        list(client.stream(MESSAGES, max_tokens=50, temperature=0.2))
+    assert (client.calls, client.errors, client.timeouts, completions.calls) == (0, 0, 0, [])
+
+    completions.release.clear()
+    begun = time.monotonic()
+    with pytest.raises(LlmUnavailable, match="timed out"):
+        _client(completions, timeout=0.5, rate_limit=slow).complete(MESSAGES, max_tokens=50, temperature=0.2)
+    # The 0.3 s budget wait came out of the 0.5 s timeout.
+    assert time.monotonic() - begun < 0.75
+    completions.release.set()
+
+    patient = _client(completions, timeout=0.5, rate_limit=slow, wait_for_budget=True)
+    assert patient.complete(MESSAGES, max_tokens=50, temperature=0.2) == "Humble form."
+    assert waits == [0.5, 0.5, 0.5, None]
+
+
+def test_generator_falls_back_to_template_when_llm_is_unavailable():
+    entry = KeigoEntry("言う", "申し上げる", "kenjogo", "to say", "business", ["email"])
+    vocab = VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[entry], core_vocab=[], survival_phrases=[])
+    completions = GatedCompletions()
+    completions.error = RuntimeError("503")
+    config = LlmConfig(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), model="gpt")
+    generator = ContentGeneratorAgent(vocab, config, llm_interval=0.0, llm_timeout=1.0)
+    assert generator._keigo_explanation(entry, "email", use_llm=True).startswith("申し上げる is the kenjogo form")
+    assert generator.llm_client.timeout == 1.0
+    assert generator.llm_client.errors == 1
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import random
+import struct
+
+import pytest
+
+from jp_agent import mapped_vocab, vocab_cache
+from jp_agent.agents.generator import ContentGeneratorAgent, _build_choices
+from jp_agent.agents.verifier import VerifierAgent
+from jp_agent.cards import build_all_cards
+from jp_agent.mapped_vocab import (
+    MAGIC,
+    MappedSection,
+    section_column,
+    section_key_map,
+    section_values,
+    write_mapped_section,
+)
+from jp_agent.models import StudyRequest
+from jp_agent.vocab import (
+    EXPECTED_FILES,
+    SECTION_ENTRY_TYPES,
+    KanaEntry,
+    KanjiEntry,
+    VocabStore,
+    compute_sha256,
+    load_all_vocab,
+    load_section,
+)
+from jp_agent.vocab_cache import VocabCache
+
+
+def _mapped(tmp_path, name, entry_type, entries) -> MappedSection:
+    path = tmp_path / f"{name}.jpvm"
+    write_mapped_section(path, entry_type, entries)
+    return MappedSection(path)
+
+
+def test_mapped_section_round_trips_and_indexes_fields(tmp_path):
+    entries = [KanjiEntry(kanji="日", meaning=["sun", "day"]), KanjiEntry(kanji="月", meaning=["moon"])]
+    section = _mapped(tmp_path, "kanji", KanjiEntry, entries)
+
+    assert len(section) == 2
+    assert list(section) == entries
+    assert section[-1] == entries[1]
+    assert section[0:2] == entries
+    with pytest.raises(IndexError):
+        section[2]
+
+    assert section.find("meaning", "day") == entries[0]
+    assert section.find("kanji", "火") is None
+    assert "moon" in section.column("meaning")
+    assert 1 not in section.column("kanji")
+    assert section.column("kanji")[1] == "月"
+    assert len(section.column("kanji")) == 2
+
+    by_kanji = section.key_map("kanji")
+    assert by_kanji["月"] == entries[1]
+    assert list(by_kanji) == ["日", "月"]
+    assert len(by_kanji) == 2
+    assert "火" not in by_kanji
+    with pytest.raises(KeyError):
+        by_kanji[None]
+
+    section.close()
+    empty = _mapped(tmp_path, "empty", KanaEntry, [])
+    assert len(empty) == 0
+    assert empty.find("kana", "a") is None
+
+
+def test_mapped_section_find_skips_hash_collisions(monkeypatch, tmp_path):
+    monkeypatch.setattr(mapped_vocab, "_hash", lambda value: 7)
+    entries = [KanaEntry(kana="a", romaji="a"), KanaEntry(kana="i", romaji="i")]
+    section = _mapped(tmp_path, "kana", KanaEntry, entries)
+    assert section.find("kana", "i") == entries[1]
+    assert section.find("kana", "u") is None
+
+
+def test_mapped_section_rejects_foreign_files(tmp_path):
+    path = tmp_path / "bad.jpvm"
+    path.write_bytes(struct.pack("<8sQ", b"NOTAMAP!", 0))
+    with pytest.raises(ValueError, match="Not a mapped vocab file"):
+        MappedSection(path)
+
+    write_mapped_section(path, KanaEntry, [KanaEntry(kana="a", romaji="a")])
+    data = path.read_bytes()
+    foreign = "big" if data.find(b'"little"') != -1 else "little"
+    current = "little" if foreign == "big" else "big"
+    path.write_bytes(data.replace(f'"{current}"'.encode(), f'"{foreign}"'.encode().ljust(len(current) + 2)))
+    assert path.read_bytes().startswith(MAGIC)
+    with pytest.raises(ValueError, match="foreign byte order"):
+        MappedSection(path)
+
+
+def test_section_helpers_accept_lists_and_mapped_sections(tmp_path):
+    entries = [KanjiEntry(kanji="日", meaning=["sun", "day"]), KanjiEntry(kanji="月", meaning=["moon"])]
+    section = _mapped(tmp_path, "kanji", KanjiEntry, entries)
+
+    assert section_key_map(entries, "kanji") == {"日": entries[0], "月": entries[1]}
+    assert section_column(entries, "kanji") == ["日", "月"]
+    assert section_values(entries, "meaning") == {"sun", "day", "moon"}
+    assert dict(section_key_map(section, "kanji")) == section_key_map(entries, "kanji")
+    assert list(section_column(section, "kanji")) == ["日", "月"]
+    assert all(value in section_values(section, "meaning") for value in ("sun", "day", "moon"))
+
+
+def test_generator_and_verifier_work_over_mapped_sections(tmp_path, vocab_dir):
+    vocab = load_all_vocab(vocab_dir)
+    mapped = {
+        section: _mapped(tmp_path, section, SECTION_ENTRY_TYPES[section], load_section(vocab_dir, section))
+        for section in EXPECTED_FILES
+    }
+    store = VocabStore(
+        hiragana=mapped["hiragana"],
+        katakana=mapped["katakana"],
+        kanji={level: mapped[f"kanji_{level}"] for level in ("N5", "N4", "N3", "N2")},
+        keigo=mapped["keigo"],
+        core_vocab=mapped["core_vocab"],
+        survival_phrases=mapped["survival"],
+    )
+    generator = ContentGeneratorAgent(store)
+    verifier = VerifierAgent()
+    rng = random.Random(5)
+    for card in build_all_cards(vocab):
+        request = StudyRequest(mode=card.mode, level=card.level, context="email", count=1, seed=5)
+        question = generator.generate(card, request, rng, use_llm=False)
+        result = verifier.verify(card, question, store)
+        assert result.valid, (card, result.issues)
+
+
+def test_large_pools_are_sampled_by_position(monkeypatch, tmp_path):
+    entries = [KanjiEntry(kanji=chr(0x4E00 + index), meaning=[f"m{index}", f"alt{index}"]) for index in range(200)]
+    section = _mapped(tmp_path, "kanji", KanjiEntry, entries)
+    store = VocabStore(hiragana=[], katakana=[], kanji={"N5": section}, keigo=[], core_vocab=[], survival_phrases=[])
+    generator = ContentGeneratorAgent(store)
+    verifier = VerifierAgent()
+    request = StudyRequest(mode="kanji", level="N5", context=None, count=1, seed=1)
+    rng = random.Random(1)
+    for card in build_all_cards(VocabStore([], [], {"N5": entries}, [], [], [])):
+        question = generator.generate(card, request, rng, use_llm=False)
+        assert verifier.verify(card, question, store).valid
+
+    pool = ["same"] * 100 + ["x", "y"]
+    choices, correct_index = _build_choices(random.Random(2), pool, "same")
+    assert sorted(choices) == ["same", "x", "y"]
+    assert choices[correct_index] == "same"
+    with pytest.raises(ValueError, match="Not enough distractors"):
+        _build_choices(random.Random(2), ["same"] * 100 + ["x"], "same")
+
+
+def test_cache_stores_large_sections_as_mapped_files(monkeypatch, tmp_path, vocab_dir):
+    hashes = {filename: compute_sha256(vocab_dir / filename) for filename in EXPECTED_FILES.values()}
+    cache = VocabCache(tmp_path / "cache", hashes, mapped_threshold=3)
+    cache.load(vocab_dir, "hiragana")
+    cache.path_for("hiragana", "stale").write_bytes(b"old")
+
+    loaded: list[str] = []
+    original = vocab_cache.load_section
+    monkeypatch.setattr(
+        vocab_cache, "load_section", lambda data_dir, section: loaded.append(section) or original(data_dir, section)
+    )
+    cache = VocabCache(tmp_path / "cache", {**hashes, EXPECTED_FILES["hiragana"]: "fresh"}, mapped_threshold=3)
+    cold = cache.load(vocab_dir, "hiragana")
+    warm = cache.load(vocab_dir, "hiragana")
+    assert isinstance(cold, MappedSection) and isinstance(warm, MappedSection)
+    assert list(warm) == load_section(vocab_dir, "hiragana")
+    assert loaded == ["hiragana"]
+    assert [item.name for item in (tmp_path / "cache").iterdir()] == ["hiragana-fresh.jpvm"]
@@ -3,8 +3,8 @@ from __future__ import annotations
 from datetime import date, timedelta
 
 from jp_agent import db
-from jp_agent.agents.planner import PlannerAgent
-from jp_agent.models import StudyRequest
+from jp_agent.agents.planner import PlannerAgent, refresh_plan
+from jp_agent.models import CardState, Plan, StudyRequest
 
 
 def test_planner_prefers_due_cards(tmp_path):
@@ -66,3 +66,54 @@ def test_planner_mixes_kana_modes(tmp_path):
 
     modes = {spec.mode for spec in plan.card_specs}
     assert modes == {"hiragana", "katakana"}
+
+
+def test_plan_carries_srs_state_and_refresh_reads_it_in_batches(monkeypatch, tmp_path):
+    conn = db.connect(tmp_path / "test.db")
+    db.ensure_schema(conn)
+    today = date.today().isoformat()
+    for idx, kana in enumerate(("a", "i", "u")):
+        conn.execute(
+            """
+            INSERT INTO cards (card_id, mode, level, variant, ease, interval, due_date, last_result, last_reviewed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)
+            """,
+            (f"hiragana:{kana}:kana_to_romaji", "hiragana", None, "kana_to_romaji", 2.0 + idx / 10, idx + 1, today),
+        )
+    conn.commit()
+
+    plan = PlannerAgent().plan(conn, StudyRequest(mode="hiragana", level=None, context=None, count=3, seed=1))
+    assert plan.states["hiragana:i:kana_to_romaji"] == CardState(ease=2.1, interval=2, due_date=today)
+    assert set(plan.states) == {card.card_id for card in plan.card_specs}
+
+    conn.execute("UPDATE cards SET interval = 9 WHERE card_id = 'hiragana:a:kana_to_romaji'")
+    conn.execute("DELETE FROM cards WHERE card_id = 'hiragana:u:kana_to_romaji'")
+    conn.commit()
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    monkeypatch.setattr(db, "FETCH_BATCH_SIZE", 2)
+    fresh = refresh_plan(conn, Plan(card_specs=plan.card_specs))
+    assert len(statements) == 2
+    assert fresh.card_specs == plan.card_specs
+    assert fresh.states["hiragana:a:kana_to_romaji"].interval == 9
+    assert "hiragana:u:kana_to_romaji" not in fresh.states
+
+
+def test_planner_without_a_level_plans_every_level(tmp_path):
+    conn = db.connect(tmp_path / "test.db")
+    db.ensure_schema(conn)
+    today = date.today().isoformat()
+    for level in ("N5", "N4"):
+        conn.execute(
+            """
+            INSERT INTO cards (card_id, mode, level, variant, ease, interval, due_date, last_result, last_reviewed_at)
+            VALUES (?, 'kanji', ?, 'kanji_to_meaning', 2.0, 1, ?, NULL, NULL)
+            """,
+            (f"kanji:{level}:x:kanji_to_meaning", level, today),
+        )
+    conn.commit()
+
+    request = StudyRequest(mode="kanji", level=None, context=None, count=5, seed=1)
+    plan = PlannerAgent().plan(conn, request)
+    assert sorted(spec.level for spec in plan.card_specs) == ["N4", "N5"]
+    assert sorted(row["level"] for row in db.fetch_due_cards(conn, "kanji", None, today, 5)) == ["N4", "N5"]
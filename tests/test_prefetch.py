@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+import pytest
+
+from jp_agent.models import CardSpec, GeneratedQuestion
+from jp_agent.prefetch import QuestionPrefetcher
+
+CARDS = [CardSpec(f"hiragana:{key}:kana_to_romaji", "hiragana", None, "kana_to_romaji", key) for key in "aiueo"]
+
+
+def _question(rng: random.Random, explanation: str) -> GeneratedQuestion:
+    return GeneratedQuestion("?", ["a", "b", "c"], rng.randrange(3), explanation, {})
+
+
+def _wait_for(predicate) -> None:
+    deadline = time.monotonic() + 5
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_prefetcher_yields_in_order_and_stays_bounded():
+    built: list[str] = []
+
+    def build(card, rng, use_llm):
+        built.append(card.vocab_key)
+        return _question(rng, "template"), []
+
+    with QuestionPrefetcher(build, CARDS, random.Random(4), use_llm=False, depth=1) as prefetcher:
+        # One question waits in the queue and the worker holds the next one.
+        _wait_for(lambda: len(built) == 2)
+        time.sleep(0.2)
+        assert built == ["a", "i"]
+        items = list(prefetcher)
+
+    assert [card for card, _, _ in items] == CARDS
+    with QuestionPrefetcher(build, CARDS, random.Random(4), use_llm=False) as prefetcher:
+        again = list(prefetcher)
+    assert [question for _, question, _ in again] == [question for _, question, _ in items]
+
+
+def test_prefetcher_close_cancels_the_worker():
+    built: list[str] = []
+
+    def build(card, rng, use_llm):
+        built.append(card.vocab_key)
+        return _question(rng, ""), []
+
+    prefetcher = QuestionPrefetcher(build, CARDS, random.Random(1), use_llm=False, depth=1).__enter__()
+    assert next(iter(prefetcher))[0] == CARDS[0]
+    _wait_for(lambda: len(built) == 3)
+    prefetcher.close()
+    assert built == ["a", "i", "u"]
+
+
+def test_inline_prefetcher_stops_after_close():
+    def build(card, rng, use_llm):
+        return _question(rng, ""), []
+
+    prefetcher = QuestionPrefetcher(build, CARDS, random.Random(1), use_llm=False, depth=0).start()
+    items = iter(prefetcher)
+    assert next(items)[0] == CARDS[0]
+    prefetcher.close()
+    assert next(items, None) is None
+
+
+def test_slow_llm_build_falls_back_to_template_with_the_same_choices():
+    release = threading.Event()
+
+    def build(card, rng, use_llm):
+        if use_llm and card.vocab_key == "i":
+            release.wait(5)
+            return _question(rng, "llm"), []
+        return _question(rng, "llm" if use_llm else "template"), []
+
+    with QuestionPrefetcher(build, CARDS[:2], random.Random(2), deadline=0.25) as prefetcher:
+        items = list(prefetcher)
+        release.set()
+    fast, slow = (question for _, question, _ in items)
+    assert fast.explanation == "llm"
+    assert slow.explanation == "template"
+
+    seeds = random.Random(2)
+    seeds.getrandbits(64)
+    assert slow.correct_index == random.Random(seeds.getrandbits(64)).randrange(3)
+
+
+def test_prefetcher_cancels_while_waiting_on_the_llm():
+    release = threading.Event()
+    started = threading.Event()
+
+    finished: list[str] = []
+
+    def build(card, rng, use_llm):
+        if use_llm:
+            started.set()
+            release.wait(5)
+            finished.append(card.vocab_key)
+        return _question(rng, ""), []
+
+    prefetcher = QuestionPrefetcher(build, CARDS, random.Random(3), deadline=30).__enter__()
+    started.wait(5)
+    begun = time.monotonic()
+    threading.Timer(0.3, release.set).start()
+    prefetcher.close()
+    # close() returns once the in-flight build is done, long before the deadline.
+    assert time.monotonic() - begun < 5
+    assert finished == ["a"]
+
+
+def test_prefetcher_reraises_build_errors():
+    def build(card, rng, use_llm):
+        raise RuntimeError(f"broken {card.vocab_key}")
+
+    for use_llm in (False, True):
+        with QuestionPrefetcher(build, CARDS, random.Random(1), use_llm=use_llm) as prefetcher:
+            with pytest.raises(RuntimeError, match="broken a"):
+                list(prefetcher)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from jp_agent import ratelimit
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.llm import LlmConfig
+from jp_agent.ratelimit import RateLimitExceeded, RateLimits, TokenBucketLimiter
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [1000.0]
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now[0])
+    monkeypatch.setattr(ratelimit.time, "sleep", sleep)
+    return SimpleNamespace(now=now, sleeps=sleeps)
+
+
+def test_limits_from_env(monkeypatch):
+    for name in ("JP_AGENT_LLM_RPM", "JP_AGENT_LLM_TPM", "JP_AGENT_LLM_BURST"):
+        monkeypatch.delenv(name, raising=False)
+    assert RateLimits.from_env() == RateLimits(60.0, None, 1)
+    monkeypatch.setenv("JP_AGENT_LLM_RPM", "120")
+    monkeypatch.setenv("JP_AGENT_LLM_TPM", "4000")
+    monkeypatch.setenv("JP_AGENT_LLM_BURST", "5")
+    assert RateLimits.from_env() == RateLimits(120.0, 4000.0, 5)
+    for name, raw in (("JP_AGENT_LLM_RPM", "0"), ("JP_AGENT_LLM_TPM", "-5"), ("JP_AGENT_LLM_BURST", "1.5")):
+        monkeypatch.setenv(name, raw)
+        with pytest.raises(ValueError, match=f"{name} must be .* greater than 0, got '{raw}'"):
+            RateLimits.from_env()
+        monkeypatch.setenv(name, "2")
+
+
+def test_burst_then_steady_rate_shared_across_limiters(tmp_path, clock):
+    limits = RateLimits(requests_per_minute=60, burst=2)
+    first = TokenBucketLimiter(tmp_path / "app.db", "gpt", limits)
+    # A second limiter on the same DB stands in for another process.
+    second = TokenBucketLimiter(tmp_path / "app.db", "gpt", limits)
+    other_model = TokenBucketLimiter(tmp_path / "app.db", "other", limits)
+
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    assert first.acquire() == pytest.approx(1.0)
+    assert second.acquire() == pytest.approx(1.0)
+    assert other_model.acquire() == 0.0
+
+    clock.now[0] += 10
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    assert first.acquire() == pytest.approx(1.0)
+    assert (first.acquired, second.acquired) == (4, 3)
+    assert first.waited == pytest.approx(2.0)
+    assert second.waited == pytest.approx(1.0)
+    for limiter in (first, second, other_model):
+        limiter.close()
+
+
+def test_token_budget_delays_large_requests(tmp_path, clock):
+    limiter = TokenBucketLimiter(tmp_path / "app.db", "gpt", RateLimits(600, tokens_per_minute=600, burst=10))
+    assert limiter.acquire(tokens=500) == 0.0
+    # 100 tokens left; 300 more arrive at 10 per second.
+    assert limiter.acquire(tokens=400) == pytest.approx(30.0)
+    # Larger than the whole budget: waits for a full bucket rather than forever.
+    assert limiter.acquire(tokens=10_000) == pytest.approx(60.0)
+    # A clock stepping backwards refills nothing.
+    clock.now[0] -= 100
+    assert limiter.acquire(tokens=0) == 0.0
+    assert limiter.acquire(tokens=1) == pytest.approx(0.1)
+    limiter.close()
+
+
+def test_failed_take_rolls_back(tmp_path, clock):
+    limiter = TokenBucketLimiter(tmp_path / "app.db", "gpt", RateLimits())
+    limiter._conn.execute("DROP TABLE rate_buckets")
+    with pytest.raises(sqlite3.OperationalError):
+        limiter.acquire()
+    assert not limiter._conn.in_transaction
+    limiter.close()
+
+
+def test_generator_charges_the_shared_limiter(tmp_path, clock):
+    limiter = TokenBucketLimiter(tmp_path / "app.db", "gpt", RateLimits(60, tokens_per_minute=1000))
+    generator = ContentGeneratorAgent(SimpleNamespace(), LlmConfig(client=None, model="gpt", rate_limiter=limiter))
+    generator._rate_limit(tokens=600)
+    generator._rate_limit(tokens=600)
+    assert clock.sleeps == [pytest.approx(12.0)]
+    assert limiter.waited == pytest.approx(12.0)
+    limiter.close()
+
+
+def test_acquire_gives_up_past_max_wait_without_taking_budget(tmp_path, clock):
+    limiter = TokenBucketLimiter(tmp_path / "app.db", "gpt", RateLimits(60, tokens_per_minute=1000))
+    generator = ContentGeneratorAgent(SimpleNamespace(), LlmConfig(client=None, model="gpt", rate_limiter=limiter))
+    generator._rate_limit(tokens=600, max_wait=6.0)
+    with pytest.raises(RateLimitExceeded, match="would exceed 6s"):
+        generator._rate_limit(tokens=600, max_wait=6.0)
+    assert clock.sleeps == []
+    assert limiter.acquired == 1
+    assert limiter.acquire(600, max_wait=15.0) == pytest.approx(12.0)
+    assert limiter.acquired == 2
+    limiter.close()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from jp_agent import db, session as session_module
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.agents.planner import PlannerAgent
+from jp_agent.agents.srs import SrsAgent
+from jp_agent.agents.verifier import VerifierAgent
+from jp_agent.cards import build_all_cards
+from jp_agent.journal import ReviewJournal
+from jp_agent.models import Plan, StudyRequest
+from jp_agent.session import SKIP_MISSING, QuizSession, SessionQuestion, SkippedCard
+from jp_agent.vocab import LazyVocabStore
+
+REQUEST = StudyRequest(mode="hiragana", level=None, context=None, count=3, seed=7)
+
+
+@pytest.fixture()
+def deck(tmp_path, vocab_dir):
+    conn = db.connect(tmp_path / "session.db")
+    db.ensure_schema(conn)
+    vocab = LazyVocabStore(vocab_dir)
+    db.sync_cards(conn, build_all_cards(vocab), date.today().isoformat())
+    plan = PlannerAgent().plan(conn, REQUEST)
+    yield conn, vocab, plan
+    conn.close()
+
+
+def _session(conn, vocab, plan, **kwargs) -> QuizSession:
+    generator = ContentGeneratorAgent(vocab)
+    srs = SrsAgent(journal=kwargs.get("journal"))
+    return QuizSession(conn, REQUEST, plan, vocab, generator, VerifierAgent(), srs, **kwargs)
+
+
+def _drive(session: QuizSession) -> list[tuple[int, str, str]]:
+    answered = []
+    while (item := session.next_question()) is not None:
+        assert session.next_question() is item
+        result = session.submit(item.question.correct_index, 120)
+        assert result.correct
+        answered.append((item.number, item.card.card_id, item.question.prompt))
+    return answered
+
+
+def test_session_steps_through_plan_and_applies_srs(deck):
+    conn, vocab, plan = deck
+    with _session(conn, vocab, plan) as session:
+        with pytest.raises(ValueError, match="No question is waiting"):
+            session.submit(0, 100)
+        first = session.next_question()
+        with pytest.raises(ValueError, match="Answer must be between 0 and 2"):
+            session.submit(3, 100)
+        result = session.submit((first.question.correct_index + 1) % 3, 2500)
+        assert not result.correct
+        assert result.question is first
+        assert result.srs.interval_after == 1
+        assert session.next_question().number == 2
+
+    row = db.fetch_card(conn, first.card.card_id)
+    assert row["last_result"] == 0
+    assert conn.execute("SELECT response_ms FROM reviews").fetchone()[0] == 2500
+
+
+def test_inline_session_matches_prefetched_session(deck, tmp_path):
+    conn, vocab, plan = deck
+    journal = ReviewJournal(conn, tmp_path / "reviews.jsonl")
+    with _session(conn, vocab, plan, journal=journal, prefetch=0) as inline:
+        inline_answers = _drive(inline)
+    assert journal.pending == 3
+    journal.close()
+    with _session(conn, vocab, plan, prefetch=2) as prefetched:
+        prefetched_answers = _drive(prefetched)
+    assert inline_answers == prefetched_answers
+    assert [number for number, _, _ in inline_answers] == [1, 2, 3]
+
+
+def test_session_refreshes_plans_without_state_and_skips_deleted_cards(deck):
+    conn, vocab, plan = deck
+    gone = plan.card_specs[1]
+    conn.execute("DELETE FROM cards WHERE card_id = ?", (gone.card_id,))
+    conn.commit()
+    with _session(conn, vocab, Plan(card_specs=plan.card_specs), prefetch=0) as session:
+        assert isinstance(session.next_question(), SessionQuestion)
+        session.submit(0, 100)
+        assert session.next_question() == SkippedCard(2, gone, SKIP_MISSING, [])
+        assert session.next_question().number == 3
+
+
+def test_many_sessions_run_concurrently_under_asyncio(deck):
+    conn, vocab, plan = deck
+    generator = ContentGeneratorAgent(vocab)
+    verifier = VerifierAgent()
+
+    async def learner(seed: int) -> int:
+        request = StudyRequest("hiragana", None, None, 3, seed)
+        answered = 0
+        with QuizSession(conn, request, plan, vocab, generator, verifier, SrsAgent(), prefetch=0) as session:
+            while (item := await session.next_question_async()) is not None:
+                session.submit(item.question.correct_index, 50)
+                answered += 1
+        return answered
+
+    async def main() -> list[int]:
+        return await asyncio.gather(*(learner(seed) for seed in range(20)))
+
+    assert asyncio.run(main()) == [3] * 20
+    assert conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 60
+
+
+def test_close_wakes_a_pending_next_question_async(deck, monkeypatch):
+    conn, vocab, plan = deck
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_build(generator, verifier, vocab, card, request, rng, use_llm=True):
+        started.set()
+        release.wait(5)
+        return None, ["late"]
+
+    monkeypatch.setattr(session_module, "_build_question", slow_build)
+    quiz_session = _session(conn, vocab, plan, prefetch=1, deadline=30)
+
+    async def main():
+        waiting = asyncio.create_task(quiz_session.next_question_async())
+        await asyncio.to_thread(started.wait, 5)
+        begun = time.monotonic()
+        threading.Timer(0.3, release.set).start()
+        await asyncio.to_thread(quiz_session.close)
+        item = await asyncio.wait_for(waiting, timeout=2)
+        return item, time.monotonic() - begun
+
+    try:
+        item, elapsed = asyncio.run(main())
+    finally:
+        release.set()
+    assert item is None
+    assert elapsed < 2
+    assert quiz_session.next_question() is None
+
+
+def test_next_question_returns_none_after_close(deck):
+    conn, vocab, plan = deck
+    for prefetch in (0, 2):
+        quiz_session = _session(conn, vocab, plan, prefetch=prefetch)
+        assert quiz_session.next_question().number == 1
+        quiz_session.close()
+        assert quiz_session.next_question() is None
+        with pytest.raises(ValueError, match="No question is waiting"):
+            quiz_session.submit(0, 100)
+    unstarted = _session(conn, vocab, plan)
+    unstarted.close()
+    assert unstarted.next_question() is None
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import date
+from types import SimpleNamespace
+
+from openai import OpenAI
+
+from jp_agent import db, quiz
+from jp_agent.agents.generator import ContentGeneratorAgent, _keigo_template
+from jp_agent.cards import build_all_cards
+from jp_agent.explanations import ExplanationCache, explanation_key
+from jp_agent.llm import LlmConfig
+from jp_agent.models import CardSpec, StudyRequest
+from jp_agent.ratelimit import RateLimits, TokenBucketLimiter
+from jp_agent.vocab import KeigoEntry, LazyVocabStore, VocabStore
+
+ENTRY = KeigoEntry("言う", "申し上げる", "kenjogo", "to say", "business", ["email"])
+
+
+class BrokenStream:
+    """Streamed response that yields ``pieces`` and then fails."""
+
+    def __init__(self, *pieces: str) -> None:
+        self.pieces = pieces
+
+    def __enter__(self) -> BrokenStream:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def __iter__(self):
+        yield SimpleNamespace(choices=[])
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+        raise RuntimeError("connection reset")
+
+
+def test_run_quiz_streams_vetted_explanations_from_stub(monkeypatch, tmp_path, vocab_dir, stub_server, capsys):
+    conn = db.connect(tmp_path / "app.db")
+    db.ensure_schema(conn)
+    vocab = LazyVocabStore(vocab_dir)
+    db.sync_cards(conn, build_all_cards(vocab), date.today().isoformat())
+    client = OpenAI(api_key="test-key", base_url=f"http://127.0.0.1:{stub_server.server_port}/v1")
+    limiter = TokenBucketLimiter(tmp_path / "app.db", "stub-model", RateLimits(requests_per_minute=60000, burst=10))
+    llm = LlmConfig(client=client, model="stub-model", rate_limiter=limiter)
+    cache = ExplanationCache(tmp_path / "app.db")
+    stub_server.empty_for = {("行く", "email")}
+    monkeypatch.setattr(quiz, "_prompt_for_answer", lambda choice_count: 0)
+
+    request = StudyRequest(mode="keigo", level=None, context="email", count=9, seed=5)
+    quiz.run_quiz(conn, request, vocab, llm, explanations=cache, stream=True)
+    output = capsys.readouterr().out
+
+    assert output.count("The humble form of 言う for email.") == 3
+    # The first piece of the 見る reply was shown before 言 arrived, so it is withdrawn once;
+    # later cards are served the template straight from the rejected cache entry.
+    assert output.count("Similar to \n(Explanation withdrawn: it used Japanese outside this card.)") == 1
+    assert "言う in tone" not in output
+    by_base = {entry.base: entry for entry in vocab.keigo}
+    assert output.count(_keigo_template(by_base["見る"])) == 3
+    assert output.count(_keigo_template(by_base["行く"])) == 3
+    assert all(body["stream"] for body in stub_server.requests)
+    assert len(stub_server.requests) == 5
+
+    assert cache.get(explanation_key(by_base["言う"], "email", "stub-model")).accepted is True
+    assert cache.get(explanation_key(by_base["見る"], "email", "stub-model")).accepted is False
+    assert cache.get(explanation_key(by_base["行く"], "email", "stub-model")) is None
+    cache.close()
+    limiter.close()
+
+
+def test_stream_failure_falls_back_to_template(capsys):
+    vocab = VocabStore(hiragana=[], katakana=[], kanji={}, keigo=[ENTRY], core_vocab=[], survival_phrases=[])
+    streams = iter([BrokenStream(" The humble", " form"), BrokenStream()])
+    completions = SimpleNamespace(create=lambda **kwargs: next(streams))
+    llm = LlmConfig(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), model="gpt")
+    generator = ContentGeneratorAgent(vocab, llm, llm_interval=0.0)
+    card = CardSpec("keigo:言う:plain_to_keigo", "keigo", None, "plain_to_keigo", "言う")
+    request = StudyRequest("keigo", None, None, 1, 1)
+    template = _keigo_template(ENTRY)
+
+    quiz._stream_explanation(generator, card, request, template)
+    assert capsys.readouterr().out == f"The humble form\n(Explanation interrupted.)\n{template}\n"
+    quiz._stream_explanation(generator, card, request, template)
+    assert capsys.readouterr().out == f"{template}\n"
+    assert generator.llm_client.errors == 2
+    assert generator.llm_client.latency.count == 2
+    # Without a cache there is nothing to remember.
+    generator.remember_explanation(ENTRY, None, "The humble form.", True)
@@ -8,11 +8,20 @@ import pytest
 from jp_agent import db
 from jp_agent.agents.planner import PlannerAgent
 from jp_agent.agents.srs import SrsAgent, update_srs
-from jp_agent.cards import parse_vocab_key
+from jp_agent.cards import (
+    build_kana_cards,
+    build_kanji_cards,
+    build_keigo_cards,
+    build_phrase_cards,
+    iter_kana_cards,
+    iter_kanji_cards,
+    parse_vocab_key,
+)
 from jp_agent.config import DEFAULT_DATA_DIRNAME, Paths, resolve_paths
 from jp_agent.llm import get_llm_config
 from jp_agent.models import CardSpec, StudyRequest
 from jp_agent.utils import sanitize_lines, sanitize_text
+from jp_agent.vocab import KanaEntry, KanjiEntry, KeigoEntry, PhraseEntry
 
 
 def _insert_card(
@@ -86,6 +95,7 @@ def test_get_llm_config_handles_missing_and_present_env(monkeypatch):
         ("keigo:言う:plain_to_keigo", "keigo", "言う"),
         ("vocab:friend:english_to_japanese", "vocab", "friend"),
         ("survival:thank you:japanese_to_english", "survival", "thank you"),
+        ("vocab:Time: 3 o'clock:english_to_japanese", "vocab", "Time: 3 o'clock"),
     ],
 )
 def test_parse_vocab_key_valid_modes(card_id, mode, expected):
@@ -205,3 +215,136 @@ def test_srs_caps_and_persists_review(tmp_path):
     result = SrsAgent().apply(conn, row, True, 250)
     assert result.interval_after == 6
     assert db.stats_accuracy(conn, "1900-01-01T00:00:00+00:00") == (1, 1)
+
+
+def test_ensure_schema_migrates_cards_without_rand_key_or_vocab_key(tmp_path):
+    conn = db.connect(tmp_path / "legacy.db")
+    conn.execute(
+        """
+        CREATE TABLE cards (
+            card_id TEXT PRIMARY KEY,
+            mode TEXT NOT NULL,
+            level TEXT,
+            variant TEXT NOT NULL,
+            ease REAL NOT NULL,
+            interval INTEGER NOT NULL,
+            due_date TEXT NOT NULL,
+            last_result INTEGER,
+            last_reviewed_at TEXT
+        )
+        """
+    )
+    _insert_card(conn, "hiragana:a:kana_to_romaji", "hiragana", date.today().isoformat())
+    _insert_card(conn, "vocab:Time: 3 o'clock:english_to_japanese", "vocab", date.today().isoformat())
+    _insert_card(conn, "hiragana:broken", "hiragana", date.today().isoformat())
+
+    db.ensure_schema(conn)
+    db.ensure_schema(conn)
+
+    row = db.fetch_card(conn, "hiragana:a:kana_to_romaji")
+    assert row["rand_key"] is not None
+    assert row["vocab_key"] == "a"
+    assert db.fetch_card(conn, "vocab:Time: 3 o'clock:english_to_japanese")["vocab_key"] == "Time: 3 o'clock"
+    assert db.fetch_card(conn, "hiragana:broken")["vocab_key"] is None
+
+
+def test_sync_cards_stores_vocab_key_and_planner_reads_it(tmp_path):
+    conn = db.connect(tmp_path / "keys.db")
+    db.ensure_schema(conn)
+    today = date.today().isoformat()
+    card = CardSpec(
+        card_id="vocab:Time: 3 o'clock:english_to_japanese",
+        mode="vocab",
+        level=None,
+        variant="english_to_japanese",
+        vocab_key="Time: 3 o'clock",
+    )
+    _insert_card(conn, card.card_id, "vocab", today, variant=card.variant)
+    conn.execute("UPDATE cards SET vocab_key = 'Time' WHERE card_id = ?", (card.card_id,))
+    conn.commit()
+
+    db.sync_cards(conn, [card], today)
+    assert db.fetch_card(conn, card.card_id)["vocab_key"] == "Time: 3 o'clock"
+    request = StudyRequest(mode="vocab", level=None, context=None, count=1, seed=1)
+    assert PlannerAgent().plan(conn, request).card_specs == [card]
+
+
+def test_randomized_fetch_samples_by_random_key(monkeypatch, tmp_path):
+    conn = db.connect(tmp_path / "sample.db")
+    db.ensure_schema(conn)
+
+    today = date.today().isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    for idx in range(db.SAMPLE_PROBE_FACTOR * 2 + 1):
+        _insert_card(conn, f"kanji:N5:{idx}:kanji_to_meaning", "kanji", today, level="N5", variant="kanji_to_meaning")
+    _insert_card(conn, "kanji:N4:x:kanji_to_meaning", "kanji", today, level="N4", variant="kanji_to_meaning")
+    _insert_card(conn, "kanji:N5:later:kanji_to_meaning", "kanji", tomorrow, level="N5", variant="kanji_to_meaning")
+
+    sampled = db.fetch_due_cards(conn, "kanji", "N5", today, 2, randomize=True)
+    assert len({row["card_id"] for row in sampled}) == 2
+    assert all(row["level"] == "N5" and row["due_date"] == today for row in sampled)
+
+    # Starting past the largest key wraps around to the smallest ones.
+    monkeypatch.setattr(db.random, "getrandbits", lambda bits: 2**64 - 1)
+    wrapped = db.fetch_due_cards(conn, "kanji", "N5", today, 2, randomize=True)
+    smallest = conn.execute(
+        "SELECT card_id FROM cards WHERE level = 'N5' AND due_date <= ? ORDER BY rand_key LIMIT 2", (today,)
+    ).fetchall()
+    assert [row["card_id"] for row in wrapped] == [row["card_id"] for row in smallest]
+
+    upcoming = db.fetch_next_cards(conn, "kanji", "N5", today, 5, randomize=True)
+    assert [row["card_id"] for row in upcoming] == ["kanji:N5:later:kanji_to_meaning"]
+
+    # No level means any level, on both the key walk and the whole-set sample.
+    any_level = db.fetch_due_cards(conn, "kanji", None, today, db.SAMPLE_PROBE_FACTOR * 2 + 2, randomize=True)
+    assert {row["level"] for row in any_level} == {"N4", "N5"}
+    upcoming = db.fetch_next_cards(conn, "kanji", None, today, 5, randomize=True)
+    assert [row["card_id"] for row in upcoming] == ["kanji:N5:later:kanji_to_meaning"]
+
+
+def test_sync_cards_streams_batches_and_keeps_review_state(monkeypatch, tmp_path):
+    conn = db.connect(tmp_path / "sync.db")
+    db.ensure_schema(conn)
+    monkeypatch.setattr(db, "SYNC_BATCH_SIZE", 2)
+    today = date.today().isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+
+    entries = [KanaEntry("a", "a"), KanaEntry("i", "i"), KanaEntry("u", "u")]
+    db.sync_cards(conn, iter_kana_cards("hiragana", entries), today)
+    assert db.stats_overview(conn) == {"total": 6}
+
+    db.update_review(
+        conn,
+        card_id="hiragana:a:kana_to_romaji",
+        correct=True,
+        response_ms=100,
+        ease_before=2.0,
+        ease_after=2.1,
+        interval_before=1,
+        interval_after=2,
+        due_date_iso=tomorrow,
+    )
+
+    duplicated = list(iter_kana_cards("hiragana", entries[:2])) + build_kana_cards("hiragana", entries[:1])
+    db.sync_cards(conn, (card for card in duplicated), today)
+    assert db.stats_overview(conn) == {"total": 4}
+    kept = db.fetch_card(conn, "hiragana:a:kana_to_romaji")
+    assert kept["interval"] == 2
+    assert kept["due_date"] == tomorrow
+    assert db.fetch_card(conn, "hiragana:u:kana_to_romaji") is None
+
+
+def test_card_builders_match_their_iterators():
+    kanji = [KanjiEntry("日", ["sun"])]
+    keigo = [KeigoEntry("言う", "申し上げる", "kenjogo", "to say", "business", ["email"])]
+    phrases = [PhraseEntry("friend", "友達", "ともだち", "tomodachi")]
+    assert build_kanji_cards("N5", kanji) == list(iter_kanji_cards("N5", kanji))
+    assert [card.variant for card in build_keigo_cards(keigo)] == [
+        "plain_to_keigo",
+        "context_selection",
+        "politeness_classification",
+    ]
+    assert [card.card_id for card in build_phrase_cards("vocab", phrases)] == [
+        "vocab:friend:english_to_japanese",
+        "vocab:friend:japanese_to_english",
+    ]
@@ -4,17 +4,17 @@ from jp_agent.agents.generator import ContentGeneratorAgent
 from jp_agent.agents.verifier import VerifierAgent
 from jp_agent.cards import build_all_cards
 from jp_agent.models import StudyRequest
-from jp_agent.vocab import load_all_vocab, load_vocab_for_mode
+from jp_agent.vocab import LazyVocabStore, load_all_vocab
 
 
 def test_load_vocab_mode(vocab_dir):
-    vocab = load_vocab_for_mode(vocab_dir, "vocab", None)
+    vocab = LazyVocabStore(vocab_dir)
     assert len(vocab.core_vocab) == 3
     assert vocab.core_vocab[0].english
 
 
 def test_load_survival_mode(vocab_dir):
-    vocab = load_vocab_for_mode(vocab_dir, "survival", None)
+    vocab = LazyVocabStore(vocab_dir)
     assert len(vocab.survival_phrases) == 3
     assert vocab.survival_phrases[0].japanese
 
@@ -22,3 +22,16 @@ def test_keigo_validation_rejects_invalid_type(tmp_path):
     path.write_text(json.dumps(data), encoding="utf-8")
     with pytest.raises(ValueError):
         load_keigo(path)
+
+
+def test_entries_and_cards_are_slotted_and_share_repeated_strings(vocab_dir):
+    from jp_agent.cards import build_all_cards
+    from jp_agent.vocab import load_all_vocab
+
+    vocab = load_all_vocab(vocab_dir)
+    first, second = vocab.keigo[0], vocab.keigo[1]
+    assert not hasattr(first, "__dict__")
+    assert first.type is second.type
+    assert first.example_contexts[0] is second.example_contexts[0]
+    card = build_all_cards(vocab)[0]
+    assert not hasattr(card, "__dict__")
@@ -1,22 +1,29 @@
 from __future__ import annotations
 
+import io
 import json
 
 import pytest
 
 from jp_agent import db
+from jp_agent import vocab as vocab_module
 from jp_agent.vocab import (
     EXPECTED_FILES,
+    LazyVocabStore,
     VocabStore,
     _load_json,
     _normalize_meaning,
+    cached_sha256_many,
     compute_sha256,
+    iter_json_records,
+    iter_section,
     load_all_vocab,
     load_kana,
     load_kanji,
     load_keigo,
     load_phrases,
-    load_vocab_for_mode,
+    load_section,
+    load_sections,
     required_filenames,
     resolve_vocab_path,
     verify_vocab_hashes,
@@ -154,20 +161,14 @@ def test_keigo_and_phrase_validation_errors(tmp_path):
         load_phrases(phrase_path)
 
 
-def test_load_vocab_for_mode_branches_and_hash_checks(tmp_path, vocab_dir):
-    kana = load_vocab_for_mode(vocab_dir, "kana", None)
-    assert len(kana.hiragana) == 3
-    assert len(kana.katakana) == 3
-    assert len(load_vocab_for_mode(vocab_dir, "katakana", None).katakana) == 3
-    assert len(load_vocab_for_mode(vocab_dir, "kanji", "N5").kanji["N5"]) == 3
-    assert len(load_vocab_for_mode(vocab_dir, "keigo", None).keigo) == 3
-
-    with pytest.raises(ValueError, match="Kanji mode requires a level"):
-        load_vocab_for_mode(vocab_dir, "kanji", None)
-    with pytest.raises(ValueError, match="Unsupported kanji level"):
-        load_vocab_for_mode(vocab_dir, "kanji", "N1")
-    with pytest.raises(ValueError, match="Unsupported mode"):
-        load_vocab_for_mode(vocab_dir, "other", None)
+def test_lazy_store_sections_and_hash_checks(tmp_path, vocab_dir):
+    store = LazyVocabStore(vocab_dir)
+    assert len(store.hiragana) == 3
+    assert len(store.katakana) == 3
+    assert len(store.kanji["N5"]) == 3
+    assert len(store.keigo) == 3
+    with pytest.raises(KeyError):
+        store.kanji["N1"]
 
     conn = db.connect(tmp_path / "hashes.db")
     db.ensure_schema(conn)
@@ -178,3 +179,86 @@ def test_load_vocab_for_mode_branches_and_hash_checks(tmp_path, vocab_dir):
     for name in required_filenames("hiragana", None):
         db.upsert_vocab_hash(conn, name, compute_sha256(vocab_dir / name))
     verify_vocab_hashes(conn, vocab_dir, "hiragana", None)
+
+
+def test_load_section_reads_one_expected_file(vocab_dir):
+    assert [entry.kanji for entry in load_section(vocab_dir, "kanji_N4")] == ["日", "月", "火"]
+    assert load_section(vocab_dir, "core_vocab")[0].english == "friend"
+    with pytest.raises(ValueError, match="Unsupported vocab section"):
+        load_section(vocab_dir, "kanji_N1")
+
+
+def test_parallel_loading_and_hashing_match_sequential(tmp_path, vocab_dir):
+    assert load_all_vocab(vocab_dir, workers=4) == load_all_vocab(vocab_dir, workers=1)
+
+    conn = db.connect(tmp_path / "parallel.db")
+    db.ensure_schema(conn)
+    paths = {filename: vocab_dir / filename for filename in EXPECTED_FILES.values()}
+    hashes = cached_sha256_many(conn, paths, workers=4)
+    assert list(hashes) == list(paths)
+    assert hashes == {filename: compute_sha256(path) for filename, path in paths.items()}
+
+    (vocab_dir / EXPECTED_FILES["keigo"]).write_text("{}", encoding="utf-8")
+    (vocab_dir / EXPECTED_FILES["kanji_N2"]).write_text("[1]", encoding="utf-8")
+    with pytest.raises(ValueError, match="keigo_basic.json"):
+        load_sections(vocab_dir, ["hiragana", "keigo", "kanji_N2"], workers=3)
+    with pytest.raises(ValueError, match="kanji_N2.json"):
+        load_sections(vocab_dir, ["kanji_N2", "keigo"], workers=2)
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text: str) -> None:
+        super().__init__(text)
+        self.chars_read = 0
+
+    def read(self, size: int = -1) -> str:
+        chunk = super().read(size)
+        self.chars_read += len(chunk)
+        return chunk
+
+
+def test_streaming_reader_fails_fast_on_a_malformed_item(monkeypatch, tmp_path):
+    monkeypatch.setattr(vocab_module, "STREAM_CHUNK_SIZE", 16)
+    path = tmp_path / "items.json"
+    handle = CountingReader('[{"kana": "あ"}, {"kana" "い"}, ' + ", ".join(['"padding"'] * 10_000) + "]")
+    with pytest.raises(ValueError, match=r"items.json at item 1 \(char 24\): Expecting ':' delimiter"):
+        list(vocab_module._iter_json_array(handle, path))
+    assert handle.chars_read < 100
+
+
+def test_streaming_reader_handles_chunk_boundaries_and_json_lines(monkeypatch, tmp_path):
+    monkeypatch.setattr(vocab_module, "STREAM_CHUNK_SIZE", 3)
+    path = tmp_path / "items.json"
+    items = [{"kana": "あ", "romaji": "a"}, 12345, "x,y", [1, [2]], None]
+    path.write_text(" [ " + " , ".join(json.dumps(item, ensure_ascii=False) for item in items) + " ] \n", encoding="utf-8")
+    assert list(iter_json_records(path)) == items
+    path.write_text("[\n]", encoding="utf-8")
+    assert list(iter_json_records(path)) == []
+
+    path.write_text("[1.5, -Infinity, \"\\u3042\"]", encoding="utf-8")
+    assert list(iter_json_records(path)) == [1.5, float("-inf"), "あ"]
+
+    for text, message in (
+        ("[1 2]", r"at item 1 \(char 3\): Expecting ','"),
+        ("[1] 2", r"at item 1 \(char 4\): Extra data"),
+        ('[{"a": ', r"at item 0 \(char 7\): Expecting value"),
+    ):
+        path.write_text(text, encoding="utf-8")
+        with pytest.raises(ValueError, match=f"Invalid JSON in .*items.json {message}"):
+            list(iter_json_records(path))
+    path.write_text("", encoding="utf-8")
+    with pytest.raises(ValueError, match="JSON array"):
+        list(iter_json_records(path))
+
+    lines = tmp_path / "hiragana.jsonl"
+    lines.write_text('{"kana": "あ", "romaji": "a"}\n\n{"kana": "い", "romaji": "i"}\n', encoding="utf-8")
+    assert resolve_vocab_path(tmp_path, "hiragana.json") == lines
+    assert [entry.romaji for entry in iter_section(tmp_path, "hiragana")] == ["a", "i"]
+    lines.write_text('{"kana": "あ", "romaji": "a"}\n\n{"kana": \n', encoding="utf-8")
+    with pytest.raises(ValueError, match="Invalid JSON in .*hiragana.jsonl at line 3: Expecting value"):
+        list(iter_json_records(lines))
+    lines.write_text('{"kana": "あ", "romaji": "a"}\n{"kana": 1}\n', encoding="utf-8")
+    entries = iter_section(tmp_path, "hiragana")
+    assert next(entries).kana == "あ"
+    with pytest.raises(ValueError, match="at index 1"):
+        next(entries)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import marshal
+
+import pytest
+
+from jp_agent import vocab_cache
+from jp_agent.config import Paths
+from jp_agent.vocab import EXPECTED_FILES, LazyVocabStore, compute_sha256, load_section
+from jp_agent.vocab_cache import VocabCache
+
+
+def _hashes(vocab_dir) -> dict[str, str]:
+    return {filename: compute_sha256(vocab_dir / filename) for filename in EXPECTED_FILES.values()}
+
+
+def _count_json_loads(monkeypatch) -> list[str]:
+    loaded: list[str] = []
+    original = vocab_cache.load_section
+    monkeypatch.setattr(
+        vocab_cache, "load_section", lambda data_dir, section: loaded.append(section) or original(data_dir, section)
+    )
+    return loaded
+
+
+def test_paths_cache_dir_sits_next_to_db(tmp_path):
+    paths = Paths(data_dir=tmp_path, db_path=tmp_path / "app.db")
+    assert paths.cache_dir == tmp_path / "app.db.vocab-cache"
+
+
+def test_cache_round_trips_every_section_and_skips_json_when_warm(monkeypatch, tmp_path, vocab_dir):
+    cache = VocabCache(tmp_path / "cache", _hashes(vocab_dir))
+    loaded = _count_json_loads(monkeypatch)
+
+    cold = {section: cache.load(vocab_dir, section) for section in EXPECTED_FILES}
+    assert loaded == list(EXPECTED_FILES)
+    warm = {section: cache.load(vocab_dir, section) for section in EXPECTED_FILES}
+    assert loaded == list(EXPECTED_FILES)
+    assert warm == cold
+    assert warm["kanji_N5"][0].meaning == ["sun", "day"]
+
+    store = LazyVocabStore(vocab_dir, cache=cache)
+    assert store.kanji["N5"] == cold["kanji_N5"]
+    assert loaded == list(EXPECTED_FILES)
+
+
+def test_cache_invalidates_on_content_hash_and_bad_files(monkeypatch, tmp_path, vocab_dir):
+    cache_dir = tmp_path / "cache"
+    hashes = _hashes(vocab_dir)
+    VocabCache(cache_dir, hashes).load(vocab_dir, "hiragana")
+    loaded = _count_json_loads(monkeypatch)
+
+    path = vocab_dir / EXPECTED_FILES["hiragana"]
+    path.write_text(json.dumps([{"kana": "ka", "romaji": "ka"}]), encoding="utf-8")
+    changed = VocabCache(cache_dir, {**hashes, path.name: compute_sha256(path)})
+    assert [entry.kana for entry in changed.load(vocab_dir, "hiragana")] == ["ka"]
+    assert loaded == ["hiragana"]
+    assert [item.name for item in cache_dir.iterdir()] == [changed.path_for("hiragana", compute_sha256(path)).name]
+
+    cached_path = changed.path_for("hiragana", compute_sha256(path))
+    cached_path.write_bytes(b"not marshal")
+    assert changed.load(vocab_dir, "hiragana")[0].kana == "ka"
+    cached_path.write_bytes(marshal.dumps(((0, marshal.version, "hiragana", "old"), [])))
+    assert changed.load(vocab_dir, "hiragana")[0].kana == "ka"
+    assert loaded == ["hiragana", "hiragana", "hiragana"]
+
+
+def test_cache_without_known_hash_reads_json(monkeypatch, tmp_path, vocab_dir):
+    cache = VocabCache(tmp_path / "cache", {})
+    loaded = _count_json_loads(monkeypatch)
+    assert cache.load(vocab_dir, "keigo") == load_section(vocab_dir, "keigo")
+    assert loaded == ["keigo"]
+    assert not (tmp_path / "cache").exists()
+
+
+def test_lazy_store_loads_only_the_sections_it_is_asked_for(monkeypatch, tmp_path, vocab_dir):
+    from jp_agent import quiz
+    from jp_agent.cards import build_all_cards
+    from jp_agent.db import connect, ensure_schema, sync_cards
+    from jp_agent.models import StudyRequest
+    from jp_agent.vocab import load_all_vocab
+
+    conn = connect(tmp_path / "lazy.db")
+    ensure_schema(conn)
+    sync_cards(conn, build_all_cards(load_all_vocab(vocab_dir)), "2000-01-01")
+    monkeypatch.setattr(quiz, "_prompt_for_answer", lambda choice_count: 0)
+
+    store = LazyVocabStore(vocab_dir)
+    assert store.loaded_sections == []
+    quiz.run_quiz(conn, StudyRequest(mode="kanji", level="N4", context=None, count=2, seed=1), store, None)
+    assert store.loaded_sections == ["kanji_N4"]
+    assert "N3" in store.kanji and "N1" not in store.kanji
+    assert list(store.kanji) == ["N5", "N4", "N3", "N2"] and len(store.kanji) == 4
+    with pytest.raises(ValueError, match="Missing kanji level data"):
+        store.kanji_by_level("N1")
+    with pytest.raises(KeyError):
+        store.kanji["N1"]
+    assert repr(store) == f"LazyVocabStore({str(vocab_dir)!r}, loaded=['kanji_N4'])"
+
+    loaded = _count_json_loads(monkeypatch)
+    cached = LazyVocabStore(vocab_dir, cache=VocabCache(tmp_path / "cache", _hashes(vocab_dir)))
+    assert cached.hiragana is cached.hiragana
+    assert [len(cached.katakana), len(cached.keigo), len(cached.core_vocab), len(cached.survival_phrases)] == [
+        3,
+        3,
+        len(load_section(vocab_dir, "core_vocab")),
+        len(load_section(vocab_dir, "survival")),
+    ]
+    assert loaded == ["hiragana", "katakana", "keigo", "core_vocab", "survival"]
+    assert dict(cached.kanji) == load_all_vocab(vocab_dir).kanji
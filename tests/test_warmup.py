@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from typer.testing import CliRunner
+
+from jp_agent import cli
+from jp_agent.agents.generator import ContentGeneratorAgent
+from jp_agent.config import Paths
+from jp_agent.explanations import ExplanationCache, explanation_key
+from jp_agent.llm import LlmConfig
+from jp_agent.vocab import KeigoEntry, load_section
+from jp_agent.warmup import warm_contexts, warm_explanations
+
+runner = CliRunner()
+
+
+def test_warm_contexts_include_the_default_context():
+    entry = KeigoEntry("言う", "申し上げる", "kenjogo", "to say", "business", ["email", "meeting"])
+    assert warm_contexts([entry]) == [(entry, "email"), (entry, "meeting"), (entry, None)]
+
+
+def test_warm_explanations_command_against_stub_server(monkeypatch, tmp_path, vocab_dir, stub_server):
+    paths = Paths(data_dir=vocab_dir, db_path=tmp_path / "warm.db")
+    monkeypatch.setattr(cli, "resolve_paths", lambda db_path=None: paths)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    result = runner.invoke(cli.app, ["warm-explanations"])
+    assert result.exit_code == 1
+    assert "Set OPENAI_API_KEY and OPENAI_MODEL" in result.stdout
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_MODEL", "stub-model")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{stub_server.server_port}/v1")
+    result = runner.invoke(cli.app, ["warm-explanations"])
+    assert result.exit_code == 1
+    assert "Vocab hashes not initialized" in result.stdout
+
+    assert runner.invoke(cli.app, ["init", "--sync"]).exit_code == 0
+    stub_server.empty_for = {("行く", "general business")}
+    result = runner.invoke(cli.app, ["warm-explanations", "--workers", "3", "--rpm", "60000", "--tpm", "6000000", "--burst", "3"])
+    assert result.exit_code == 1
+    assert "Accepted: 4" in result.stdout
+    assert "Rejected by verifier: 2" in result.stdout
+    assert "Already cached: 0" in result.stdout
+    assert "Waited for rate limit:" in result.stdout
+    assert "over 7 calls (timeouts: 0, errors: 0, coalesced: 0, skipped by open circuit: 0)" in result.stdout
+    assert "Failed: 行く (no context): empty response" in result.stdout
+    assert len(stub_server.requests) == 7
+    assert {request["model"] for request in stub_server.requests} == {"stub-model"}
+
+    monkeypatch.setenv("JP_AGENT_LLM_RPM", "0")
+    result = runner.invoke(cli.app, ["warm-explanations"])
+    assert result.exit_code == 2
+    assert "JP_AGENT_LLM_RPM must be a number greater than 0, got '0'" in result.stdout
+    monkeypatch.delenv("JP_AGENT_LLM_RPM")
+
+    stub_server.empty_for = set()
+    result = runner.invoke(cli.app, ["warm-explanations", "--rpm", "60000"])
+    assert result.exit_code == 0
+    assert "Accepted: 1" in result.stdout
+    assert "Already cached: 6" in result.stdout
+    assert len(stub_server.requests) == 8
+
+    cache = ExplanationCache(paths.db_path)
+    entries = {entry.base: entry for entry in load_section(vocab_dir, "keigo")}
+    accepted = cache.get(explanation_key(entries["言う"], "email", "stub-model"))
+    assert accepted.text == "The humble form of 言う for email."
+    assert accepted.accepted is True
+    assert cache.get(explanation_key(entries["見る"], "general business", "stub-model")).accepted is False
+    cache.close()
+
+
+def test_warm_explanations_requires_a_cache():
+    generator = ContentGeneratorAgent(SimpleNamespace(), LlmConfig(client=None, model="m"))
+    with pytest.raises(ValueError, match="needs an explanation cache"):
+        warm_explanations(generator, [])